@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Protocol
+from urllib.parse import urlsplit
+
+from lab.backend_pool import _model_in
+from lab.context_window import NUM_CTX_BUCKETS
+from lab.logging_jsonl import log_event
+from lab.modelspec import HardwareProfile, get_hardware_profile
+from lab.scheduler import get_scheduler
+
+GIB = 1024**3
+# Headroom left for the OS, the lab itself and Ollama's runtime buffers.
+DEFAULT_RESERVE_GB = 2.0
+DEFAULT_QUEUE_TIMEOUT_S = 60.0
+DEFAULT_POLL_S = 0.5
+# f16 KV cache of an 8B llama-class model: 32 layers x 8 KV heads x 128 dims x (K, V) x 2 bytes.
+DEFAULT_KV_BYTES_PER_TOKEN = 32 * 8 * 128 * 2 * 2
+MEMINFO_PATH = Path("/proc/meminfo")
+LOCAL_HOSTS = frozenset({"localhost", "0.0.0.0", "::1"})
+
+ADMIT = "admit"
+DOWNGRADE = "downgrade"
+QUEUE = "queue"
+REJECT = "reject"
+
+
+class AdmissionError(RuntimeError):
+    """The request cannot fit in memory even at the smallest context window."""
+
+
+class OllamaMetadataClient(Protocol):
+    def running_models(self, model: str | None = None) -> list[dict[str, Any]]: ...
+
+    def model_sizes(self, model: str | None = None) -> dict[str, int]: ...
+
+    def show(self, model: str) -> dict[str, Any]: ...
+
+
+@dataclass
+class MemorySnapshot:
+    total_bytes: int
+    available_bytes: int | None
+
+
+def read_memory(meminfo_path: Path = MEMINFO_PATH, hardware: HardwareProfile | None = None) -> MemorySnapshot:
+    """Live memory from /proc/meminfo; elsewhere only the total is known."""
+    try:
+        fields: dict[str, int] = {}
+        for line in meminfo_path.read_text(encoding="utf-8").splitlines():
+            name, _, rest = line.partition(":")
+            parts = rest.split()
+            if parts and parts[0].isdigit():
+                fields[name] = int(parts[0]) * 1024
+        return MemorySnapshot(fields["MemTotal"], fields.get("MemAvailable"))
+    except (OSError, KeyError):
+        pass
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        total = int((hardware or get_hardware_profile()).unified_memory_gb * GIB)
+    return MemorySnapshot(total, None)
+
+
+def is_local_backend(base_url: str) -> bool:
+    """Whether `base_url` is served from this machine, whose memory `read_memory` measures."""
+    host = (urlsplit(base_url).hostname or "").lower()
+    return host in LOCAL_HOSTS or host.startswith("127.") or host == socket.gethostname().lower()
+
+
+def kv_bytes_per_token(show: dict[str, Any]) -> int:
+    """Estimate f16 KV-cache bytes per context token from `/api/show` model_info."""
+    info = show.get("model_info") or {}
+    arch = info.get("general.architecture")
+    try:
+        layers = int(info[f"{arch}.block_count"])
+        heads = int(info[f"{arch}.attention.head_count"])
+        kv_heads = int(info.get(f"{arch}.attention.head_count_kv") or heads)
+        head_dim = int(info.get(f"{arch}.attention.key_length") or int(info[f"{arch}.embedding_length"]) // heads)
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return DEFAULT_KV_BYTES_PER_TOKEN
+    return layers * kv_heads * head_dim * 2 * 2
+
+
+@dataclass
+class AdmissionDecision:
+    action: str
+    model: str
+    requested_num_ctx: int
+    num_ctx: int
+    required_bytes: int
+    budget_bytes: int
+    reason: str
+
+    def as_dict(self) -> dict[str, Any]:
+        payload = asdict(self)
+        payload["required_gb"] = round(self.required_bytes / GIB, 2)
+        payload["budget_gb"] = round(self.budget_bytes / GIB, 2)
+        return payload
+
+
+class AdmissionController:
+    """Check a chat request against live memory before it reaches Ollama.
+
+    The cost of a request is the model's weights plus its KV cache at
+    `num_ctx`, minus whatever that model already occupies. Requests above the
+    hardware profile's `cautious_max_num_ctx`, or that do not fit in available
+    memory minus `reserve_gb`, are downgraded to the largest context bucket
+    that fits. If only other models' memory stands in the way, idle models are
+    left for Ollama to evict and busy ones are waited out (`queue`); anything
+    else is rejected with `AdmissionError`.
+
+    Memory is read from this machine, so callers only admit requests routed
+    to a local backend (`is_local_backend`); remote backends are not checked.
+    """
+
+    def __init__(
+        self,
+        reserve_gb: float = DEFAULT_RESERVE_GB,
+        queue_timeout_s: float = DEFAULT_QUEUE_TIMEOUT_S,
+        poll_s: float = DEFAULT_POLL_S,
+        hardware: HardwareProfile | None = None,
+        meminfo_path: Path = MEMINFO_PATH,
+    ) -> None:
+        if reserve_gb < 0 or queue_timeout_s < 0 or poll_s <= 0:
+            raise ValueError("reserve_gb and queue_timeout_s must be >= 0 and poll_s > 0")
+        self.reserve_bytes = int(reserve_gb * GIB)
+        self.queue_timeout_s = queue_timeout_s
+        self.poll_s = poll_s
+        self.hardware = hardware or get_hardware_profile()
+        self.meminfo_path = meminfo_path
+        self._kv_cache: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.counts = {ADMIT: 0, DOWNGRADE: 0, QUEUE: 0, REJECT: 0}
+
+    def _kv_per_token(self, client: OllamaMetadataClient, model: str) -> int:
+        with self._lock:
+            cached = self._kv_cache.get(model)
+        if cached is None:
+            try:
+                cached = kv_bytes_per_token(client.show(model))
+            except Exception:
+                # Metadata is best-effort; fall back to the 8B-class estimate.
+                cached = DEFAULT_KV_BYTES_PER_TOKEN
+            with self._lock:
+                self._kv_cache[model] = cached
+        return cached
+
+    def evaluate(self, client: OllamaMetadataClient, model: str, num_ctx: int) -> AdmissionDecision:
+        """One admission pass against the current memory state.
+
+        Loaded models and weight sizes come from the backend `model` is routed
+        to, since that is the server whose memory the request will use.
+        """
+        running = client.running_models(model)
+        current = next((m for m in running if _model_in(model, {str(m.get("name"))})), None)
+        held = int(current.get("size") or 0) if current else 0
+        weights = next((size for name, size in client.model_sizes(model).items() if _model_in(model, {name})), 0)
+        kv_per_token = self._kv_per_token(client, model)
+
+        def required(ctx: int) -> int:
+            # Ollama reloads on a num_ctx change, so what the model holds now is given back first.
+            return max(0, weights + kv_per_token * ctx - held)
+
+        memory = read_memory(self.meminfo_path, self.hardware)
+        available = memory.available_bytes
+        if available is None:
+            available = memory.total_bytes - sum(int(m.get("size") or 0) for m in running)
+        budget = available - self.reserve_bytes
+
+        target = min(num_ctx, self.hardware.cautious_max_num_ctx)
+        candidates = [target, *sorted((b for b in NUM_CTX_BUCKETS if b < target), reverse=True)]
+
+        def largest_fit(limit: int) -> int | None:
+            # A request that needs nothing beyond what its model already holds always fits.
+            return next((ctx for ctx in candidates if required(ctx) <= max(limit, 0)), None)
+
+        def decide(action: str, ctx: int, reason: str) -> AdmissionDecision:
+            if action == ADMIT and ctx < num_ctx:
+                action = DOWNGRADE
+            return AdmissionDecision(action, model, num_ctx, ctx, required(ctx), budget, reason)
+
+        if (ctx := largest_fit(budget)) is not None:
+            if ctx == target < num_ctx:
+                return decide(ADMIT, ctx, "num_ctx above the hardware profile's cautious_max_num_ctx")
+            reason = "fits in available memory" if ctx == target else "KV cache at requested num_ctx does not fit"
+            return decide(ADMIT, ctx, reason)
+
+        # Other models' memory can be reclaimed: Ollama evicts idle ones when loading,
+        # busy ones only after their in-flight requests finish.
+        active = get_scheduler().metrics()["models"]
+        idle = busy = 0
+        for other in running:
+            if other is current:
+                continue
+            size = int(other.get("size") or 0)
+            name = str(other.get("name"))
+            if any(stats.get("active") for key, stats in active.items() if _model_in(key, {name})):
+                busy += size
+            else:
+                idle += size
+        if (ctx := largest_fit(budget + idle)) is not None:
+            return decide(ADMIT, ctx, "fits once Ollama evicts idle models")
+        if (ctx := largest_fit(budget + idle + busy)) is not None:
+            return decide(QUEUE, ctx, "waiting for busy models to finish")
+        return decide(REJECT, candidates[-1], "model does not fit in memory even at the smallest num_ctx")
+
+    def admit(
+        self, client: OllamaMetadataClient, model: str, num_ctx: int, timeout_s: float | None = None
+    ) -> AdmissionDecision:
+        """Evaluate, waiting while the decision is `queue`; raise `AdmissionError` on reject.
+
+        `timeout_s` is the caller's own time budget: queueing that outlasts it
+        raises `TimeoutError` instead of waiting out `queue_timeout_s`.
+        """
+        started = time.monotonic()
+        deadline = started + self.queue_timeout_s
+        caller_deadline = started + timeout_s if timeout_s is not None else None
+        waited = False
+        while True:
+            decision = self.evaluate(client, model, num_ctx)
+            if decision.action != QUEUE:
+                break
+            if not waited:
+                self._record(decision)
+                waited = True
+            now = time.monotonic()
+            if now >= deadline:
+                decision.action = REJECT
+                decision.reason = f"still waiting for memory after {self.queue_timeout_s}s"
+                break
+            if caller_deadline is not None and now >= caller_deadline:
+                raise TimeoutError(f"{model} still waiting for memory after {timeout_s:.3g}s")
+            time.sleep(min(self.poll_s, min(deadline, caller_deadline or deadline) - now))
+        self._record(decision, waited)
+        if decision.action == REJECT:
+            raise AdmissionError(
+                f"Not enough memory for {model} (needs {decision.required_bytes / GIB:.1f} GiB, "
+                f"budget {decision.budget_bytes / GIB:.1f} GiB): {decision.reason}"
+            )
+        return decision
+
+    def _record(self, decision: AdmissionDecision, queued: bool = False) -> None:
+        with self._lock:
+            self.counts[decision.action] += 1
+        log_event("admission", {**decision.as_dict(), "queued": queued})
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {"reserve_gb": round(self.reserve_bytes / GIB, 2), "decisions": dict(self.counts)}
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController | None:
+    return _controller
+
+
+def configure_admission(
+    enabled: bool,
+    reserve_gb: float = DEFAULT_RESERVE_GB,
+    queue_timeout_s: float = DEFAULT_QUEUE_TIMEOUT_S,
+) -> AdmissionController | None:
+    """Enable (or disable) memory admission control for chat calls in this process."""
+    global _controller
+    _controller = AdmissionController(reserve_gb, queue_timeout_s) if enabled else None
+    return _controller
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import sqlite3
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from lab.retrieval import cosine_similarity, index_db_path
+
+DEFAULT_CACHE_PATH = Path("runs") / "cache" / "answers.sqlite"
+DEFAULT_TTL_S = 24 * 3600.0
+DEFAULT_MAX_ENTRIES = 512
+# High enough that only rephrasings of the same question match, not related ones.
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def index_generation(index_dir: str | Path) -> str:
+    """Identify one build of an index; any rebuild rewrites the sqlite file and changes it."""
+    stat = index_db_path(index_dir).stat()
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+class AnswerCache:
+    """Opt-in sqlite-backed cache of RAG answers.
+
+    Entries are scoped by (index generation, chat model, embed model, prompt
+    params). Lookups match the normalized question hash exactly and, when
+    `similarity_threshold` is set, fall back to the most similar cached
+    question embedding in the same scope. Entries expire after `ttl_s` and the
+    least recently used ones are evicted beyond `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_CACHE_PATH,
+        ttl_s: float | None = DEFAULT_TTL_S,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        similarity_threshold: float | None = None,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be > 0")
+        if similarity_threshold is not None and not 0 < similarity_threshold <= 1:
+            raise ValueError("similarity_threshold must be in (0, 1]")
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                scope TEXT NOT NULL,
+                index_dir TEXT NOT NULL,
+                generation TEXT NOT NULL,
+                question_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding TEXT,
+                result BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL,
+                PRIMARY KEY (scope, question_hash)
+            )
+            """
+        )
+        return conn
+
+    def scope(
+        self,
+        index_dir: str | Path,
+        chat_model_name: str,
+        embed_model_name: str,
+        params: dict[str, Any],
+    ) -> dict[str, str]:
+        generation = index_generation(index_dir)
+        key = orjson.dumps(
+            {
+                "index_dir": str(Path(index_dir)),
+                "generation": generation,
+                "model": chat_model_name,
+                "embed_model": embed_model_name,
+                "params": params,
+            },
+            option=orjson.OPT_SORT_KEYS,
+        )
+        return {
+            "key": hashlib.sha256(key).hexdigest(),
+            "index_dir": str(Path(index_dir)),
+            "generation": generation,
+        }
+
+    def _expire(self, conn: sqlite3.Connection, scope: dict[str, str]) -> None:
+        # Entries for an older build of the same index can never match again.
+        conn.execute(
+            "DELETE FROM answers WHERE index_dir = ? AND generation != ?",
+            (scope["index_dir"], scope["generation"]),
+        )
+        if self.ttl_s is not None:
+            conn.execute("DELETE FROM answers WHERE created_at < ?", (time.time() - self.ttl_s,))
+
+    def get_exact(self, scope: dict[str, str], question: str) -> dict[str, Any] | None:
+        question_hash = hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+        with contextlib.closing(self._connect()) as conn, conn:
+            self._expire(conn, scope)
+            row = conn.execute(
+                "SELECT result FROM answers WHERE scope = ? AND question_hash = ?",
+                (scope["key"], question_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE answers SET last_used_at = ? WHERE scope = ? AND question_hash = ?",
+                (time.time(), scope["key"], question_hash),
+            )
+        return {"result": orjson.loads(row[0]), "match": "exact", "similarity": 1.0}
+
+    def get_similar(self, scope: dict[str, str], query_vec: Sequence[float]) -> dict[str, Any] | None:
+        if self.similarity_threshold is None:
+            return None
+        best: tuple[float, str, bytes] | None = None
+        with contextlib.closing(self._connect()) as conn, conn:
+            self._expire(conn, scope)
+            rows = conn.execute(
+                "SELECT question_hash, embedding, result FROM answers "
+                "WHERE scope = ? AND embedding IS NOT NULL",
+                (scope["key"],),
+            ).fetchall()
+            for question_hash, embedding_json, result in rows:
+                similarity = cosine_similarity(query_vec, orjson.loads(embedding_json))
+                if similarity < self.similarity_threshold:
+                    continue
+                if best is None or similarity > best[0]:
+                    best = (similarity, question_hash, result)
+            if best is None:
+                return None
+            conn.execute(
+                "UPDATE answers SET last_used_at = ? WHERE scope = ? AND question_hash = ?",
+                (time.time(), scope["key"], best[1]),
+            )
+        return {"result": orjson.loads(best[2]), "match": "semantic", "similarity": round(best[0], 4)}
+
+    def put(
+        self,
+        scope: dict[str, str],
+        question: str,
+        result: dict[str, Any],
+        query_vec: Sequence[float] | None = None,
+    ) -> None:
+        normalized = normalize_question(question)
+        question_hash = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        now = time.time()
+        with contextlib.closing(self._connect()) as conn, conn:
+            self._expire(conn, scope)
+            conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    scope["key"],
+                    scope["index_dir"],
+                    scope["generation"],
+                    question_hash,
+                    normalized,
+                    orjson.dumps(list(query_vec)).decode("utf-8") if query_vec is not None else None,
+                    orjson.dumps(result),
+                    now,
+                    now,
+                ),
+            )
+            conn.execute(
+                """
+                DELETE FROM answers WHERE rowid IN (
+                    SELECT rowid FROM answers ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM answers")
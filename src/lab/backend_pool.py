@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import contextlib
+import math
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+import httpx
+import yaml
+from pydantic import BaseModel, Field
+
+BACKENDS_CONFIG_PATH = Path("experiments") / "backends.yaml"
+
+
+class BackendSpec(BaseModel):
+    name: str
+    base_url: str
+    max_outstanding: int | None = None
+
+
+class HealthCheckSpec(BaseModel):
+    interval_s: float = 15.0
+    timeout_s: float = 2.0
+
+
+class HedgeSpec(BaseModel):
+    enabled: bool = False
+    # Hedge once a call has waited longer than this percentile of recent first-response latencies.
+    percentile: float = Field(default=95.0, gt=0, lt=100)
+    min_delay_ms: float = Field(default=50.0, ge=0)
+    min_samples: int = Field(default=20, ge=1)
+    window: int = Field(default=200, ge=1)
+
+
+class BackendsConfig(BaseModel):
+    backends: list[BackendSpec] = Field(min_length=1)
+    health: HealthCheckSpec = Field(default_factory=HealthCheckSpec)
+    hedge: HedgeSpec = Field(default_factory=HedgeSpec)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def _model_in(model: str, names: set[str]) -> bool:
+    """Match "llama3" against "llama3:latest" the way Ollama resolves untagged names."""
+    if model in names:
+        return True
+    if ":" not in model:
+        return f"{model}:latest" in names
+    return model.endswith(":latest") and model.removesuffix(":latest") in names
+
+
+@dataclass
+class BackendState:
+    spec: BackendSpec
+    healthy: bool = True
+    installed: set[str] | None = None
+    loaded: set[str] = field(default_factory=set)
+    outstanding: int = 0
+    requests: int = 0
+    failures: int = 0
+    last_probe_at: float | None = None
+    last_error: str | None = None
+
+    @property
+    def base_url(self) -> str:
+        return self.spec.base_url.rstrip("/")
+
+    def load_ratio(self) -> float:
+        if self.spec.max_outstanding:
+            return self.outstanding / self.spec.max_outstanding
+        return float(self.outstanding)
+
+
+class BackendPool:
+    """Route Ollama requests across several servers.
+
+    Backends are probed (`/api/tags` for health and installed models,
+    `/api/ps` for loaded models) at most every `interval_s`, lazily when a
+    request needs a route. Candidates are ordered healthy first, then those
+    that already have the model loaded, then by fewest outstanding requests;
+    callers walk that list to fail over. With hedging enabled the pool also
+    keeps recent first-response latencies per model to derive the hedge delay.
+    """
+
+    def __init__(
+        self,
+        backends: list[BackendSpec],
+        health: HealthCheckSpec | None = None,
+        hedge: HedgeSpec | None = None,
+    ) -> None:
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self.health = health or HealthCheckSpec()
+        self.hedge = hedge or HedgeSpec()
+        self.states = [BackendState(spec=spec) for spec in backends]
+        self._lock = threading.Lock()
+        self._latencies: dict[str, deque[float]] = {}
+        self._hedges: dict[str, dict[str, int]] = {}
+
+    @classmethod
+    def from_config(cls, path: str | Path = BACKENDS_CONFIG_PATH) -> BackendPool:
+        data = yaml.safe_load(Path(path).read_text(encoding="utf-8"))
+        cfg = BackendsConfig.model_validate(data)
+        return cls(cfg.backends, cfg.health, cfg.hedge)
+
+    def _state(self, base_url: str) -> BackendState:
+        for state in self.states:
+            if state.base_url == base_url.rstrip("/"):
+                return state
+        raise KeyError(f"Unknown backend: {base_url}")
+
+    def probe(self, state: BackendState) -> None:
+        try:
+            with httpx.Client(timeout=self.health.timeout_s) as client:
+                tags = client.get(f"{state.base_url}/api/tags")
+                tags.raise_for_status()
+                installed = {item["name"] for item in tags.json().get("models", []) if item.get("name")}
+                loaded: set[str] = set()
+                ps = client.get(f"{state.base_url}/api/ps")
+                if ps.status_code == 200:
+                    loaded = {item["name"] for item in ps.json().get("models", []) if item.get("name")}
+        except (httpx.HTTPError, ValueError, KeyError) as exc:
+            with self._lock:
+                state.healthy = False
+                state.last_error = str(exc)
+                state.last_probe_at = time.monotonic()
+            return
+        with self._lock:
+            state.healthy = True
+            state.installed = installed
+            state.loaded = loaded
+            state.last_error = None
+            state.last_probe_at = time.monotonic()
+
+    def probe_all(self) -> None:
+        for state in self.states:
+            self.probe(state)
+
+    def _probe_due(self) -> list[BackendState]:
+        now = time.monotonic()
+        return [
+            state
+            for state in self.states
+            if state.last_probe_at is None or now - state.last_probe_at >= self.health.interval_s
+        ]
+
+    def candidates(self, model: str | None = None) -> list[str]:
+        """Return backend base URLs in the order requests for `model` should try them."""
+        for state in self._probe_due():
+            self.probe(state)
+        with self._lock:
+            pool = list(self.states)
+            if model is not None:
+                # Skip backends known not to have the model, unless none do.
+                having = [s for s in pool if s.installed is None or _model_in(model, s.installed)]
+                pool = having or pool
+            ranked = sorted(
+                enumerate(pool),
+                key=lambda item: (
+                    not item[1].healthy,
+                    not (model is not None and _model_in(model, item[1].loaded)),
+                    item[1].load_ratio(),
+                    item[0],
+                ),
+            )
+        return [state.base_url for _, state in ranked]
+
+    @contextlib.contextmanager
+    def track(self, base_url: str, model: str | None = None) -> Iterator[None]:
+        """Count an in-flight request; a transport error marks the backend unhealthy."""
+        state = self._state(base_url)
+        with self._lock:
+            state.outstanding += 1
+            state.requests += 1
+        try:
+            yield
+        except httpx.TransportError as exc:
+            with self._lock:
+                state.failures += 1
+                state.healthy = False
+                state.last_error = str(exc)
+            raise
+        except Exception:
+            with self._lock:
+                state.failures += 1
+            raise
+        else:
+            if model is not None:
+                with self._lock:
+                    # The backend has just served the model, so it is now resident there.
+                    state.loaded.add(model)
+        finally:
+            with self._lock:
+                state.outstanding -= 1
+
+    def forget_loaded(self, base_url: str, model: str) -> None:
+        with self._lock:
+            self._state(base_url).loaded.discard(model)
+
+    def record_latency(self, model: str, latency_ms: float) -> None:
+        with self._lock:
+            samples = self._latencies.get(model)
+            if samples is None:
+                samples = self._latencies[model] = deque(maxlen=self.hedge.window)
+            samples.append(latency_ms)
+
+    def hedge_delay_s(self, model: str) -> float | None:
+        """Seconds to wait before duplicating a call for `model`, or None to not hedge."""
+        if not self.hedge.enabled:
+            return None
+        with self._lock:
+            if sum(state.healthy for state in self.states) < 2:
+                return None
+            samples = list(self._latencies.get(model, ()))
+        if len(samples) < self.hedge.min_samples:
+            return None
+        return max(self.hedge.min_delay_ms, _percentile(samples, self.hedge.percentile)) / 1000
+
+    def record_hedge(self, model: str, outcome: str) -> None:
+        """Count a hedge event: `sent`, `won` (the duplicate answered first) or `cancelled`."""
+        with self._lock:
+            counts = self._hedges.setdefault(model, {"sent": 0, "won": 0, "cancelled": 0})
+            counts[outcome] += 1
+
+    def installed_models(self) -> list[str]:
+        for state in self._probe_due():
+            self.probe(state)
+        with self._lock:
+            names: set[str] = set()
+            for state in self.states:
+                if state.healthy and state.installed:
+                    names |= state.installed
+        return sorted(names)
+
+    def status(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "name": state.spec.name,
+                    "base_url": state.base_url,
+                    "healthy": state.healthy,
+                    "installed": sorted(state.installed) if state.installed is not None else None,
+                    "loaded": sorted(state.loaded),
+                    "outstanding": state.outstanding,
+                    "requests": state.requests,
+                    "failures": state.failures,
+                    "last_error": state.last_error,
+                }
+                for state in self.states
+            ]
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            hedges = {model: dict(counts) for model, counts in sorted(self._hedges.items())}
+        for model, counts in hedges.items():
+            delay_s = self.hedge_delay_s(model)
+            counts["delay_ms"] = round(delay_s * 1000, 2) if delay_s is not None else None
+        return {
+            "backends": self.status(),
+            "hedging": {"enabled": self.hedge.enabled, "percentile": self.hedge.percentile, "models": hedges},
+        }
+
+
+@lru_cache(maxsize=1)
+def default_backend_pool() -> BackendPool | None:
+    """The pool from experiments/backends.yaml, or None to use the single default URL."""
+    if not BACKENDS_CONFIG_PATH.exists():
+        return None
+    return BackendPool.from_config(BACKENDS_CONFIG_PATH)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+DEFAULT_CASSETTE_DIR = Path("runs") / "cassettes"
+CASSETTE_MODES = ("record", "replay", "auto")
+# Request fields that do not change what Ollama answers.
+_IGNORED_FIELDS = ("keep_alive",)
+
+
+class CassetteMiss(RuntimeError):
+    """A replayed request was never recorded."""
+
+
+def fingerprint(kind: str, request: dict[str, Any]) -> str:
+    body = {key: value for key, value in request.items() if key not in _IGNORED_FIELDS}
+    data = orjson.dumps({"kind": kind, "request": body}, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(data).hexdigest()
+
+
+class Cassette:
+    """Record/replay store for Ollama calls, keyed by request fingerprint.
+
+    `record` always calls Ollama and (over)writes the entry, `replay` serves
+    only recorded entries and raises `CassetteMiss` otherwise, and `auto`
+    replays hits and records misses. Responses are stored as zlib-compressed
+    JSON in one sqlite file, so a cassette can be copied or committed as-is.
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay") -> None:
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"mode must be one of {CASSETTE_MODES}, got {mode!r}")
+        self.path = Path(path)
+        if mode == "replay" and not self.path.exists():
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                fingerprint TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                model TEXT,
+                response BLOB NOT NULL,
+                recorded_at REAL NOT NULL
+            )
+            """
+        )
+        return conn
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def lookup(self, kind: str, request: dict[str, Any]) -> Any | None:
+        """Return the recorded response, or None when the caller should make the call."""
+        if self.mode == "record":
+            return None
+        with contextlib.closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT response FROM entries WHERE fingerprint = ?",
+                (fingerprint(kind, request),),
+            ).fetchone()
+        if row is not None:
+            self._count("hits")
+            return orjson.loads(zlib.decompress(row[0]))
+        self._count("misses")
+        if self.mode == "replay":
+            raise CassetteMiss(
+                f"No recorded {kind} response for model {request.get('model')!r} in {self.path}; "
+                "re-record with --cassette-mode record or auto"
+            )
+        return None
+
+    def store(self, kind: str, request: dict[str, Any], response: Any) -> None:
+        blob = zlib.compress(orjson.dumps(response), 6)
+        with contextlib.closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (fingerprint, kind, model, response, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (fingerprint(kind, request), kind, request.get("model"), blob, time.time()),
+            )
+        self._count("recorded")
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {"path": str(self.path), "mode": self.mode, **self.stats}
+
+
+_active: Cassette | None = None
+
+
+def active_cassette() -> Cassette | None:
+    return _active
+
+
+def configure_cassette(path: str | Path | None, mode: str = "replay") -> Cassette | None:
+    """Route every Ollama client call in this process through a cassette (None disables)."""
+    global _active
+    _active = Cassette(path, mode) if path is not None else None
+    return _active
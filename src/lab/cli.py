@@ -7,18 +7,48 @@ from rich.console import Console
 from rich.table import Table
 import uvicorn
 
+from lab.answer_cache import (
+    DEFAULT_CACHE_PATH,
+    DEFAULT_SIMILARITY_THRESHOLD,
+    DEFAULT_TTL_S,
+    AnswerCache,
+)
+from lab.backend_pool import BACKENDS_CONFIG_PATH, BackendPool
+from lab.admission import DEFAULT_RESERVE_GB, configure_admission
+from lab.cassette import CASSETTE_MODES, configure_cassette
+from lab.context_packing import DEFAULT_CONTEXT_BUDGET_FRACTION
+from lab.context_window import parse_num_ctx
 from lab.doctor import run_doctor
+from lab.embeddings import DEFAULT_EMBED_BATCH_SIZE
+from lab.fake_ollama import DEFAULT_FAKE_MODELS, FakeOllamaConfig, FakeOllamaServer
+from lab.index_store import gc_indexes
 from lab.ingest import ingest_corpus
-from lab.model_registry import match_installed_to_policy, recommend
-from lab.ollama_client import OllamaClient
+from lab.model_registry import (
+    installed_models,
+    invalidate_installed_models,
+    match_installed_to_policy,
+    recommend,
+)
+from lab.ollama_client import (
+    DEFAULT_POOL_LIMITS,
+    DEFAULT_WARM_KEEP_ALIVE,
+    OllamaClient,
+    close_clients,
+    configure_pool_limits,
+    get_client,
+    parse_keep_alive,
+)
 from lab.profile import profile as run_profile
 from lab.rag import answer_question
 from lab.reporting import compare_runs, print_run_summary
 from lab.retrieval import retrieve
 from lab.runner import run_config
+from lab.scheduler import DEFAULT_MODEL_CONCURRENCY, configure_scheduler
 
 
 console = Console()
+NUM_CTX_HELP = "Context window size, or 'auto' to pick the smallest bucket that fits the prompt"
+KEEP_ALIVE_HELP = "How long Ollama keeps the model loaded: duration (30m), seconds, 0 or -1 (forever)"
 
 
 def _cmd_doctor(args: argparse.Namespace) -> int:
@@ -26,7 +56,7 @@ def _cmd_doctor(args: argparse.Namespace) -> int:
 
 
 def _cmd_models_list(_: argparse.Namespace) -> int:
-    client = OllamaClient()
+    client = get_client()
     try:
         models = client.list_models()
     except Exception as exc:
@@ -72,6 +102,104 @@ def _cmd_models_status(_: argparse.Namespace) -> int:
     return 0
 
 
+def _cmd_models_warm(args: argparse.Namespace) -> int:
+    client = get_client(timeout_s=300.0)
+    failed = False
+    for model in args.model:
+        try:
+            result = client.preload(model, keep_alive=args.keep_alive, embedding=args.embedding)
+        except Exception as exc:
+            console.print(f"[red]Failed to warm {model}:[/red] {exc}")
+            failed = True
+            continue
+        load_ms = result["load_duration_ms"]
+        console.print(
+            f"[green]Warm[/green] {model} (keep_alive={args.keep_alive}, "
+            f"request={result['latency_ms']} ms, load={load_ms if load_ms is not None else 'n/a'} ms)"
+        )
+    return 1 if failed else 0
+
+
+def _cmd_models_unload(args: argparse.Namespace) -> int:
+    client = get_client()
+    failed = False
+    for model in args.model:
+        try:
+            client.unload(model, embedding=args.embedding)
+        except Exception as exc:
+            console.print(f"[red]Failed to unload {model}:[/red] {exc}")
+            failed = True
+            continue
+        console.print(f"[green]Unloaded[/green] {model}")
+    return 1 if failed else 0
+
+
+def _cmd_backends_status(args: argparse.Namespace) -> int:
+    try:
+        pool = BackendPool.from_config(args.config)
+    except Exception as exc:
+        console.print(f"[red]Failed to load backend pool config:[/red] {exc}")
+        return 1
+    pool.probe_all()
+
+    table = Table(title="Ollama Backends")
+    table.add_column("Backend", style="bold")
+    table.add_column("URL")
+    table.add_column("Health")
+    table.add_column("Loaded")
+    table.add_column("Installed", justify="right")
+    healthy = 0
+    for entry in pool.status():
+        healthy += entry["healthy"]
+        health = "[green]ok[/green]" if entry["healthy"] else f"[red]down[/red] {entry['last_error'] or ''}"
+        table.add_row(
+            entry["name"],
+            entry["base_url"],
+            health,
+            ", ".join(entry["loaded"]) or "-",
+            str(len(entry["installed"] or [])),
+        )
+    console.print(table)
+    return 0 if healthy else 1
+
+
+def _cmd_models_pull(args: argparse.Namespace) -> int:
+    client = get_client(timeout_s=3600.0)
+    failed = False
+    for model in args.model:
+        console.print(f"Pulling {model} ...")
+        try:
+            result = client.pull(model)
+        except Exception as exc:
+            console.print(f"[red]Failed to pull {model}:[/red] {exc}")
+            failed = True
+            continue
+        console.print(f"[green]Pulled[/green] {model} ({result.get('status', 'success')})")
+    invalidate_installed_models()
+    return 1 if failed else 0
+
+
+def _cmd_models_refresh(_: argparse.Namespace) -> int:
+    invalidate_installed_models()
+    try:
+        models = installed_models(refresh=True)
+    except Exception as exc:
+        console.print(f"[red]Failed to list models:[/red] {exc}")
+        return 1
+    console.print(f"Model discovery cache refreshed ({len(models)} installed)")
+    return 0
+
+
+def _cmd_index_gc(args: argparse.Namespace) -> int:
+    removed = gc_indexes(dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    for entry in removed:
+        console.print(f"{verb} {entry['path']} ({entry['reason']}, {entry['bytes'] / 1e6:.1f} MB)")
+    freed = sum(entry["bytes"] for entry in removed)
+    console.print(f"{verb} {len(removed)} stored index(es), {freed / 1e6:.1f} MB")
+    return 0
+
+
 def _cmd_models_recommend(args: argparse.Namespace) -> int:
     try:
         rec = recommend(args.task)
@@ -112,8 +240,29 @@ def _recommended_task_model(task: str) -> tuple[str | None, list[str]]:
     return rec.get("chosen_model"), rec.get("suggested_pulls", [])
 
 
+class _TokenPrinter:
+    """on_token callback that renders streamed text as it arrives."""
+
+    def __init__(self) -> None:
+        self.started = False
+
+    def __call__(self, text: str) -> None:
+        self.started = True
+        console.print(text, end="", markup=False, highlight=False)
+
+
+def _print_timing(result: dict) -> None:
+    console.print(f"[bold]Latency:[/bold] {result['latency_ms']} ms")
+    if result.get("ttft_ms") is not None:
+        itl = result.get("inter_token_ms_avg")
+        console.print(
+            f"[bold]TTFT:[/bold] {result['ttft_ms']} ms"
+            + (f" | [bold]Inter-token avg:[/bold] {itl} ms" if itl is not None else "")
+        )
+
+
 def _cmd_chat(args: argparse.Namespace) -> int:
-    client = OllamaClient()
+    client = get_client()
     model = args.model
     try:
         if not model:
@@ -126,21 +275,31 @@ def _cmd_chat(args: argparse.Namespace) -> int:
         console.print("[yellow]No local models installed. Try:[/yellow] `ollama pull llama3`")
         return 1
 
+    console.print(f"[bold]Model:[/bold] {model}")
+    console.print()
+    printer = _TokenPrinter() if args.stream else None
     try:
         result = client.chat_generate(
             model=model,
             prompt=args.prompt,
             temperature=args.temperature,
             num_ctx=args.num_ctx,
+            on_token=printer,
+            keep_alive=args.keep_alive,
         )
     except Exception as exc:
+        if printer is not None and printer.started:
+            console.print()
         console.print(f"[red]Chat request failed:[/red] {exc}")
         return 1
 
-    console.print(f"[bold]Model:[/bold] {model}")
-    console.print(f"[bold]Latency:[/bold] {result['latency_ms']} ms")
+    if printer is not None and printer.started:
+        console.print()
+    else:
+        console.print(result["text"] or "[dim](empty response)[/dim]")
     console.print()
-    console.print(result["text"] or "[dim](empty response)[/dim]")
+    _print_timing(result)
+    console.print(f"[bold]num_ctx:[/bold] {result['num_ctx']}")
     if args.show_raw:
         console.print()
         console.print("[dim]Raw response snippet:[/dim]")
@@ -169,6 +328,7 @@ def _cmd_ingest(args: argparse.Namespace) -> int:
             embed_model_name=embed_model,
             chunk_size_chars=args.chunk_size_chars,
             overlap_chars=args.overlap_chars,
+            embed_batch_size=args.embed_batch_size,
         )
     except Exception as exc:
         console.print(f"[red]Ingest failed:[/red] {exc}")
@@ -176,6 +336,8 @@ def _cmd_ingest(args: argparse.Namespace) -> int:
 
     console.print("[bold green]Ingest complete[/bold green]")
     for key, value in metadata.items():
+        if key == "embedding":
+            value = {k: v for k, v in value.items() if k != "batches"}
         console.print(f"- {key}: {value}")
     return 0
 
@@ -242,7 +404,20 @@ def _cmd_rag(args: argparse.Namespace) -> int:
             console.print(f"- ollama pull {name}")
         return 1
 
+    console.print(f"[bold]Model:[/bold] {chat_model}")
+    console.print(f"[bold]Embeddings:[/bold] {embed_model}")
+    console.print()
+    printer = _TokenPrinter() if args.stream else None
     try:
+        answer_cache = (
+            AnswerCache(
+                path=args.cache_path,
+                ttl_s=args.cache_ttl_s,
+                similarity_threshold=args.cache_similarity or None,
+            )
+            if args.cache
+            else None
+        )
         result = answer_question(
             question=args.question,
             index_dir=args.index,
@@ -253,16 +428,36 @@ def _cmd_rag(args: argparse.Namespace) -> int:
             num_ctx=args.num_ctx,
             question_id=args.question_id,
             refusal_score_threshold=args.refusal_score_threshold,
+            context_budget_fraction=args.context_budget_fraction,
+            on_token=printer,
+            answer_cache=answer_cache,
+            keep_alive=args.keep_alive,
         )
     except Exception as exc:
+        if printer is not None and printer.started:
+            console.print()
         console.print(f"[red]RAG failed:[/red] {exc}")
         return 1
 
-    console.print(f"[bold]Model:[/bold] {chat_model}")
-    console.print(f"[bold]Embeddings:[/bold] {embed_model}")
-    console.print(f"[bold]Latency:[/bold] {result['latency_ms']} ms")
+    if printer is not None and printer.started:
+        console.print()
+    else:
+        console.print(result["answer_text"])
     console.print()
-    console.print(result["answer_text"])
+    _print_timing(result)
+    console.print(
+        f"[bold]Context:[/bold] {result['context_tokens']} tokens packed "
+        f"(prompt ~{result['prompt_tokens_estimate']} tokens, num_ctx={result['num_ctx']})"
+    )
+    cache = result.get("cache")
+    if cache is not None:
+        if cache["hit"]:
+            console.print(
+                f"[bold]Cache:[/bold] {cache['match']} hit (similarity={cache['similarity']}, "
+                f"originally {cache['cached_latency_ms']} ms)"
+            )
+        else:
+            console.print("[bold]Cache:[/bold] miss (answer stored)")
     if result["citations"]:
         console.print()
         console.print("[bold]Citations[/bold]")
@@ -279,8 +474,11 @@ def _cmd_rag(args: argparse.Namespace) -> int:
 
 
 def _cmd_run(args: argparse.Namespace) -> int:
+    if args.config is None and args.resume is None:
+        console.print("[red]Pass --config to start a run or --resume to finish one.[/red]")
+        return 2
     try:
-        run_dir = run_config(args.config)
+        run_dir = run_config(args.config, resume=args.resume)
     except Exception as exc:
         console.print(f"[red]Run failed:[/red] {exc}")
         return 1
@@ -311,6 +509,34 @@ def _cmd_web(args: argparse.Namespace) -> int:
     return 0
 
 
+def _cmd_fake_ollama(args: argparse.Namespace) -> int:
+    try:
+        config = FakeOllamaConfig(
+            models=args.model or list(DEFAULT_FAKE_MODELS),
+            load_ms=args.load_ms,
+            ttft_ms=args.ttft_ms,
+            tokens_per_s=args.tokens_per_s,
+            response_tokens=args.response_tokens,
+            embed_dim=args.embed_dim,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            seed=args.seed,
+        )
+        server = FakeOllamaServer(config, host=args.host, port=args.port)
+    except (ValueError, OSError) as exc:
+        console.print(f"[red]Failed to start fake Ollama:[/red] {exc}")
+        return 1
+    console.print(f"[bold]Fake Ollama[/bold] listening on {server.url} ({', '.join(config.models)})")
+    console.print(f"Point the lab at it with OLLAMA_HOST={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
 def _cmd_profile(args: argparse.Namespace) -> int:
     try:
         summary = run_profile(
@@ -329,17 +555,78 @@ def _cmd_profile(args: argparse.Namespace) -> int:
     console.print(f"[bold]Runs:[/bold] {summary['n']}")
     console.print(f"[bold]Average wall:[/bold] {summary['average_wall_ms']} ms")
     console.print(f"[bold]Average chars/sec:[/bold] {summary['average_chars_per_sec']}")
+    console.print(f"[bold]Average TTFT:[/bold] {summary['average_ttft_ms']} ms")
     console.print("[bold]Per-run[/bold]")
     for row in summary["runs"]:
         console.print(
-            f"- run={row['run_index']} wall_ms={row['wall_ms']} chars={row['chars']} "
-            f"chars_per_sec={row['chars_per_sec']}"
+            f"- run={row['run_index']} wall_ms={row['wall_ms']} ttft_ms={row['ttft_ms']} "
+            f"chars={row['chars']} chars_per_sec={row['chars_per_sec']}"
         )
     return 0
 
 
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {number}")
+    return number
+
+
+def _non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {number}")
+    return number
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(prog="lab", description="Local LLM Lab CLI")
+    parser.add_argument(
+        "--http-max-connections",
+        type=_positive_int,
+        default=DEFAULT_POOL_LIMITS.max_connections,
+        dest="http_max_connections",
+        help="Connection-pool size for Ollama HTTP clients",
+    )
+    parser.add_argument(
+        "--http-max-keepalive",
+        type=_non_negative_int,
+        default=DEFAULT_POOL_LIMITS.max_keepalive_connections,
+        dest="http_max_keepalive",
+        help="Idle keep-alive connections kept open to Ollama between calls",
+    )
+    parser.add_argument(
+        "--model-concurrency",
+        type=_positive_int,
+        default=DEFAULT_MODEL_CONCURRENCY,
+        dest="model_concurrency",
+        help="Max in-flight Ollama requests per model from this process (others queue by priority)",
+    )
+    parser.add_argument(
+        "--cassette",
+        default=None,
+        help="Record/replay Ollama chat and embedding calls through this sqlite cassette file",
+    )
+    parser.add_argument(
+        "--cassette-mode",
+        choices=CASSETTE_MODES,
+        default="replay",
+        dest="cassette_mode",
+        help="record: call Ollama and store; replay: serve recorded calls only; auto: replay hits, record misses",
+    )
+    parser.add_argument(
+        "--memory-admission",
+        action="store_true",
+        dest="memory_admission",
+        help="Check free memory before each chat call; downgrade num_ctx, queue, or refuse when it would not fit",
+    )
+    parser.add_argument(
+        "--memory-reserve-gb",
+        type=float,
+        default=DEFAULT_RESERVE_GB,
+        dest="memory_reserve_gb",
+        help="Memory kept free for the OS when --memory-admission is on",
+    )
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     p_doctor = subparsers.add_parser("doctor", help="Check local environment and Ollama connectivity")
@@ -359,12 +646,78 @@ def build_parser() -> argparse.ArgumentParser:
     p_models_recommend.add_argument("--task", required=True, choices=["chat", "rag_qa", "embeddings"])
     p_models_recommend.set_defaults(func=_cmd_models_recommend)
 
+    p_models_warm = models_sub.add_parser("warm", help="Preload models and keep them resident")
+    p_models_warm.add_argument("--model", required=True, action="append", help="Model name (repeatable)")
+    p_models_warm.add_argument(
+        "--keep-alive",
+        type=parse_keep_alive,
+        default=DEFAULT_WARM_KEEP_ALIVE,
+        dest="keep_alive",
+        help=KEEP_ALIVE_HELP,
+    )
+    p_models_warm.add_argument(
+        "--embedding",
+        action="store_true",
+        help="Models are embedding models (loaded via /api/embed)",
+    )
+    p_models_warm.set_defaults(func=_cmd_models_warm)
+
+    p_models_unload = models_sub.add_parser("unload", help="Evict models from Ollama memory now")
+    p_models_unload.add_argument("--model", required=True, action="append", help="Model name (repeatable)")
+    p_models_unload.add_argument("--embedding", action="store_true", help="Models are embedding models")
+    p_models_unload.set_defaults(func=_cmd_models_unload)
+
+    p_models_pull = models_sub.add_parser("pull", help="Pull models and refresh the discovery cache")
+    p_models_pull.add_argument("--model", required=True, action="append", help="Model name (repeatable)")
+    p_models_pull.set_defaults(func=_cmd_models_pull)
+
+    p_models_refresh = models_sub.add_parser(
+        "refresh",
+        help="Drop cached model discovery (after `ollama pull` / `ollama rm` outside the lab)",
+    )
+    p_models_refresh.set_defaults(func=_cmd_models_refresh)
+
+    p_index = subparsers.add_parser("index", help="Manage the shared content-addressed index store")
+    index_sub = p_index.add_subparsers(dest="index_command", required=True)
+    p_index_gc = index_sub.add_parser("gc", help="Delete stored indexes no run directory references")
+    p_index_gc.add_argument("--dry-run", action="store_true", help="List what would be removed without deleting")
+    p_index_gc.set_defaults(func=_cmd_index_gc)
+
+    p_backends = subparsers.add_parser("backends", help="Inspect the multi-backend Ollama pool")
+    backends_sub = p_backends.add_subparsers(dest="backends_command", required=True)
+    p_backends_status = backends_sub.add_parser("status", help="Probe every configured backend")
+    p_backends_status.add_argument(
+        "--config",
+        default=str(BACKENDS_CONFIG_PATH),
+        help="Backend pool YAML (see experiments/backends.example.yaml)",
+    )
+    p_backends_status.set_defaults(func=_cmd_backends_status)
+
     p_chat = subparsers.add_parser("chat", help="Run one-shot local chat inference")
     p_chat.add_argument("--prompt", required=True, help="User prompt text")
     p_chat.add_argument("--model", default=None, help="Model name (defaults to llama3 if installed)")
     p_chat.add_argument("--temperature", type=float, default=0.2)
-    p_chat.add_argument("--num-ctx", type=int, default=4096, dest="num_ctx")
+    p_chat.add_argument(
+        "--num-ctx",
+        type=parse_num_ctx,
+        default=4096,
+        dest="num_ctx",
+        help=NUM_CTX_HELP,
+    )
     p_chat.add_argument("--show-raw", action="store_true", help="Print raw response snippet")
+    p_chat.add_argument(
+        "--no-stream",
+        action="store_false",
+        dest="stream",
+        help="Wait for the full response instead of rendering tokens as they arrive",
+    )
+    p_chat.add_argument(
+        "--keep-alive",
+        type=parse_keep_alive,
+        default=None,
+        dest="keep_alive",
+        help=KEEP_ALIVE_HELP,
+    )
     p_chat.set_defaults(func=_cmd_chat)
 
     p_ingest = subparsers.add_parser("ingest", help="Build local embeddings index from a corpus")
@@ -373,6 +726,13 @@ def build_parser() -> argparse.ArgumentParser:
     p_ingest.add_argument("--embed-model", default=None, dest="embed_model", help="Embeddings model name")
     p_ingest.add_argument("--chunk-size-chars", type=int, default=900, dest="chunk_size_chars")
     p_ingest.add_argument("--overlap-chars", type=int, default=120, dest="overlap_chars")
+    p_ingest.add_argument(
+        "--embed-batch-size",
+        type=int,
+        default=DEFAULT_EMBED_BATCH_SIZE,
+        dest="embed_batch_size",
+        help="Chunks sent per /api/embed request",
+    )
     p_ingest.set_defaults(func=_cmd_ingest)
 
     p_retrieve = subparsers.add_parser("retrieve", help="Retrieve top-k chunks from local index")
@@ -389,7 +749,13 @@ def build_parser() -> argparse.ArgumentParser:
     p_rag.add_argument("--model", default=None, help="Chat model name")
     p_rag.add_argument("--embed-model", default=None, dest="embed_model", help="Embeddings model name")
     p_rag.add_argument("--k", type=int, default=5)
-    p_rag.add_argument("--num-ctx", type=int, default=4096, dest="num_ctx")
+    p_rag.add_argument(
+        "--num-ctx",
+        type=parse_num_ctx,
+        default=4096,
+        dest="num_ctx",
+        help=NUM_CTX_HELP,
+    )
     p_rag.add_argument("--temperature", type=float, default=0.2)
     p_rag.add_argument(
         "--refusal-score-threshold",
@@ -398,10 +764,49 @@ def build_parser() -> argparse.ArgumentParser:
         dest="refusal_score_threshold",
         help="Optional retrieval-score threshold to force exact refusal (disabled by default)",
     )
+    p_rag.add_argument(
+        "--context-budget-fraction",
+        type=float,
+        default=DEFAULT_CONTEXT_BUDGET_FRACTION,
+        dest="context_budget_fraction",
+        help="Fraction of num_ctx the packed retrieved context may fill",
+    )
+    p_rag.add_argument(
+        "--no-stream",
+        action="store_false",
+        dest="stream",
+        help="Wait for the full answer instead of rendering tokens as they arrive",
+    )
+    p_rag.add_argument(
+        "--keep-alive",
+        type=parse_keep_alive,
+        default=None,
+        dest="keep_alive",
+        help=KEEP_ALIVE_HELP,
+    )
+    p_rag.add_argument(
+        "--cache",
+        action="store_true",
+        help="Serve repeated or near-duplicate questions from the local answer cache",
+    )
+    p_rag.add_argument("--cache-path", default=str(DEFAULT_CACHE_PATH), dest="cache_path")
+    p_rag.add_argument(
+        "--cache-similarity",
+        type=float,
+        default=DEFAULT_SIMILARITY_THRESHOLD,
+        dest="cache_similarity",
+        help="Question-embedding cosine similarity for a near-duplicate hit (0 = exact matches only)",
+    )
+    p_rag.add_argument("--cache-ttl-s", type=float, default=DEFAULT_TTL_S, dest="cache_ttl_s")
     p_rag.set_defaults(func=_cmd_rag)
 
     p_run = subparsers.add_parser("run", help="Run an experiment config")
-    p_run.add_argument("--config", required=True, help="Path to experiment config YAML")
+    p_run.add_argument("--config", default=None, help="Path to experiment config YAML")
+    p_run.add_argument(
+        "--resume",
+        default=None,
+        help="Finish an interrupted run (runs/<run_id>): reuse its index and skip completed tasks",
+    )
     p_run.set_defaults(func=_cmd_run)
 
     p_report = subparsers.add_parser("report", help="Print a run summary")
@@ -425,10 +830,49 @@ def build_parser() -> argparse.ArgumentParser:
         dest="prompt_file",
         help="Prompt text file",
     )
-    p_profile.add_argument("--num-ctx", type=int, default=4096, dest="num_ctx")
+    p_profile.add_argument(
+        "--num-ctx",
+        type=parse_num_ctx,
+        default=4096,
+        dest="num_ctx",
+        help=NUM_CTX_HELP,
+    )
     p_profile.add_argument("--temperature", type=float, default=0.2)
     p_profile.set_defaults(func=_cmd_profile)
 
+    p_fake = subparsers.add_parser(
+        "fake-ollama",
+        help="Serve a deterministic stand-in for the Ollama API (benchmarks without models)",
+    )
+    p_fake.add_argument("--host", default="127.0.0.1")
+    p_fake.add_argument("--port", type=int, default=11435)
+    p_fake.add_argument(
+        "--model",
+        action="append",
+        help=f"Model name to advertise (repeatable, default: {', '.join(DEFAULT_FAKE_MODELS)})",
+    )
+    p_fake.add_argument("--load-ms", type=float, default=0.0, dest="load_ms", help="Cold model load time")
+    p_fake.add_argument("--ttft-ms", type=float, default=0.0, dest="ttft_ms", help="Time to first token")
+    p_fake.add_argument(
+        "--tokens-per-s",
+        type=float,
+        default=0.0,
+        dest="tokens_per_s",
+        help="Generation speed (0 = unthrottled)",
+    )
+    p_fake.add_argument("--response-tokens", type=int, default=48, dest="response_tokens")
+    p_fake.add_argument("--embed-dim", type=int, default=768, dest="embed_dim")
+    p_fake.add_argument(
+        "--error-rate",
+        type=float,
+        default=0.0,
+        dest="error_rate",
+        help="Fraction of chat/generate/embed requests answered with --error-status",
+    )
+    p_fake.add_argument("--error-status", type=int, default=500, dest="error_status")
+    p_fake.add_argument("--seed", type=int, default=0, help="Seed for replies and error injection")
+    p_fake.set_defaults(func=_cmd_fake_ollama)
+
     return parser
 
 
@@ -439,7 +883,28 @@ def main(argv: list[str] | None = None) -> int:
     if func is None:
         parser.print_help()
         return 2
-    return int(func(args))
+    configure_pool_limits(args.http_max_connections, args.http_max_keepalive)
+    configure_scheduler(default_limit=args.model_concurrency)
+    try:
+        configure_admission(args.memory_admission, reserve_gb=args.memory_reserve_gb)
+    except ValueError as exc:
+        console.print(f"[red]Invalid memory admission settings:[/red] {exc}")
+        return 2
+    try:
+        cassette = configure_cassette(args.cassette, args.cassette_mode)
+    except (ValueError, FileNotFoundError) as exc:
+        console.print(f"[red]Invalid cassette:[/red] {exc}")
+        return 2
+    try:
+        return int(func(args))
+    finally:
+        close_clients()
+        if cassette is not None:
+            summary = cassette.summary()
+            console.print(
+                f"Cassette {summary['mode']}: {summary['hits']} replayed, "
+                f"{summary['recorded']} recorded ({summary['path']})"
+            )
 
 
 if __name__ == "__main__":
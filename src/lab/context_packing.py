@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+CHARS_PER_TOKEN = 4.0
+DEFAULT_CONTEXT_BUDGET_FRACTION = 0.6
+_MIN_OVERLAP_CHARS = 8
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    packed: list[dict[str, Any]] = field(default_factory=list)
+    dropped: list[dict[str, Any]] = field(default_factory=list)
+    segment_count: int = 0
+    truncated: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap, model-agnostic token estimate (~4 chars per token)."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _overlap_len(left: str, right: str) -> int:
+    limit = min(len(left), len(right))
+    for size in range(limit, _MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_texts(left: str, right: str) -> str:
+    overlap = _overlap_len(left, right)
+    if overlap:
+        return left + right[overlap:]
+    return f"{left}\n{right}"
+
+
+def _chunk_index(item: dict[str, Any]) -> int | None:
+    try:
+        return int(item["chunk_id"])
+    except (TypeError, ValueError):
+        return None
+
+
+def _segments(items: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    """Group items into runs of consecutive chunk ids from the same file.
+
+    Segments are ordered by the best score they contain so the most relevant
+    evidence stays at the top of the prompt.
+    """
+    by_path: dict[str, list[dict[str, Any]]] = {}
+    for item in items:
+        by_path.setdefault(item["path"], []).append(item)
+
+    segments: list[list[dict[str, Any]]] = []
+    for path_items in by_path.values():
+        current: list[dict[str, Any]] = []
+        indexed = [item for item in path_items if _chunk_index(item) is not None]
+        # Chunks without a numeric id cannot be proven adjacent; keep them standalone.
+        segments.extend([item] for item in path_items if _chunk_index(item) is None)
+        for item in sorted(indexed, key=lambda it: _chunk_index(it) or 0):
+            if current and _chunk_index(item) != (_chunk_index(current[-1]) or 0) + 1:
+                segments.append(current)
+                current = []
+            current.append(item)
+        if current:
+            segments.append(current)
+    return sorted(segments, key=lambda seg: max(float(it["score"]) for it in seg), reverse=True)
+
+
+def _render_segment(segment: list[dict[str, Any]]) -> str:
+    text = segment[0]["full_text"]
+    for item in segment[1:]:
+        text = _merge_texts(text, item["full_text"])
+    chunk_ids = ", ".join(str(item["chunk_id"]) for item in segment)
+    return "\n".join(["---", f"path: {segment[0]['path']}", f"chunk_id: {chunk_ids}", "text:", text])
+
+
+def render_context(items: list[dict[str, Any]]) -> str:
+    if not items:
+        return "(no retrieved context)"
+    return "\n".join(_render_segment(segment) for segment in _segments(items))
+
+
+def pack_context(retrieved: list[dict[str, Any]], token_budget: int) -> PackedContext:
+    """Greedily pack retrieved chunks by score into a token budget.
+
+    Adjacent chunks from the same file are merged and their shared overlap is
+    emitted once, so a neighbouring chunk usually costs less than its raw size.
+    """
+    packed: list[dict[str, Any]] = []
+    dropped: list[dict[str, Any]] = []
+    text = render_context([])
+    tokens = 0
+    for item in sorted(retrieved, key=lambda it: float(it["score"]), reverse=True):
+        candidate = render_context([*packed, item])
+        candidate_tokens = estimate_tokens(candidate)
+        if candidate_tokens <= token_budget:
+            packed.append(item)
+            text, tokens = candidate, candidate_tokens
+        else:
+            dropped.append(item)
+
+    truncated = False
+    if not packed and dropped and token_budget > 0:
+        # Nothing fits whole: keep a prefix of the best chunk rather than send no evidence.
+        best = dropped.pop(0)
+        header_tokens = estimate_tokens(render_context([{**best, "full_text": ""}]))
+        keep_chars = max(0, int((token_budget - header_tokens) * CHARS_PER_TOKEN))
+        packed = [{**best, "full_text": best["full_text"][:keep_chars]}]
+        text = render_context(packed)
+        tokens = estimate_tokens(text)
+        truncated = True
+
+    return PackedContext(
+        text=text,
+        tokens=tokens,
+        packed=packed,
+        dropped=dropped,
+        segment_count=len(_segments(packed)),
+        truncated=truncated,
+    )
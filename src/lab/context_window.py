@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Any
+
+from lab.modelspec import get_hardware_profile
+
+AUTO_NUM_CTX = "auto"
+# Coarse power-of-two buckets: Ollama reloads a model whenever num_ctx changes,
+# so fine-grained sizing would trade KV-cache memory for constant reloads.
+NUM_CTX_BUCKETS = (2048, 4096, 8192, 16384, 32768)
+DEFAULT_EXPECTED_OUTPUT_TOKENS = 512
+_FALLBACK_MAX_NUM_CTX = 8192
+
+NumCtx = int | str
+
+
+def parse_num_ctx(value: Any) -> NumCtx:
+    """Accept a positive integer or the literal "auto" (CLI, YAML and form input)."""
+    if isinstance(value, str) and value.strip().lower() == AUTO_NUM_CTX:
+        return AUTO_NUM_CTX
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"num_ctx must be a positive integer or '{AUTO_NUM_CTX}', got {value!r}") from None
+    if parsed <= 0:
+        raise ValueError(f"num_ctx must be > 0, got {parsed}")
+    return parsed
+
+
+def is_auto(num_ctx: NumCtx) -> bool:
+    return num_ctx == AUTO_NUM_CTX
+
+
+def max_auto_num_ctx() -> int:
+    try:
+        return get_hardware_profile().cautious_max_num_ctx
+    except (OSError, KeyError, ValueError):
+        return _FALLBACK_MAX_NUM_CTX
+
+
+def select_num_ctx(
+    prompt_tokens: int,
+    expected_output_tokens: int = DEFAULT_EXPECTED_OUTPUT_TOKENS,
+    max_num_ctx: int | None = None,
+) -> int:
+    """Return the smallest bucket that fits prompt plus expected output, capped."""
+    cap = max_num_ctx if max_num_ctx is not None else max_auto_num_ctx()
+    needed = prompt_tokens + expected_output_tokens
+    allowed = [bucket for bucket in NUM_CTX_BUCKETS if bucket <= cap]
+    for bucket in allowed:
+        if bucket >= needed:
+            return bucket
+    return cap
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any
+
+from lab.ollama_client import KeepAlive, OllamaClient, get_client
+
+DEFAULT_EMBED_BATCH_SIZE = 32
+
+
+@dataclass
+class EmbeddingResult:
+    vectors: list[array] = field(default_factory=list)
+    batches: list[dict[str, Any]] = field(default_factory=list)
+
+    def summary(self) -> dict[str, Any]:
+        total_ms = sum(batch["latency_ms"] for batch in self.batches)
+        return {
+            "batch_count": len(self.batches),
+            "total_ms": round(total_ms, 2),
+            "inputs_per_sec": round(len(self.vectors) / (total_ms / 1000), 2) if total_ms > 0 else None,
+            "batches": self.batches,
+        }
+
+
+def response_vectors(data: dict[str, Any]) -> list[array]:
+    """float32 vectors from an /api/embed response, as both client paths return them."""
+    return [array("f", vector) for vector in data["embeddings"]]
+
+
+class EmbeddingClient:
+    """Batch embeddings straight from Ollama's /api/embed as float32 arrays.
+
+    Inputs are sent `batch_size` at a time over the shared pooled client; each
+    batch's wall time and Ollama counters are kept on the result.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+        truncate: bool = True,
+        keep_alive: KeepAlive | None = None,
+        client: OllamaClient | None = None,
+    ) -> None:
+        if batch_size <= 0:
+            raise ValueError("batch_size must be > 0")
+        self.model = model
+        self.batch_size = batch_size
+        self.truncate = truncate
+        self.keep_alive = keep_alive
+        self.client = client or get_client()
+
+    def embed(self, texts: list[str]) -> EmbeddingResult:
+        result = EmbeddingResult()
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start : start + self.batch_size]
+            started = time.perf_counter()
+            data = self.client.embed(self.model, batch, truncate=self.truncate, keep_alive=self.keep_alive)
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            result.vectors.extend(response_vectors(data))
+            total_ns = data.get("total_duration")
+            result.batches.append(
+                {
+                    "batch_index": len(result.batches),
+                    "size": len(batch),
+                    "latency_ms": latency_ms,
+                    "prompt_eval_count": data.get("prompt_eval_count"),
+                    "total_duration_ms": round(total_ns / 1_000_000, 2) if total_ns is not None else None,
+                }
+            )
+        return result
+
+    def embed_query(self, text: str) -> array:
+        return self.embed([text]).vectors[0]
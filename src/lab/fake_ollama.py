@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import orjson
+
+DEFAULT_FAKE_MODELS = ("llama3:latest", "nomic-embed-text:latest")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class FakeOllamaConfig:
+    """Behaviour of the stand-in server; all delays are wall-clock sleeps."""
+
+    models: list[str] = field(default_factory=lambda: list(DEFAULT_FAKE_MODELS))
+    # Paid by the first request to a model, and again after it is unloaded (keep_alive 0).
+    load_ms: float = 0.0
+    ttft_ms: float = 0.0
+    # 0 streams tokens as fast as the socket allows.
+    tokens_per_s: float = 0.0
+    response_tokens: int = 48
+    embed_dim: int = 768
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.models:
+            raise ValueError("models must not be empty")
+        if not 0.0 <= self.error_rate <= 1.0:
+            raise ValueError("error_rate must be between 0 and 1")
+        if self.embed_dim <= 0 or self.response_tokens <= 0:
+            raise ValueError("embed_dim and response_tokens must be > 0")
+        if min(self.load_ms, self.ttft_ms, self.tokens_per_s) < 0:
+            raise ValueError("load_ms, ttft_ms and tokens_per_s must be >= 0")
+
+
+def hash_embedding(text: str, dim: int) -> list[float]:
+    """Deterministic bag-of-words feature hashing, L2-normalized.
+
+    Texts sharing words get positive cosine similarity, so retrieval over a
+    fake index still ranks relevant chunks first.
+    """
+    vec = [0.0] * dim
+    for token in _WORD_RE.findall(text.lower()) or [text]:
+        value = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[value % dim] += 1.0 if value >> 63 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def fake_reply_tokens(model: str, prompt: str, count: int, seed: int = 0) -> list[str]:
+    """Pick `count` words from the prompt, seeded by (seed, model, prompt)."""
+    words = _WORD_RE.findall(prompt.lower()) or ["ok"]
+    digest = hashlib.blake2b(f"{seed}\0{model}\0{prompt}".encode(), digest_size=8).digest()
+    rng = random.Random(int.from_bytes(digest, "little"))
+    return [(" " if i else "") + rng.choice(words) for i in range(count)]
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def _ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Threaded HTTP server speaking the subset of the Ollama API this lab uses."""
+
+    daemon_threads = True
+
+    def __init__(self, config: FakeOllamaConfig, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _FakeOllamaHandler)
+        self.config = config
+        self.loaded: set[str] = set()
+        self.request_counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def resolve(self, model: str) -> str | None:
+        for name in self.config.models:
+            if model == name or f"{model}:latest" == name or model == f"{name}:latest":
+                return name
+        return None
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def inject_error(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.config.error_rate
+
+    def ensure_loaded(self, model: str) -> float:
+        """Load `model` if cold; return the load time in seconds."""
+        with self._load_lock:
+            if model in self.loaded:
+                return 0.0
+            load_s = self.config.load_ms / 1000
+            time.sleep(load_s)
+            self.loaded.add(model)
+            return load_s
+
+    def unload(self, model: str) -> None:
+        with self._load_lock:
+            self.loaded.discard(model)
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients that hang up mid-stream (cancellations, hedging) are routine here.
+        pass
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    server: FakeOllamaServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+    def _send_json(self, status: int, body: dict[str, Any]) -> None:
+        data = orjson.dumps(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_line(self, body: dict[str, Any]) -> None:
+        data = orjson.dumps(body) + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _read_body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return orjson.loads(self.rfile.read(length)) if length else {}
+
+    def do_GET(self) -> None:
+        self.server.count(self.path)
+        cfg = self.server.config
+        if self.path == "/api/tags":
+            models = [
+                {"name": name, "model": name, "modified_at": _now(), "size": 0, "digest": "fake"}
+                for name in cfg.models
+            ]
+            self._send_json(200, {"models": models})
+        elif self.path == "/api/ps":
+            loaded = sorted(self.server.loaded)
+            self._send_json(200, {"models": [{"name": name, "model": name, "size": 0} for name in loaded]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/":
+            self._send_json(200, {"status": "Ollama is running"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        self.server.count(self.path)
+        routes = {
+            "/api/chat": self._chat,
+            "/api/generate": self._generate,
+            "/api/embed": self._embed,
+            "/api/embeddings": self._embeddings,
+        }
+        handler = routes.get(self.path)
+        if handler is None:
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            body = self._read_body()
+        except orjson.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON body"})
+            return
+        model = self.server.resolve(str(body.get("model") or ""))
+        if model is None:
+            self._send_json(404, {"error": f'model "{body.get("model")}" not found, try pulling it first'})
+            return
+        if self.server.inject_error():
+            self._send_json(self.server.config.error_status, {"error": "fake-ollama injected failure"})
+            return
+        handler(model, body)
+
+    def _unload_requested(self, model: str, body: dict[str, Any]) -> bool:
+        if body.get("keep_alive") in (0, "0", "0s"):
+            self.server.unload(model)
+            return True
+        return False
+
+    def _reply(self, model: str, body: dict[str, Any], prompt: str, chat: bool) -> None:
+        cfg = self.server.config
+        started = time.perf_counter()
+        load_s = self.server.ensure_loaded(model)
+        tokens = fake_reply_tokens(model, prompt, cfg.response_tokens, cfg.seed)
+        token_gap_s = 1 / cfg.tokens_per_s if cfg.tokens_per_s else 0.0
+        time.sleep(cfg.ttft_ms / 1000)
+        prompt_eval_s = time.perf_counter() - started - load_s
+
+        def chunk(text: str, done: bool) -> dict[str, Any]:
+            base: dict[str, Any] = {"model": model, "created_at": _now(), "done": done}
+            if chat:
+                base["message"] = {"role": "assistant", "content": text}
+            else:
+                base["response"] = text
+            return base
+
+        def final(text: str) -> dict[str, Any]:
+            total_s = time.perf_counter() - started
+            return {
+                **chunk(text, True),
+                "done_reason": "stop",
+                "total_duration": _ns(total_s),
+                "load_duration": _ns(load_s),
+                "prompt_eval_count": len(_WORD_RE.findall(prompt)),
+                "prompt_eval_duration": _ns(prompt_eval_s),
+                "eval_count": len(tokens),
+                "eval_duration": _ns(total_s - load_s - prompt_eval_s),
+            }
+
+        if body.get("stream", True):
+            self._start_stream()
+            for index, token in enumerate(tokens):
+                if index:
+                    time.sleep(token_gap_s)
+                self._write_line(chunk(token, False))
+            self._write_line(final(""))
+            self._end_stream()
+            return
+        time.sleep(token_gap_s * max(len(tokens) - 1, 0))
+        self._send_json(200, final("".join(tokens)))
+
+    def _chat(self, model: str, body: dict[str, Any]) -> None:
+        messages = body.get("messages") or []
+        if not messages and self._unload_requested(model, body):
+            self._send_json(200, {"model": model, "created_at": _now(), "done": True, "done_reason": "unload"})
+            return
+        user = [m.get("content") or "" for m in messages if m.get("role") == "user"]
+        self._reply(model, body, user[-1] if user else "", chat=True)
+
+    def _generate(self, model: str, body: dict[str, Any]) -> None:
+        prompt = str(body.get("prompt") or "")
+        if self._unload_requested(model, body):
+            self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "unload"})
+            return
+        if not prompt:
+            # Ollama's preload idiom: an empty prompt only loads the model.
+            load_s = self.server.ensure_loaded(model)
+            self._send_json(
+                200,
+                {"model": model, "response": "", "done": True, "done_reason": "load", "load_duration": _ns(load_s)},
+            )
+            return
+        self._reply(model, body, prompt, chat=False)
+
+    def _embed(self, model: str, body: dict[str, Any]) -> None:
+        if self._unload_requested(model, body):
+            self._send_json(200, {"model": model, "embeddings": []})
+            return
+        started = time.perf_counter()
+        load_s = self.server.ensure_loaded(model)
+        inputs = body.get("input")
+        texts = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        dim = self.server.config.embed_dim
+        self._send_json(
+            200,
+            {
+                "model": model,
+                "embeddings": [hash_embedding(str(text), dim) for text in texts],
+                "total_duration": _ns(time.perf_counter() - started),
+                "load_duration": _ns(load_s),
+                "prompt_eval_count": sum(len(_WORD_RE.findall(str(text))) for text in texts),
+            },
+        )
+
+    def _embeddings(self, model: str, body: dict[str, Any]) -> None:
+        self.server.ensure_loaded(model)
+        prompt = str(body.get("prompt") or "")
+        self._send_json(200, {"embedding": hash_embedding(prompt, self.server.config.embed_dim)})
+
+
+def start_fake_ollama(
+    config: FakeOllamaConfig | None = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> FakeOllamaServer:
+    """Serve on a background daemon thread (port 0 picks a free port); call `shutdown()` to stop."""
+    server = FakeOllamaServer(config or FakeOllamaConfig(), host, port)
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
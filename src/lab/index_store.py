@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from lab.embeddings import DEFAULT_EMBED_BATCH_SIZE
+from lab.ingest import _sorted_corpus_files, ingest_corpus
+
+INDEX_STORE_DIR = Path("runs") / "indexes"
+# Written into every run directory that uses a stored index; `gc_indexes` keeps what these name.
+INDEX_REF_NAME = "index_ref.json"
+# Bump when the index layout or chunking changes so old entries stop matching.
+INDEX_FORMAT_VERSION = 1
+_STALE_BUILD_S = 3600.0
+# `ensure_index` touches what it returns; gc leaves recently touched indexes for the run to reference.
+_IN_USE_GRACE_S = 600.0
+
+
+@dataclass
+class IndexRef:
+    key: str
+    path: Path
+    reused: bool
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"key": self.key, "path": str(self.path.as_posix()), "reused": self.reused}
+
+
+def index_key(corpus_dir: str | Path, embed_model_name: str, chunk_size_chars: int, overlap_chars: int) -> str:
+    """Hash of everything an index's contents depend on.
+
+    Chunk paths are stored as given, so the corpus path is part of the key
+    alongside each file's content hash, the embed model and chunking params.
+    The embed batch size only changes speed and is left out.
+    """
+    corpus_path = Path(corpus_dir)
+    if not corpus_path.exists():
+        raise FileNotFoundError(f"Corpus directory not found: {corpus_path}")
+    files = [
+        [path.as_posix(), hashlib.sha256(path.read_bytes()).hexdigest()]
+        for path in _sorted_corpus_files(corpus_path)
+    ]
+    payload = {
+        "format": INDEX_FORMAT_VERSION,
+        "files": files,
+        "embed_model": embed_model_name,
+        "chunk_size_chars": chunk_size_chars,
+        "overlap_chars": overlap_chars,
+    }
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()[:24]
+
+
+def ensure_index(
+    corpus_dir: str | Path,
+    embed_model_name: str,
+    chunk_size_chars: int,
+    overlap_chars: int,
+    embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+    store_dir: Path | None = None,
+) -> IndexRef:
+    """Return the stored index for these inputs, building it only on a miss.
+
+    Builds go to a private temp directory that is renamed into place, so
+    concurrent runs never read a half-written index; if two runs build the
+    same key, the first rename wins and the other build is discarded. The
+    returned index's mtime is refreshed, which keeps `gc_indexes` off it
+    until the caller has written its index ref.
+    """
+    store = store_dir or INDEX_STORE_DIR
+    key = index_key(corpus_dir, embed_model_name, chunk_size_chars, overlap_chars)
+    path = store / key
+    # Touch before checking, so a concurrent gc either already removed it or now sees it in use.
+    with contextlib.suppress(FileNotFoundError):
+        os.utime(path)
+    if (path / "index.sqlite").exists():
+        return IndexRef(key, path, reused=True)
+
+    build_dir = store / f"{key}.tmp-{os.getpid()}-{time.monotonic_ns()}"
+    try:
+        ingest_corpus(
+            corpus_dir=corpus_dir,
+            index_dir=build_dir,
+            embed_model_name=embed_model_name,
+            chunk_size_chars=chunk_size_chars,
+            overlap_chars=overlap_chars,
+            embed_batch_size=embed_batch_size,
+        )
+        try:
+            build_dir.rename(path)
+        except OSError:
+            if not (path / "index.sqlite").exists():
+                raise
+        os.utime(path)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return IndexRef(key, path, reused=False)
+
+
+def write_index_ref(run_dir: Path, ref: IndexRef | list[IndexRef]) -> None:
+    """Record the index a run uses; a sweep records a list, one per chunking."""
+    data = [item.as_dict() for item in ref] if isinstance(ref, list) else ref.as_dict()
+    (run_dir / INDEX_REF_NAME).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+
+def _read_refs(run_dir: Path) -> list[dict[str, Any]]:
+    try:
+        data = orjson.loads((run_dir / INDEX_REF_NAME).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return []
+    return data if isinstance(data, list) else [data]
+
+
+def read_index_ref(run_dir: Path) -> IndexRef | None:
+    refs = _read_refs(run_dir)
+    if len(refs) != 1:
+        return None
+    return IndexRef(refs[0]["key"], Path(refs[0]["path"]), reused=True)
+
+
+def referenced_keys(runs_dir: Path = Path("runs")) -> set[str]:
+    keys: set[str] = set()
+    if runs_dir.exists():
+        for ref_path in runs_dir.glob(f"*/{INDEX_REF_NAME}"):
+            keys.update(ref["key"] for ref in _read_refs(ref_path.parent))
+    return keys
+
+
+def gc_indexes(
+    runs_dir: Path = Path("runs"),
+    store_dir: Path | None = None,
+    dry_run: bool = False,
+) -> list[dict[str, Any]]:
+    """Delete stored indexes no run directory references, plus abandoned builds.
+
+    Indexes returned by `ensure_index` in the last `_IN_USE_GRACE_S` seconds
+    are kept even if unreferenced: a starting run writes its index ref only
+    after `ensure_index` returns. Returns one entry per removed (or, with `dry_run`, removable) directory.
+    """
+    store = store_dir or INDEX_STORE_DIR
+    if not store.exists():
+        return []
+    keep = referenced_keys(runs_dir)
+    now = time.time()
+    removed: list[dict[str, Any]] = []
+    for entry in sorted(store.iterdir()):
+        if not entry.is_dir():
+            continue
+        if ".tmp-" in entry.name:
+            # A build in progress must not be deleted under its writer.
+            if now - entry.stat().st_mtime < _STALE_BUILD_S:
+                continue
+            reason = "abandoned build"
+        elif entry.name in keep or now - entry.stat().st_mtime < _IN_USE_GRACE_S:
+            continue
+        else:
+            reason = "unreferenced"
+        size = sum(f.stat().st_size for f in entry.rglob("*") if f.is_file())
+        removed.append({"key": entry.name, "path": str(entry.as_posix()), "bytes": size, "reason": reason})
+        if not dry_run:
+            shutil.rmtree(entry, ignore_errors=True)
+    return removed
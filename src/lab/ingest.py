@@ -6,8 +6,8 @@ from pathlib import Path
 from typing import Any
 
 import orjson
-from langchain_ollama import OllamaEmbeddings
 
+from lab.embeddings import DEFAULT_EMBED_BATCH_SIZE, EmbeddingClient
 from lab.text_chunking import chunk_text
 
 
@@ -25,6 +25,7 @@ def ingest_corpus(
     embed_model_name: str,
     chunk_size_chars: int = 900,
     overlap_chars: int = 120,
+    embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
 ) -> dict[str, Any]:
     corpus_path = Path(corpus_dir)
     if not corpus_path.exists():
@@ -54,8 +55,8 @@ def ingest_corpus(
     if not texts:
         raise ValueError("Corpus contained no chunkable text")
 
-    embedder = OllamaEmbeddings(model=embed_model_name)
-    vectors = embedder.embed_documents(texts)
+    embedded = EmbeddingClient(embed_model_name, batch_size=embed_batch_size).embed(texts)
+    vectors = embedded.vectors
     if len(vectors) != len(records):
         raise RuntimeError("Embedding count did not match chunk count")
 
@@ -84,7 +85,7 @@ def ingest_corpus(
                     rec["path"],
                     rec["chunk_id"],
                     rec["text"],
-                    orjson.dumps(vec).decode("utf-8"),
+                    orjson.dumps(vec.tolist()).decode("utf-8"),
                 )
                 for rec, vec in zip(records, vectors, strict=True)
             ],
@@ -99,6 +100,7 @@ def ingest_corpus(
             "chunk_size_chars": chunk_size_chars,
             "overlap_chars": overlap_chars,
         },
+        "embedding": {"batch_size": embed_batch_size, **embedded.summary()},
         "timestamp": datetime.now(UTC).isoformat(),
         "index_db_path": str(db_path.as_posix()),
     }
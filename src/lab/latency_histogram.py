@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from typing import Any
+
+# Quantile estimates are within this relative error of a true sample value.
+DEFAULT_PRECISION = 0.01
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class LatencyHistogram:
+    """Streaming latency histogram with log-sized buckets.
+
+    Bucket `i` holds values in `(gamma**(i-1), gamma**i]` with
+    `gamma = (1 + precision) / (1 - precision)`, so every quantile is reported
+    within `precision` relative error while memory grows only with the log of
+    the latency range (at most about 700 buckets from 1 ms to 1000 s at 1%).
+    Count, sum, min and max are exact. Histograms with the same precision
+    merge by adding bucket counts, so runs can be combined from their
+    serialized form without the raw latencies.
+    """
+
+    def __init__(self, precision: float = DEFAULT_PRECISION) -> None:
+        if not 0 < precision < 1:
+            raise ValueError("precision must be in (0, 1)")
+        self.precision = precision
+        self._gamma = (1 + precision) / (1 - precision)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: dict[int, int] = {}
+        # Zero latencies (errored tasks, cache hits) have no log bucket.
+        self.zero_count = 0
+        self.count = 0
+        self.sum_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = -math.inf
+
+    def record(self, value_ms: float) -> None:
+        value_ms = float(value_ms)
+        if value_ms <= 0:
+            self.zero_count += 1
+            value_ms = 0.0
+        else:
+            index = math.ceil(math.log(value_ms) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.sum_ms += value_ms
+        self.min_ms = min(self.min_ms, value_ms)
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def merge(self, other: LatencyHistogram) -> LatencyHistogram:
+        """Add `other`'s samples to this histogram in place and return it."""
+        if other.precision != self.precision:
+            raise ValueError(f"cannot merge histograms with precision {self.precision} and {other.precision}")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+        self.min_ms = min(self.min_ms, other.min_ms)
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+
+    @classmethod
+    def merged(cls, histograms: Iterable[LatencyHistogram], precision: float = DEFAULT_PRECISION) -> LatencyHistogram:
+        combined = cls(precision)
+        for histogram in histograms:
+            combined.merge(histogram)
+        return combined
+
+    def quantile(self, q: float) -> float:
+        """Estimated latency at quantile `q` (nearest rank), clamped to the observed range."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(q * self.count) or 1
+        if rank <= self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # The bucket midpoint in relative terms, which bounds the relative error.
+                estimate = 2 * self._gamma**index / (self._gamma + 1)
+                return min(max(estimate, self.min_ms), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> dict[str, float]:
+        """`count`, `avg_ms`, `min_ms`, `max_ms` and `p50_ms` ... `p99_ms`, rounded for summaries."""
+        if self.count == 0:
+            return {"count": 0, "avg_ms": 0.0, "min_ms": 0.0, "max_ms": 0.0, **{_label(q): 0.0 for q in QUANTILES}}
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum_ms / self.count, 2),
+            "min_ms": round(self.min_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            **{_label(q): round(self.quantile(q), 2) for q in QUANTILES},
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "precision": self.precision,
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 3),
+            "min_ms": self.min_ms if self.count else None,
+            "max_ms": self.max_ms if self.count else None,
+            "zero_count": self.zero_count,
+            # JSON object keys are strings; bucket indexes are restored by `from_dict`.
+            "buckets": {str(index): self.buckets[index] for index in sorted(self.buckets)},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> LatencyHistogram:
+        histogram = cls(float(data["precision"]))
+        histogram.buckets = {int(index): int(count) for index, count in data["buckets"].items()}
+        histogram.zero_count = int(data.get("zero_count") or 0)
+        histogram.count = int(data["count"])
+        histogram.sum_ms = float(data["sum_ms"])
+        if histogram.count:
+            histogram.min_ms = float(data["min_ms"])
+            histogram.max_ms = float(data["max_ms"])
+        return histogram
+
+
+def _label(q: float) -> str:
+    return f"p{round(q * 100):d}_ms"
@@ -1,34 +1,156 @@
 from __future__ import annotations
 
-import subprocess
+import copy
+import threading
+import time
+from pathlib import Path
 from typing import Literal
 
-from lab.modelspec import ModelEntry, get_hardware_profile, iter_all_model_entries, load_models_config
-from lab.ollama_client import parse_ollama_list_output
-
-TaskName = Literal["chat", "rag_qa", "embeddings"]
+import orjson
 
+from lab.cassette import active_cassette
+from lab.modelspec import ModelEntry, ModelsConfig, get_hardware_profile, iter_all_model_entries, load_models_config
+from lab.ollama_client import get_client
 
-def _base_name(model_name: str) -> str:
-    return model_name.split(":", 1)[0].strip().lower()
+TaskName = Literal["chat", "rag_qa", "embeddings"]
 
+# Installed models change only on pull/rm, so a short TTL removes almost every /api/tags call.
+DISCOVERY_TTL_S = 30.0
+DISCOVERY_CACHE_PATH = Path("runs") / "cache" / "installed_models.json"
 
-def _matches(installed_name: str, policy_name: str) -> bool:
-    return _base_name(installed_name) == policy_name.strip().lower()
+_discovery_lock = threading.Lock()
+_installed_cache: tuple[float, str, frozenset[str]] | None = None
+_policy_index: PolicyIndex | None = None
 
 
-def _find_installed_match(policy_name: str, installed: set[str]) -> str | None:
-    for name in sorted(installed):
-        if _matches(name, policy_name):
-            return name
-    return None
+def _base_name(model_name: str) -> str:
+    return model_name.split(":", 1)[0].strip().lower()
 
 
-def installed_models() -> set[str]:
-    proc = subprocess.run(["ollama", "list"], capture_output=True, text=True, check=False)
-    if proc.returncode != 0:
-        raise RuntimeError(proc.stderr.strip() or "Failed to run `ollama list`")
-    return set(parse_ollama_list_output(proc.stdout))
+class PolicyIndex:
+    """models.yaml policy joined with one installed-model set.
+
+    Built once per (config, installed set): installed names are keyed by
+    base name and policy entries are grouped per task (own or fallback
+    roles) in priority order, so matching an entry is a dict lookup and each
+    task's recommendation is computed at most once.
+    """
+
+    def __init__(self, cfg: ModelsConfig, installed: frozenset[str]) -> None:
+        self.cfg = cfg
+        self.installed = installed
+        self._installed_by_base: dict[str, str] = {}
+        for name in sorted(installed):
+            self._installed_by_base.setdefault(_base_name(name), name)
+        self.entries = list(iter_all_model_entries())
+        self._task_entries: dict[str, list[ModelEntry]] = {}
+        self._recommendations: dict[str, dict] = {}
+        self._status: dict[str, list[ModelEntry]] | None = None
+        self._lock = threading.Lock()
+
+    def match(self, policy_name: str) -> str | None:
+        """Installed model name whose base name equals `policy_name`, if any."""
+        return self._installed_by_base.get(policy_name.strip().lower())
+
+    def task_entries(self, task: TaskName) -> list[ModelEntry]:
+        """Policy entries serving `task` directly or via fallback roles, highest priority first."""
+        entries = self._task_entries.get(task)
+        if entries is None:
+            fallback_roles = set(self.cfg.fallback_rules.prefer_roles.get(task, []))
+            matching = [e for e in self.entries if task in e.roles or fallback_roles.intersection(e.roles)]
+            entries = self._task_entries[task] = sorted(matching, key=lambda item: item.priority, reverse=True)
+        return entries
+
+    def status(self) -> dict[str, list[ModelEntry]]:
+        with self._lock:
+            if self._status is None:
+                self._status = _policy_status(self)
+            return self._status
+
+    def recommendation(self, task: TaskName) -> dict:
+        with self._lock:
+            cached = self._recommendations.get(task)
+            if cached is None:
+                cached = self._recommendations[task] = _recommend(task, self)
+            return cached
+
+
+def _discovery_source() -> str:
+    client = get_client()
+    return "pool" if client.pool is not None else client.base_url
+
+
+def _read_disk_cache(source: str) -> frozenset[str] | None:
+    try:
+        data = orjson.loads(DISCOVERY_CACHE_PATH.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if data.get("source") != source or time.time() - float(data.get("fetched_at", 0)) > DISCOVERY_TTL_S:
+        return None
+    return frozenset(data.get("models") or [])
+
+
+def _write_disk_cache(source: str, models: frozenset[str]) -> None:
+    try:
+        DISCOVERY_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"source": source, "fetched_at": time.time(), "models": sorted(models)}
+        DISCOVERY_CACHE_PATH.write_bytes(orjson.dumps(payload))
+    except OSError:
+        pass  # The cache only saves a round trip; a read-only checkout still works.
+
+
+def installed_models(refresh: bool = False) -> set[str]:
+    """Installed model names, cached for `DISCOVERY_TTL_S`.
+
+    The in-process cache serves the web app and long runs; the on-disk copy
+    lets back-to-back CLI invocations skip discovery too. Lookups go through
+    the HTTP API, falling back to `ollama list`. With a cassette active the
+    disk copy is bypassed, so the model list is recorded into (or replayed
+    from) the cassette like any other Ollama call.
+    """
+    return set(_installed(refresh))
+
+
+def _installed(refresh: bool = False) -> frozenset[str]:
+    global _installed_cache
+    source = _discovery_source()
+    cassette = active_cassette()
+    if cassette is not None:
+        source = f"{source} cassette={cassette.path}:{cassette.mode}"
+    with _discovery_lock:
+        cached = _installed_cache
+        fresh = cached is not None and time.monotonic() - cached[0] < DISCOVERY_TTL_S
+        if not refresh and fresh and cached[1] == source:
+            return cached[2]
+    models = None if refresh or cassette is not None else _read_disk_cache(source)
+    if models is None:
+        models = frozenset(get_client().list_models())
+        if cassette is None:
+            _write_disk_cache(source, models)
+    with _discovery_lock:
+        _installed_cache = (time.monotonic(), source, models)
+    return models
+
+
+def invalidate_installed_models() -> None:
+    """Forget cached discovery results (call after pulling or removing models)."""
+    global _installed_cache, _policy_index
+    with _discovery_lock:
+        _installed_cache = None
+        _policy_index = None
+    DISCOVERY_CACHE_PATH.unlink(missing_ok=True)
+
+
+def policy_index() -> PolicyIndex:
+    """The `PolicyIndex` for the current config and installed models, rebuilt only when either changes."""
+    global _policy_index
+    cfg = load_models_config()
+    installed = _installed()
+    with _discovery_lock:
+        index = _policy_index
+        if index is None or index.cfg is not cfg or index.installed != installed:
+            index = _policy_index = PolicyIndex(cfg, installed)
+    return index
 
 
 def policy_models() -> list[ModelEntry]:
@@ -36,11 +158,14 @@ def policy_models() -> list[ModelEntry]:
 
 
 def match_installed_to_policy() -> dict[str, list[ModelEntry]]:
-    cfg = load_models_config()
-    installed = installed_models()
+    return {key: list(entries) for key, entries in policy_index().status().items()}
+
+
+def _policy_status(index: PolicyIndex) -> dict[str, list[ModelEntry]]:
+    cfg = index.cfg
 
     def available(entries: list[ModelEntry]) -> list[ModelEntry]:
-        return [entry for entry in entries if _find_installed_match(entry.name, installed)]
+        return [entry for entry in entries if index.match(entry.name)]
 
     recommended = cfg.known_good + cfg.preferred_variants + cfg.embedding_models
     return {
@@ -48,57 +173,49 @@ def match_installed_to_policy() -> dict[str, list[ModelEntry]]:
         "available_preferred_variants": available(cfg.preferred_variants),
         "available_embeddings": available(cfg.embedding_models),
         "available_candidates": available(cfg.candidates_reasoning + cfg.candidates_long_context),
-        "missing_recommended": [entry for entry in recommended if not _find_installed_match(entry.name, installed)],
+        "missing_recommended": [entry for entry in recommended if not index.match(entry.name)],
     }
 
 
-def _task_matches_entry(task: TaskName, entry: ModelEntry) -> bool:
-    cfg = load_models_config()
-    if task in entry.roles:
-        return True
-    fallback_roles = cfg.fallback_rules.prefer_roles.get(task, [])
-    return any(role in entry.roles for role in fallback_roles)
-
+def _select_best(
+    index: PolicyIndex, task: TaskName, among: list[ModelEntry] | None = None
+) -> tuple[ModelEntry | None, str | None]:
+    allowed = None if among is None else {id(entry) for entry in among}
+    for entry in index.task_entries(task):
+        if entry.priority < index.cfg.fallback_rules.min_priority:
+            break
+        if (allowed is None or id(entry) in allowed) and (match := index.match(entry.name)):
+            return entry, match
+    return None, None
 
-def _select_best(installed: set[str], entries: list[ModelEntry], task: TaskName) -> tuple[ModelEntry | None, str | None]:
-    cfg = load_models_config()
-    eligible = [
-        entry
-        for entry in entries
-        if entry.priority >= cfg.fallback_rules.min_priority
-        and _task_matches_entry(task, entry)
-        and _find_installed_match(entry.name, installed)
-    ]
-    if not eligible:
-        return None, None
 
-    best = sorted(eligible, key=lambda item: item.priority, reverse=True)[0]
-    return best, _find_installed_match(best.name, installed)
+def recommend(task: TaskName) -> dict:
+    """Recommend a model for `task`; served from the cached `PolicyIndex`."""
+    return copy.deepcopy(policy_index().recommendation(task))
 
 
-def recommend(task: TaskName) -> dict:
-    cfg = load_models_config()
+def _recommend(task: TaskName, index: PolicyIndex) -> dict:
+    cfg = index.cfg
     hardware = get_hardware_profile()
-    installed = installed_models()
 
     chosen_entry: ModelEntry | None = None
     chosen_model_name: str | None = None
     reason = ""
 
     if task in {"chat", "rag_qa"}:
-        match = _find_installed_match("llama3", installed)
+        match = index.match("llama3")
         if match:
             chosen_entry = next((entry for entry in cfg.known_good if entry.name == "llama3"), None)
             chosen_model_name = match
             reason = "Preferred known-good default for chat and RAG QA."
 
     if task == "embeddings" and chosen_entry is None:
-        chosen_entry, chosen_model_name = _select_best(installed, cfg.embedding_models, task)
+        chosen_entry, chosen_model_name = _select_best(index, task, cfg.embedding_models)
         if chosen_entry:
             reason = "Selected highest-priority installed embeddings policy model."
 
     if chosen_entry is None:
-        chosen_entry, chosen_model_name = _select_best(installed, policy_models(), task)
+        chosen_entry, chosen_model_name = _select_best(index, task)
         if chosen_entry:
             reason = "Selected highest-priority installed model matching task or fallback roles."
 
@@ -108,10 +225,9 @@ def recommend(task: TaskName) -> dict:
     }
 
     suggestions: list[str] = []
-    for entry in sorted(policy_models(), key=lambda item: item.priority, reverse=True):
-        if _task_matches_entry(task, entry) and not _find_installed_match(entry.name, installed):
-            if entry.name not in suggestions:
-                suggestions.append(entry.name)
+    for entry in index.task_entries(task):
+        if not index.match(entry.name) and entry.name not in suggestions:
+            suggestions.append(entry.name)
 
     if chosen_model_name is None and not reason:
         reason = "No installed model matched the policy for this task."
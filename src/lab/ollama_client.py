@@ -1,10 +1,65 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import contextlib
+import itertools
+import os
+import socket
 import subprocess
+import sys
+import threading
 import time
-from typing import Any
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import ContextVar, copy_context
+from typing import Any, Self, TypeVar
 
 import httpx
+import orjson
+
+from lab.admission import get_admission_controller, is_local_backend
+from lab.backend_pool import BackendPool, default_backend_pool
+from lab.cassette import active_cassette
+from lab.context_packing import estimate_tokens
+from lab.context_window import NumCtx, is_auto, select_num_ctx
+from lab.scheduler import get_scheduler
+
+DEFAULT_BASE_URL = "http://127.0.0.1:11434"
+DEFAULT_TIMEOUT_S = 60.0
+# A local Ollama serves a handful of parallel requests; more sockets only queue server-side.
+DEFAULT_POOL_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=30.0)
+_pool_limits = DEFAULT_POOL_LIMITS
+# Ollama accepts a duration string ("30m"), seconds, 0 (unload now) or -1 (keep forever).
+DEFAULT_WARM_KEEP_ALIVE = "30m"
+
+KeepAlive = str | int | float
+T = TypeVar("T")
+
+
+def default_base_url() -> str:
+    """`OLLAMA_HOST` (as the Ollama CLI reads it) or `DEFAULT_BASE_URL`."""
+    host = os.environ.get("OLLAMA_HOST", "").strip()
+    if not host:
+        return DEFAULT_BASE_URL
+    return (host if "://" in host else f"http://{host}").rstrip("/")
+
+
+def parse_keep_alive(value: Any) -> KeepAlive:
+    """Normalize CLI/YAML keep_alive input; numeric strings become seconds."""
+    if isinstance(value, int | float) and not isinstance(value, bool):
+        return value
+    text = str(value).strip()
+    if not text:
+        raise ValueError("keep_alive must not be empty")
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
 
 
 def parse_ollama_list_output(output: str) -> list[str]:
@@ -24,18 +79,465 @@ def parse_ollama_list_output(output: str) -> list[str]:
     return models
 
 
+def _chat_payload(
+    model: str,
+    messages: list[dict[str, str]],
+    temperature: float,
+    num_ctx: NumCtx,
+    keep_alive: KeepAlive | None = None,
+) -> tuple[dict[str, Any], int]:
+    if is_auto(num_ctx):
+        num_ctx = select_num_ctx(sum(estimate_tokens(m.get("content", "")) for m in messages))
+    payload: dict[str, Any] = {
+        "model": model,
+        "stream": True,
+        "messages": messages,
+        "options": {"temperature": temperature, "num_ctx": num_ctx},
+    }
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    return payload, int(num_ctx)
+
+
+def _load_request(model: str, keep_alive: KeepAlive, embedding: bool) -> tuple[str, dict[str, Any]]:
+    # An empty prompt/input makes Ollama load (or, with keep_alive=0, unload) the
+    # model without generating anything.
+    if embedding:
+        return "/api/embed", {"model": model, "input": "", "keep_alive": keep_alive}
+    return "/api/generate", {"model": model, "prompt": "", "stream": False, "keep_alive": keep_alive}
+
+
+def _load_result(model: str, data: dict[str, Any], started: float, keep_alive: KeepAlive) -> dict[str, Any]:
+    load_ns = data.get("load_duration")
+    return {
+        "model": model,
+        "keep_alive": keep_alive,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "load_duration_ms": round(load_ns / 1_000_000, 2) if load_ns is not None else None,
+    }
+
+
+def _parse_chat_line(line: str) -> tuple[dict[str, Any], str]:
+    if not line.strip():
+        return {}, ""
+    chunk = orjson.loads(line)
+    if chunk.get("error"):
+        raise RuntimeError(str(chunk["error"]))
+    return chunk, (chunk.get("message") or {}).get("content") or ""
+
+
+_OLLAMA_COUNT_FIELDS = ("prompt_eval_count", "eval_count")
+_OLLAMA_DURATION_FIELDS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+
+
+def ollama_metrics(chunk: dict[str, Any]) -> dict[str, Any]:
+    """Extract Ollama's native counters from a final response, converting ns to ms."""
+    metrics: dict[str, Any] = {field: chunk.get(field) for field in _OLLAMA_COUNT_FIELDS}
+    for field in _OLLAMA_DURATION_FIELDS:
+        value = chunk.get(field)
+        metrics[f"{field}_ms"] = round(value / 1_000_000, 2) if value is not None else None
+    return metrics
+
+
+def _chat_done_event(
+    final: dict[str, Any],
+    parts: list[str],
+    num_ctx: int,
+    timer: StreamTimer,
+) -> dict[str, Any]:
+    text = "".join(parts)
+    final["message"] = {"role": "assistant", "content": text}
+    return {
+        "type": "done",
+        "text": text.strip(),
+        "num_ctx": num_ctx,
+        **timer.summary(),
+        "ollama": ollama_metrics(final),
+        "raw_response_snippet": str(final)[:500],
+    }
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+class StreamTimer:
+    """Track time-to-first-token and inter-token gaps for a streamed generation."""
+
+    def __init__(self, start: float | None = None) -> None:
+        self.start = time.perf_counter() if start is None else start
+        self.first_token_at: float | None = None
+        self.last_token_at: float | None = None
+        self.token_chunks = 0
+        self.max_gap_s = 0.0
+
+    def mark_token(self) -> None:
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        elif self.last_token_at is not None:
+            self.max_gap_s = max(self.max_gap_s, now - self.last_token_at)
+        self.last_token_at = now
+        self.token_chunks += 1
+
+    def summary(self) -> dict[str, Any]:
+        end = time.perf_counter()
+        ttft_ms = None
+        inter_token_ms_avg = None
+        if self.first_token_at is not None:
+            ttft_ms = round((self.first_token_at - self.start) * 1000, 2)
+        if self.first_token_at is not None and self.last_token_at is not None and self.token_chunks > 1:
+            span_s = self.last_token_at - self.first_token_at
+            inter_token_ms_avg = round(span_s * 1000 / (self.token_chunks - 1), 2)
+        return {
+            "latency_ms": round((end - self.start) * 1000, 2),
+            "ttft_ms": ttft_ms,
+            "inter_token_ms_avg": inter_token_ms_avg,
+            "inter_token_ms_max": round(self.max_gap_s * 1000, 2) if self.token_chunks > 1 else None,
+            "token_chunks": self.token_chunks,
+        }
+
+
+_deadline: ContextVar[float | None] = ContextVar("lab_ollama_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """An Ollama call ran past the deadline set by `call_deadline()`."""
+
+
+@contextlib.contextmanager
+def call_deadline(timeout_s: float | None) -> Iterator[None]:
+    """Bound all Ollama calls made in this context (and threads copying it) to `timeout_s` in total.
+
+    Each HTTP request gets the remaining time as its timeout and streamed
+    chats are closed between lines once it runs out, so the request is
+    aborted instead of left generating. Nested deadlines keep the earliest.
+    """
+    if timeout_s is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout_s
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _check_deadline() -> None:
+    deadline = _deadline.get()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded("Ollama call deadline exceeded")
+
+
+def _request_timeout(default_s: float) -> float:
+    """Per-request timeout: `default_s`, shortened to what is left of the active deadline."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default_s
+    _check_deadline()
+    return min(default_s, deadline - time.monotonic())
+
+
+def _remaining_s() -> float | None:
+    """Seconds left of the active deadline (None without one), for waits before any request is sent."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+@contextlib.contextmanager
+def _slot(model: str) -> Iterator[None]:
+    """Hold `model`'s scheduler slot, queueing no longer than the active deadline allows."""
+    with contextlib.ExitStack() as stack:
+        try:
+            stack.enter_context(get_scheduler().slot(model, timeout_s=_remaining_s()))
+        except TimeoutError as exc:
+            raise DeadlineExceeded(f"Ollama call deadline exceeded waiting for a {model} slot") from exc
+        yield
+
+
+@contextlib.asynccontextmanager
+async def _aslot(model: str) -> AsyncIterator[None]:
+    async with contextlib.AsyncExitStack() as stack:
+        try:
+            await stack.enter_async_context(get_scheduler().aslot(model, timeout_s=_remaining_s()))
+        except TimeoutError as exc:
+            raise DeadlineExceeded(f"Ollama call deadline exceeded waiting for a {model} slot") from exc
+        yield
+
+
+def _replaying() -> bool:
+    cassette = active_cassette()
+    return cassette is not None and cassette.mode == "replay"
+
+
+def _should_fail_over(exc: Exception) -> bool:
+    """Connection failures and server errors are worth retrying on another backend."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    return isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code >= 500
+
+
+def _tracked(pool: BackendPool | None, base_url: str, model: str | None) -> contextlib.AbstractContextManager[None]:
+    return pool.track(base_url, model) if pool is not None else contextlib.nullcontext()
+
+
+_hedge_executor: ThreadPoolExecutor | None = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="ollama-hedge")
+        return _hedge_executor
+
+
+class _HedgeAttempt:
+    """One hedged request on its own connection, so a losing attempt can be torn down mid-read.
+
+    Closing an httpx response or client from another thread does not wake a
+    thread blocked reading the socket (Ollama sends nothing until the first
+    token), but shutting the socket down does, and Ollama stops generating
+    once its client disconnects.
+    """
+
+    def __init__(self, timeout_s: float, limits: httpx.Limits) -> None:
+        self.client = httpx.Client(timeout=timeout_s, limits=limits)
+        self.extensions = {"trace": self._trace}
+        self._sockets: list[socket.socket] = []
+        self._lock = threading.Lock()
+        self._aborted = False
+
+    def _trace(self, event: str, info: dict[str, Any]) -> None:
+        if event != "connection.connect_tcp.complete":
+            return
+        sock = info["return_value"].get_extra_info("socket")
+        with self._lock:
+            self._sockets.append(sock)
+            aborted = self._aborted
+        if aborted:
+            _shutdown(sock)
+
+    def abort(self) -> None:
+        with self._lock:
+            self._aborted = True
+            sockets = list(self._sockets)
+        for sock in sockets:
+            _shutdown(sock)
+
+
+def _shutdown(sock: socket.socket) -> None:
+    with contextlib.suppress(OSError):
+        sock.shutdown(socket.SHUT_RDWR)
+
+
+async def _prepend(first: str | None, rest: AsyncIterator[str]) -> AsyncIterator[str]:
+    if first is not None:
+        yield first
+    async for line in rest:
+        yield line
+
+
 class OllamaClient:
-    def __init__(self, base_url: str = "http://127.0.0.1:11434", timeout_s: float = 60.0) -> None:
+    """Ollama HTTP client holding one keep-alive connection pool for its lifetime.
+
+    Prefer `get_client()` so CLI commands, the runner and the profiler share
+    pools instead of paying connection setup on every call. With a
+    `BackendPool`, each request is routed to the best backend for its model
+    and fails over to the next one on connection errors or 5xx responses.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        limits: httpx.Limits | None = None,
+        pool: BackendPool | None = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout_s = timeout_s
+        self.limits = limits or _pool_limits
+        self.pool = pool
+        self._client: httpx.Client | None = None
+        self._lock = threading.Lock()
+
+    def _http(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None or self._client.is_closed:
+                self._client = httpx.Client(timeout=self.timeout_s, limits=self.limits)
+            return self._client
+
+    def close(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _routes(self, model: str | None) -> list[str]:
+        return self.pool.candidates(model) if self.pool is not None else [self.base_url]
+
+    def _first_response(
+        self,
+        model: str | None,
+        open_one: Callable[[str, _HedgeAttempt | None], T],
+        discard: Callable[[T], None] | None = None,
+        hedge: bool = True,
+    ) -> T:
+        """Run `open_one(base_url, attempt)` on the routed backends until one answers.
+
+        Connection errors and 5xx fail over down the candidate list. If the
+        pool's hedge delay passes first, a duplicate goes to the next backend
+        and the first success wins. Hedged requests each get an `attempt`
+        whose connection is shut down when it loses, which aborts the request
+        on its backend; a loser that answered anyway is passed to `discard`.
+        """
+        routes = self._routes(model)
+        pool = self.pool
+        delay_s = pool.hedge_delay_s(model) if pool is not None and model and hedge else None
+        if pool is None or model is None or delay_s is None or len(routes) < 2:
+            for index, base_url in enumerate(routes):
+                started = time.perf_counter()
+                try:
+                    result = open_one(base_url, None)
+                except httpx.HTTPError as exc:
+                    if index == len(routes) - 1 or not _should_fail_over(exc):
+                        raise
+                    continue
+                if pool is not None and model and hedge:
+                    pool.record_latency(model, _elapsed_ms(started))
+                return result
+            raise AssertionError("unreachable")
+
+        remaining = list(routes)
+        pending: dict[Future[T], tuple[float, bool, _HedgeAttempt]] = {}
+
+        def launch(is_hedge: bool) -> None:
+            attempt = _HedgeAttempt(self.timeout_s, self.limits)
+            # Copy the context so hedged requests keep the caller's deadline.
+            future = _hedge_pool().submit(copy_context().run, open_one, remaining.pop(0), attempt)
+            pending[future] = (time.perf_counter(), is_hedge, attempt)
+
+        def abandon() -> None:
+            for future, (_, _, attempt) in pending.items():
+                attempt.abort()
+                if discard is not None:
+                    future.add_done_callback(
+                        lambda f: discard(f.result()) if not f.cancelled() and f.exception() is None else None
+                    )
+                future.cancel()
+
+        launch(False)
+        hedged = False
+        while True:
+            can_hedge = not hedged and bool(remaining)
+            done, _ = wait(pending, timeout=delay_s if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                pool.record_hedge(model, "sent")
+                launch(True)
+                continue
+            for future in done:
+                started, is_hedge, _ = pending.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    pool.record_latency(model, _elapsed_ms(started))
+                    if is_hedge:
+                        pool.record_hedge(model, "won")
+                    for _ in pending:
+                        pool.record_hedge(model, "cancelled")
+                    abandon()
+                    return future.result()
+                if not isinstance(exc, httpx.HTTPError) or not _should_fail_over(exc):
+                    abandon()
+                    raise exc
+                if not pending:
+                    if not remaining:
+                        raise exc
+                    launch(False)
+
+    def _post_to(
+        self,
+        base_url: str,
+        path: str,
+        payload: dict[str, Any],
+        model: str | None,
+        attempt: _HedgeAttempt | None = None,
+    ) -> httpx.Response:
+        client = attempt.client if attempt is not None else self._http()
+        extensions = attempt.extensions if attempt is not None else None
+        try:
+            with _tracked(self.pool, base_url, model):
+                resp = client.post(
+                    f"{base_url}{path}",
+                    json=payload,
+                    timeout=_request_timeout(self.timeout_s),
+                    extensions=extensions,
+                )
+                resp.raise_for_status()
+                return resp
+        finally:
+            # The body is already read, so a hedge attempt's own connection can go.
+            if attempt is not None:
+                client.close()
+
+    def _post(self, path: str, payload: dict[str, Any], model: str | None, hedge: bool = True) -> httpx.Response:
+        return self._first_response(
+            model, lambda base_url, attempt: self._post_to(base_url, path, payload, model, attempt), hedge=hedge
+        )
+
+    def _open_chat(
+        self, base_url: str, model: str, payload: dict[str, Any], attempt: _HedgeAttempt | None = None
+    ) -> tuple[contextlib.ExitStack, Iterator[str]]:
+        """Open a /api/chat stream on one backend and wait for its first line."""
+        stack = contextlib.ExitStack()
+        try:
+            client = self._http()
+            extensions = None
+            if attempt is not None:
+                client, extensions = attempt.client, attempt.extensions
+                stack.callback(client.close)
+            stack.enter_context(_tracked(self.pool, base_url, model))
+            timeout = _request_timeout(self.timeout_s)
+            resp = stack.enter_context(
+                client.stream("POST", f"{base_url}/api/chat", json=payload, timeout=timeout, extensions=extensions)
+            )
+            resp.raise_for_status()
+            lines = resp.iter_lines()
+            first = next((line for line in lines if line.strip()), None)
+        except BaseException:
+            stack.__exit__(*sys.exc_info())
+            raise
+        return stack, itertools.chain([first] if first is not None else [], lines)
 
     def list_models(self) -> list[str]:
+        cassette = active_cassette()
+        recorded = cassette.lookup("tags", {}) if cassette is not None else None
+        if recorded is not None:
+            return recorded
+        models = self._list_models_live()
+        if cassette is not None:
+            cassette.store("tags", {}, models)
+        return models
+
+    def _list_models_live(self) -> list[str]:
+        if self.pool is not None:
+            models = self.pool.installed_models()
+            if models:
+                return models
         # Prefer HTTP API, fallback to CLI parsing.
         try:
-            with httpx.Client(timeout=10.0) as client:
-                resp = client.get(f"{self.base_url}/api/tags")
-                resp.raise_for_status()
-                data = resp.json()
+            resp = self._http().get(f"{self.base_url}/api/tags", timeout=_request_timeout(10.0))
+            resp.raise_for_status()
+            data = resp.json()
             models = [item["name"] for item in data.get("models", []) if item.get("name")]
             if models:
                 return models
@@ -52,27 +554,521 @@ class OllamaClient:
             raise RuntimeError(proc.stderr.strip() or "Failed to run `ollama list`")
         return parse_ollama_list_output(proc.stdout)
 
+    def running_models(self, model: str | None = None) -> list[dict[str, Any]]:
+        """Models loaded (`/api/ps`), with resident sizes, on the backend `model` is routed to."""
+        resp = self._http().get(f"{self._routes(model)[0]}/api/ps", timeout=_request_timeout(10.0))
+        resp.raise_for_status()
+        return list(resp.json().get("models") or [])
+
+    def model_sizes(self, model: str | None = None) -> dict[str, int]:
+        """On-disk weight size per installed model (`/api/tags`) on the backend `model` is routed to."""
+        resp = self._http().get(f"{self._routes(model)[0]}/api/tags", timeout=_request_timeout(10.0))
+        resp.raise_for_status()
+        return {item["name"]: int(item.get("size") or 0) for item in resp.json().get("models", []) if item.get("name")}
+
+    def show(self, model: str) -> dict[str, Any]:
+        """Model metadata from `/api/show` (architecture, context length, ...)."""
+        resp = self._http().post(
+            f"{self._routes(model)[0]}/api/show", json={"model": model}, timeout=_request_timeout(10.0)
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def _admit(self, model: str, payload: dict[str, Any], num_ctx: int) -> tuple[dict[str, Any], int]:
+        controller = get_admission_controller()
+        # Free memory comes from this machine's /proc/meminfo, which says nothing about a remote host.
+        if controller is None or not is_local_backend(self._routes(model)[0]):
+            return payload, num_ctx
+        try:
+            decision = controller.admit(self, model, num_ctx, timeout_s=_remaining_s())
+        except DeadlineExceeded:
+            raise
+        except TimeoutError as exc:
+            raise DeadlineExceeded(f"Ollama call deadline exceeded waiting for memory for {model}") from exc
+        if decision.num_ctx == num_ctx:
+            return payload, num_ctx
+        return {**payload, "options": {**payload["options"], "num_ctx": decision.num_ctx}}, decision.num_ctx
+
+    def pull(self, model: str) -> dict[str, Any]:
+        """Download `model` via /api/pull (blocks until the pull completes)."""
+        return self._post("/api/pull", {"model": model, "stream": False}, model, hedge=False).json()
+
+    def preload(
+        self,
+        model: str,
+        keep_alive: KeepAlive = DEFAULT_WARM_KEEP_ALIVE,
+        embedding: bool = False,
+    ) -> dict[str, Any]:
+        """Load `model` into memory and keep it resident for `keep_alive`."""
+        started = time.perf_counter()
+        if _replaying():
+            return _load_result(model, {}, started, keep_alive)
+        path, payload = _load_request(model, keep_alive, embedding)
+        resp = self._post(path, payload, model, hedge=False)
+        return _load_result(model, resp.json(), started, keep_alive)
+
+    def unload(self, model: str, embedding: bool = False) -> None:
+        if _replaying():
+            return
+        path, payload = _load_request(model, 0, embedding)
+        if self.pool is None:
+            self._post(path, payload, None, hedge=False)
+            return
+        # The model may be resident on any backend; a down backend holds nothing to evict.
+        for base_url in self.pool.candidates(model):
+            with contextlib.suppress(httpx.TransportError):
+                self._http().post(f"{base_url}{path}", json=payload).raise_for_status()
+            self.pool.forget_loaded(base_url, model)
+
+    def embed(
+        self,
+        model: str,
+        inputs: list[str],
+        truncate: bool = True,
+        keep_alive: KeepAlive | None = None,
+    ) -> dict[str, Any]:
+        """POST a batch to /api/embed and return the raw response (embeddings plus counters)."""
+        body: dict[str, Any] = {"model": model, "input": inputs, "truncate": truncate}
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        cassette = active_cassette()
+        data = cassette.lookup("embed", body) if cassette is not None else None
+        if data is None:
+            with _slot(model):
+                resp = self._post("/api/embed", body, model)
+            data = resp.json()
+            if cassette is not None:
+                cassette.store("embed", body, data)
+        if len(data.get("embeddings") or []) != len(inputs):
+            raise RuntimeError("Embedding count did not match input count")
+        return data
+
+    def chat_stream(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        temperature: float = 0.2,
+        num_ctx: NumCtx = 4096,
+        keep_alive: KeepAlive | None = None,
+        started_at: float | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Stream a chat completion as `token` events followed by one `done` event.
+
+        A pooled client fails over (or hedges) only until the first line of
+        the response arrives; later backend errors propagate to the caller.
+        With a cassette active, recorded events (timings included) are
+        replayed without contacting Ollama. `started_at`, a
+        `time.perf_counter()` reading, is where the `done` event's latency
+        and TTFT are measured from (default: now), so a caller that did work
+        before the chat gets end-to-end timings the cassette records too.
+        """
+        payload, num_ctx = _chat_payload(model, messages, temperature, num_ctx, keep_alive)
+        cassette = active_cassette()
+        recorded = cassette.lookup("chat", payload) if cassette is not None else None
+        if recorded is not None:
+            yield from recorded
+            return
+        events: list[dict[str, Any]] = []
+        for event in self._chat_stream_live(model, payload, num_ctx, started_at):
+            events.append(dict(event))
+            # Store before handing out `done`: callers usually stop iterating right after it.
+            if cassette is not None and event["type"] == "done":
+                cassette.store("chat", payload, events)
+            yield event
+
+    def _chat_stream_live(
+        self, model: str, payload: dict[str, Any], num_ctx: int, started_at: float | None = None
+    ) -> Iterator[dict[str, Any]]:
+        timer = StreamTimer(started_at)
+        queued_at = time.perf_counter()
+        parts: list[str] = []
+        final: dict[str, Any] = {}
+        payload, num_ctx = self._admit(model, payload, num_ctx)
+        with _slot(model):
+            queue_wait_ms = _elapsed_ms(queued_at)
+            stack, lines = self._first_response(
+                model,
+                lambda base_url, attempt: self._open_chat(base_url, model, payload, attempt),
+                discard=lambda opened: opened[0].close(),
+            )
+            with stack:
+                for line in lines:
+                    # Leaving the `with` closes the stream, which stops Ollama generating.
+                    _check_deadline()
+                    chunk, delta = _parse_chat_line(line)
+                    if delta:
+                        timer.mark_token()
+                        parts.append(delta)
+                        yield {"type": "token", "text": delta}
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+        yield {**_chat_done_event(final, parts, num_ctx, timer), "queue_wait_ms": queue_wait_ms}
+
     def chat_generate(
         self,
         model: str,
         prompt: str,
         temperature: float = 0.2,
-        num_ctx: int = 4096,
+        num_ctx: NumCtx = 4096,
+        on_token: Callable[[str], None] | None = None,
+        keep_alive: KeepAlive | None = None,
     ) -> dict[str, Any]:
-        start = time.perf_counter()
-        payload = {
-            "model": model,
-            "stream": False,
-            "messages": [{"role": "user", "content": prompt}],
-            "options": {"temperature": temperature, "num_ctx": num_ctx},
-        }
-        with httpx.Client(timeout=self.timeout_s) as client:
-            resp = client.post(f"{self.base_url}/api/chat", json=payload)
+        messages = [{"role": "user", "content": prompt}]
+        for event in self.chat_stream(
+            model, messages, temperature=temperature, num_ctx=num_ctx, keep_alive=keep_alive
+        ):
+            if event["type"] == "token":
+                if on_token is not None:
+                    on_token(event["text"])
+                continue
+            return {key: value for key, value in event.items() if key != "type"}
+        raise RuntimeError("Ollama chat stream ended without a final message")
+
+
+class AsyncOllamaClient:
+    """Async counterpart of `OllamaClient` for event-loop callers such as the web app.
+
+    The underlying `httpx.AsyncClient` is bound to the event loop that first
+    uses it; `get_async_client()` keeps one per loop. Pool probes are blocking
+    and run in a worker thread.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        timeout_s: float = DEFAULT_TIMEOUT_S,
+        limits: httpx.Limits | None = None,
+        pool: BackendPool | None = None,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.limits = limits or _pool_limits
+        self.pool = pool
+        self._client: httpx.AsyncClient | None = None
+        self._sync: OllamaClient | None = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout_s, limits=self.limits)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync is not None:
+            self._sync.close()
+            self._sync = None
+
+    def _metadata_client(self) -> OllamaClient:
+        """Blocking twin used for admission-control metadata calls from worker threads."""
+        if self._sync is None:
+            self._sync = OllamaClient(self.base_url, self.timeout_s, self.limits, self.pool)
+        return self._sync
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.aclose()
+
+    async def _routes(self, model: str | None) -> list[str]:
+        if self.pool is None:
+            return [self.base_url]
+        return await asyncio.to_thread(self.pool.candidates, model)
+
+    async def _first_response(
+        self,
+        model: str | None,
+        open_one: Callable[[str], Awaitable[T]],
+        discard: Callable[[T], Awaitable[None]] | None = None,
+        hedge: bool = True,
+    ) -> T:
+        """Async `OllamaClient._first_response`; hedging losers are cancelled outright."""
+        routes = await self._routes(model)
+        pool = self.pool
+        delay_s = pool.hedge_delay_s(model) if pool is not None and model and hedge else None
+        if pool is None or model is None or delay_s is None or len(routes) < 2:
+            for index, base_url in enumerate(routes):
+                started = time.perf_counter()
+                try:
+                    result = await open_one(base_url)
+                except httpx.HTTPError as exc:
+                    if index == len(routes) - 1 or not _should_fail_over(exc):
+                        raise
+                    continue
+                if pool is not None and model and hedge:
+                    pool.record_latency(model, _elapsed_ms(started))
+                return result
+            raise AssertionError("unreachable")
+
+        remaining = list(routes)
+        pending: dict[asyncio.Future[T], tuple[float, bool]] = {}
+
+        def launch(is_hedge: bool) -> None:
+            pending[asyncio.ensure_future(open_one(remaining.pop(0)))] = (time.perf_counter(), is_hedge)
+
+        launch(False)
+        hedged = False
+        try:
+            while True:
+                can_hedge = not hedged and bool(remaining)
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay_s if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    pool.record_hedge(model, "sent")
+                    launch(True)
+                    continue
+                for future in done:
+                    started, is_hedge = pending.pop(future)
+                    exc = future.exception()
+                    if exc is None:
+                        pool.record_latency(model, _elapsed_ms(started))
+                        if is_hedge:
+                            pool.record_hedge(model, "won")
+                        for _ in pending:
+                            pool.record_hedge(model, "cancelled")
+                        return future.result()
+                    if not isinstance(exc, httpx.HTTPError) or not _should_fail_over(exc):
+                        raise exc
+                    if not pending:
+                        if not remaining:
+                            raise exc
+                        launch(False)
+        finally:
+            for future in pending:
+                future.cancel()
+            outcomes = await asyncio.gather(*pending, return_exceptions=True)
+            if discard is not None:
+                for outcome in outcomes:
+                    if not isinstance(outcome, BaseException):
+                        await discard(outcome)
+
+    async def _post_to(
+        self, base_url: str, path: str, payload: dict[str, Any], model: str | None
+    ) -> httpx.Response:
+        with _tracked(self.pool, base_url, model):
+            resp = await self._http().post(f"{base_url}{path}", json=payload, timeout=_request_timeout(self.timeout_s))
             resp.raise_for_status()
+            return resp
+
+    async def _post(
+        self, path: str, payload: dict[str, Any], model: str | None, hedge: bool = True
+    ) -> httpx.Response:
+        return await self._first_response(
+            model, lambda base_url: self._post_to(base_url, path, payload, model), hedge=hedge
+        )
+
+    async def _open_chat(
+        self, base_url: str, model: str, payload: dict[str, Any]
+    ) -> tuple[contextlib.AsyncExitStack, AsyncIterator[str]]:
+        stack = contextlib.AsyncExitStack()
+        try:
+            stack.enter_context(_tracked(self.pool, base_url, model))
+            resp = await stack.enter_async_context(
+                self._http().stream("POST", f"{base_url}/api/chat", json=payload, timeout=_request_timeout(self.timeout_s))
+            )
+            resp.raise_for_status()
+            lines = resp.aiter_lines()
+            first = None
+            async for line in lines:
+                if line.strip():
+                    first = line
+                    break
+        except BaseException:
+            await stack.__aexit__(*sys.exc_info())
+            raise
+        return stack, _prepend(first, lines)
+
+    async def preload(
+        self,
+        model: str,
+        keep_alive: KeepAlive = DEFAULT_WARM_KEEP_ALIVE,
+        embedding: bool = False,
+    ) -> dict[str, Any]:
+        started = time.perf_counter()
+        if _replaying():
+            return _load_result(model, {}, started, keep_alive)
+        path, payload = _load_request(model, keep_alive, embedding)
+        resp = await self._post(path, payload, model, hedge=False)
+        return _load_result(model, resp.json(), started, keep_alive)
+
+    async def unload(self, model: str, embedding: bool = False) -> None:
+        if _replaying():
+            return
+        path, payload = _load_request(model, 0, embedding)
+        if self.pool is None:
+            await self._post(path, payload, None, hedge=False)
+            return
+        for base_url in await self._routes(model):
+            with contextlib.suppress(httpx.TransportError):
+                (await self._http().post(f"{base_url}{path}", json=payload)).raise_for_status()
+            self.pool.forget_loaded(base_url, model)
+
+    async def embed(
+        self,
+        model: str,
+        inputs: list[str],
+        truncate: bool = True,
+        keep_alive: KeepAlive | None = None,
+    ) -> dict[str, Any]:
+        """Async `OllamaClient.embed`: the same request body (so cassettes match) and raw response."""
+        body: dict[str, Any] = {"model": model, "input": inputs, "truncate": truncate}
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        cassette = active_cassette()
+        data = cassette.lookup("embed", body) if cassette is not None else None
+        if data is None:
+            async with _aslot(model):
+                resp = await self._post("/api/embed", body, model)
             data = resp.json()
-        latency_ms = round((time.perf_counter() - start) * 1000, 2)
-        message = data.get("message") or {}
-        text = (message.get("content") or "").strip()
-        raw_snippet = str(data)[:500]
-        return {"text": text, "latency_ms": latency_ms, "raw_response_snippet": raw_snippet}
+            if cassette is not None:
+                cassette.store("embed", body, data)
+        if len(data.get("embeddings") or []) != len(inputs):
+            raise RuntimeError("Embedding count did not match input count")
+        return data
+
+    async def chat_stream(
+        self,
+        model: str,
+        messages: list[dict[str, str]],
+        temperature: float = 0.2,
+        num_ctx: NumCtx = 4096,
+        keep_alive: KeepAlive | None = None,
+        started_at: float | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        payload, num_ctx = _chat_payload(model, messages, temperature, num_ctx, keep_alive)
+        cassette = active_cassette()
+        recorded = cassette.lookup("chat", payload) if cassette is not None else None
+        if recorded is not None:
+            for event in recorded:
+                yield event
+            return
+        events: list[dict[str, Any]] = []
+        async for event in self._chat_stream_live(model, payload, num_ctx, started_at):
+            events.append(dict(event))
+            if cassette is not None and event["type"] == "done":
+                cassette.store("chat", payload, events)
+            yield event
+
+    async def _chat_stream_live(
+        self, model: str, payload: dict[str, Any], num_ctx: int, started_at: float | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        timer = StreamTimer(started_at)
+        queued_at = time.perf_counter()
+        parts: list[str] = []
+        final: dict[str, Any] = {}
+        # Metadata lookups and queueing for memory block, so admission runs in a worker thread.
+        payload, num_ctx = await asyncio.to_thread(self._metadata_client()._admit, model, payload, num_ctx)
+        async with _aslot(model):
+            queue_wait_ms = _elapsed_ms(queued_at)
+            stack, lines = await self._first_response(
+                model,
+                lambda base_url: self._open_chat(base_url, model, payload),
+                discard=lambda opened: opened[0].aclose(),
+            )
+            async with stack:
+                async for line in lines:
+                    _check_deadline()
+                    chunk, delta = _parse_chat_line(line)
+                    if delta:
+                        timer.mark_token()
+                        parts.append(delta)
+                        yield {"type": "token", "text": delta}
+                    if chunk.get("done"):
+                        final = chunk
+                        break
+        yield {**_chat_done_event(final, parts, num_ctx, timer), "queue_wait_ms": queue_wait_ms}
+
+    async def chat_generate(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float = 0.2,
+        num_ctx: NumCtx = 4096,
+        keep_alive: KeepAlive | None = None,
+    ) -> dict[str, Any]:
+        messages = [{"role": "user", "content": prompt}]
+        async for event in self.chat_stream(
+            model, messages, temperature=temperature, num_ctx=num_ctx, keep_alive=keep_alive
+        ):
+            if event["type"] == "done":
+                return {key: value for key, value in event.items() if key != "type"}
+        raise RuntimeError("Ollama chat stream ended without a final message")
+
+
+_CLIENTS: dict[tuple[str, float], OllamaClient] = {}
+_ASYNC_CLIENTS: dict[tuple[str, float, int], tuple[asyncio.AbstractEventLoop, AsyncOllamaClient]] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def configure_pool_limits(max_connections: int, max_keepalive_connections: int) -> None:
+    """Set connection-pool limits for clients created after this call."""
+    global _pool_limits
+    if max_connections <= 0 or max_keepalive_connections < 0:
+        raise ValueError("max_connections must be > 0 and max_keepalive_connections >= 0")
+    _pool_limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(max_keepalive_connections, max_connections),
+        keepalive_expiry=DEFAULT_POOL_LIMITS.keepalive_expiry,
+    )
+
+
+def get_client(base_url: str | None = None, timeout_s: float = DEFAULT_TIMEOUT_S) -> OllamaClient:
+    """Return the process-wide pooled client for (base_url, timeout_s).
+
+    Without an explicit `base_url`, requests go through the backend pool from
+    experiments/backends.yaml when it exists, else to `default_base_url()`.
+    """
+    pool = default_backend_pool() if base_url is None else None
+    url = (base_url or default_base_url()).rstrip("/")
+    key = (url if pool is None else "pool", timeout_s)
+    with _REGISTRY_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = _CLIENTS[key] = OllamaClient(url, timeout_s, pool=pool)
+        return client
+
+
+def get_async_client(
+    base_url: str | None = None,
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+) -> AsyncOllamaClient:
+    """Return the pooled async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    pool = default_backend_pool() if base_url is None else None
+    url = (base_url or default_base_url()).rstrip("/")
+    key = (url if pool is None else "pool", timeout_s, id(loop))
+    with _REGISTRY_LOCK:
+        # Clients of finished loops cannot be awaited any more; just forget them.
+        for stale in [k for k, (owner, _) in _ASYNC_CLIENTS.items() if owner.is_closed()]:
+            del _ASYNC_CLIENTS[stale]
+        entry = _ASYNC_CLIENTS.get(key)
+        if entry is None or entry[0] is not loop:
+            entry = _ASYNC_CLIENTS[key] = (loop, AsyncOllamaClient(url, timeout_s, pool=pool))
+        return entry[1]
+
+
+def close_clients() -> None:
+    """Close every pooled sync client (CLI exit, web shutdown, interpreter exit)."""
+    with _REGISTRY_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+async def aclose_clients() -> None:
+    """Close the pooled async clients owned by the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _REGISTRY_LOCK:
+        owned = [k for k, (owner, _) in _ASYNC_CLIENTS.items() if owner is loop]
+        clients = [_ASYNC_CLIENTS.pop(k)[1] for k in owned]
+    for client in clients:
+        await client.aclose()
+
 
+atexit.register(close_clients)
@@ -8,14 +8,20 @@ from typing import Any
 
 import orjson
 
-from lab.ollama_client import OllamaClient
+from lab.context_window import NumCtx
+from lab.ollama_client import get_client
+
+
+def _mean_or_none(values: list[float | None]) -> float | None:
+    present = [value for value in values if value is not None]
+    return round(mean(present), 2) if present else None
 
 
 def profile(
     model: str,
     prompt_file: str | Path,
     n: int,
-    num_ctx: int,
+    num_ctx: NumCtx,
     temperature: float,
 ) -> dict[str, Any]:
     if n <= 0:
@@ -24,7 +30,7 @@ def profile(
     prompt_path = Path(prompt_file)
     prompt_text = prompt_path.read_text(encoding="utf-8")
 
-    client = OllamaClient(timeout_s=300.0)
+    client = get_client(timeout_s=300.0)
     runs: list[dict[str, Any]] = []
     for i in range(n):
         started = time.perf_counter()
@@ -43,6 +49,9 @@ def profile(
                 "run_index": i + 1,
                 "wall_ms": wall_ms,
                 "latency_ms": result["latency_ms"],
+                "ttft_ms": result.get("ttft_ms"),
+                "inter_token_ms_avg": result.get("inter_token_ms_avg"),
+                "num_ctx": result.get("num_ctx", num_ctx),
                 "chars": chars,
                 "chars_per_sec": chars_per_sec,
             }
@@ -56,6 +65,7 @@ def profile(
         "temperature": temperature,
         "average_wall_ms": round(mean([r["wall_ms"] for r in runs]), 2),
         "average_chars_per_sec": round(mean([r["chars_per_sec"] for r in runs]), 2),
+        "average_ttft_ms": _mean_or_none([r["ttft_ms"] for r in runs]),
         "runs": runs,
         "timestamp": datetime.now(UTC).isoformat(),
     }
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import asyncio
 import time
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from langchain_ollama import ChatOllama
-
+from lab.answer_cache import AnswerCache
+from lab.context_packing import (
+    DEFAULT_CONTEXT_BUDGET_FRACTION,
+    PackedContext,
+    estimate_tokens,
+    pack_context,
+)
+from lab.context_window import NumCtx, is_auto, max_auto_num_ctx, select_num_ctx
+from lab.embeddings import response_vectors
 from lab.logging_jsonl import log_event
-from lab.retrieval import retrieve
+from lab.ollama_client import KeepAlive, StreamTimer, get_async_client, get_client
+from lab.retrieval import aretrieve, embed_query, retrieve
 
 RAG_REFUSAL = "I don't know from the provided documents."
 
@@ -17,111 +28,145 @@ def _load_prompt_template(name: str) -> str:
     return path.read_text(encoding="utf-8")
 
 
-def _build_context(retrieved: list[dict[str, Any]]) -> str:
-    if not retrieved:
-        return "(no retrieved context)"
-    parts: list[str] = []
-    for item in retrieved:
-        parts.append(
-            "\n".join(
-                [
-                    "---",
-                    f"path: {item['path']}",
-                    f"chunk_id: {item['chunk_id']}",
-                    "text:",
-                    item["full_text"],
-                ]
-            )
-        )
-    return "\n".join(parts)
+def _context_token_budget(
+    system_prompt: str,
+    user_template: str,
+    question: str,
+    num_ctx: int,
+    context_budget_fraction: float,
+) -> int:
+    if not 0 < context_budget_fraction <= 1:
+        raise ValueError("context_budget_fraction must be in (0, 1]")
+    overhead = estimate_tokens(system_prompt) + estimate_tokens(
+        user_template.format(question=question, context="")
+    )
+    return max(0, int(num_ctx * context_budget_fraction) - overhead)
 
 
-def _response_text(message: Any) -> str:
-    content = getattr(message, "content", message)
-    if isinstance(content, str):
-        return content.strip()
-    if isinstance(content, list):
-        return " ".join(str(part) for part in content).strip()
-    return str(content).strip()
+@dataclass
+class _PreparedPrompt:
+    messages: list[dict[str, str]]
+    num_ctx: int
+    packed: PackedContext
+    token_budget: int
+    prompt_tokens_estimate: int
+    top_score: float
+    below_threshold: bool
 
 
-def answer_question(
+def _prepare_prompt(
     question: str,
-    index_dir: str,
-    chat_model_name: str,
-    embed_model_name: str,
-    k: int,
-    temperature: float,
-    num_ctx: int,
-    question_id: str | None = None,
-    refusal_score_threshold: float | None = None,
-) -> dict[str, Any]:
-    start = time.perf_counter()
-    retrieved = retrieve(query=question, k=k, index_dir=index_dir, embed_model_name=embed_model_name)
-    citations = [{"path": item["path"], "chunk_id": item["chunk_id"]} for item in retrieved]
-
-    if not retrieved:
-        latency_ms = round((time.perf_counter() - start) * 1000, 2)
-        payload = {
-            "question_id": question_id,
-            "model": chat_model_name,
-            "embed_model": embed_model_name,
-            "k": k,
-            "num_ctx": num_ctx,
-            "latency_ms": latency_ms,
-            "citations": [],
-            "answer_preview": RAG_REFUSAL[:160],
-        }
-        log_event("rag", payload)
-        return {
-            "answer_text": RAG_REFUSAL,
-            "citations": [],
-            "retrieved": retrieved,
-            "latency_ms": latency_ms,
-        }
-
+    retrieved: list[dict[str, Any]],
+    num_ctx: NumCtx,
+    context_budget_fraction: float,
+    refusal_score_threshold: float | None,
+) -> _PreparedPrompt:
     system_prompt = _load_prompt_template("rag_system.txt")
-    user_prompt = _load_prompt_template("rag_user.txt").format(
-        question=question.strip(),
-        context=_build_context(retrieved),
+    user_template = _load_prompt_template("rag_user.txt")
+    # In auto mode the context is packed against the hardware cap and num_ctx is
+    # then shrunk to the smallest bucket that holds the actual prompt.
+    budget_num_ctx = max_auto_num_ctx() if is_auto(num_ctx) else int(num_ctx)
+    token_budget = _context_token_budget(
+        system_prompt, user_template, question.strip(), budget_num_ctx, context_budget_fraction
     )
+    packed = pack_context(retrieved, token_budget)
+    user_prompt = user_template.format(question=question.strip(), context=packed.text)
+    prompt_tokens_estimate = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+    if is_auto(num_ctx):
+        num_ctx = select_num_ctx(prompt_tokens_estimate, max_num_ctx=budget_num_ctx)
 
-    llm = ChatOllama(
-        model=chat_model_name,
-        temperature=temperature,
-        num_ctx=num_ctx,
-    )
-    response = llm.invoke(
-        [
-            ("system", system_prompt),
-            ("human", user_prompt),
-        ]
+    top_score = float(retrieved[0]["score"])
+    return _PreparedPrompt(
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        num_ctx=int(num_ctx),
+        packed=packed,
+        token_budget=token_budget,
+        prompt_tokens_estimate=prompt_tokens_estimate,
+        top_score=top_score,
+        # When the threshold will override the answer anyway, callers should not
+        # stream text they would have to retract.
+        below_threshold=refusal_score_threshold is not None and top_score < refusal_score_threshold,
     )
-    answer_text = _response_text(response)
 
-    top_score = retrieved[0]["score"] if retrieved else 0.0
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _no_context_result(
+    base: dict[str, Any],
+    num_ctx: NumCtx,
+    timer: StreamTimer,
+    timings: dict[str, Any],
+) -> dict[str, Any]:
+    latency_ms = timer.summary()["latency_ms"]
+    timings["total_ms"] = latency_ms
+    payload = {
+        **base,
+        "num_ctx": num_ctx,
+        "latency_ms": latency_ms,
+        "timings": timings,
+        "citations": [],
+        "context_tokens": 0,
+        "answer_preview": RAG_REFUSAL[:160],
+    }
+    log_event("rag", payload)
+    return {
+        "answer_text": RAG_REFUSAL,
+        "citations": [],
+        "retrieved": [],
+        "latency_ms": latency_ms,
+        "ttft_ms": None,
+        "inter_token_ms_avg": None,
+        "num_ctx": num_ctx,
+        "context_tokens": 0,
+        "prompt_tokens_estimate": 0,
+        "timings": timings,
+    }
+
+
+def _finish_answer(
+    base: dict[str, Any],
+    prepared: _PreparedPrompt,
+    answer_text: str,
+    retrieved: list[dict[str, Any]],
+    refusal_score_threshold: float | None,
+    timer: StreamTimer,
+    done: dict[str, Any],
+    timings: dict[str, Any],
+) -> dict[str, Any]:
+    """Build the result, timed by the chat's `done` event (measured from `timer.start`) when it has timings."""
+    packed = prepared.packed
+    citations = [{"path": item["path"], "chunk_id": item["chunk_id"]} for item in packed.packed]
     threshold_triggered = False
-    if (
-        refusal_score_threshold is not None
-        and top_score < refusal_score_threshold
-        and answer_text != RAG_REFUSAL
-    ):
+    if prepared.below_threshold and answer_text != RAG_REFUSAL:
         answer_text = RAG_REFUSAL
         threshold_triggered = True
 
     if answer_text == RAG_REFUSAL:
         citations = []
 
-    latency_ms = round((time.perf_counter() - start) * 1000, 2)
+    # A replayed chat carries the recorded timings; the local timer would only time the replay.
+    timing = done if done.get("latency_ms") is not None else timer.summary()
+    timings["total_ms"] = timing["latency_ms"]
     payload = {
-        "question_id": question_id,
-        "model": chat_model_name,
-        "embed_model": embed_model_name,
-        "k": k,
-        "num_ctx": num_ctx,
-        "latency_ms": latency_ms,
+        **base,
+        "num_ctx": prepared.num_ctx,
+        "latency_ms": timing["latency_ms"],
+        "ttft_ms": timing["ttft_ms"],
+        "inter_token_ms_avg": timing["inter_token_ms_avg"],
+        "timings": timings,
         "citations": citations,
-        "top_retrieval_score": round(float(top_score), 4) if retrieved else None,
+        "context_tokens": packed.tokens,
+        "context_token_budget": prepared.token_budget,
+        "prompt_tokens_estimate": prepared.prompt_tokens_estimate,
+        "packed_chunks": len(packed.packed),
+        "dropped_chunks": len(packed.dropped),
+        "context_truncated": packed.truncated,
+        "top_retrieval_score": round(prepared.top_score, 4),
         "refusal_score_threshold": refusal_score_threshold,
         "refusal_threshold_triggered": threshold_triggered,
         "answer_preview": answer_text[:160],
@@ -131,5 +176,341 @@ def answer_question(
         "answer_text": answer_text,
         "citations": citations,
         "retrieved": retrieved,
+        "latency_ms": timing["latency_ms"],
+        "ttft_ms": timing["ttft_ms"],
+        "inter_token_ms_avg": timing["inter_token_ms_avg"],
+        "num_ctx": prepared.num_ctx,
+        "context_tokens": packed.tokens,
+        "prompt_tokens_estimate": prepared.prompt_tokens_estimate,
+        "timings": timings,
+    }
+
+
+def _cache_scope(
+    answer_cache: AnswerCache,
+    index_dir: str,
+    chat_model_name: str,
+    embed_model_name: str,
+    k: int,
+    temperature: float,
+    num_ctx: NumCtx,
+    refusal_score_threshold: float | None,
+    context_budget_fraction: float,
+) -> dict[str, str]:
+    params = {
+        "k": k,
+        "temperature": temperature,
+        "num_ctx": num_ctx,
+        "refusal_score_threshold": refusal_score_threshold,
+        "context_budget_fraction": context_budget_fraction,
+    }
+    return answer_cache.scope(index_dir, chat_model_name, embed_model_name, params)
+
+
+def _cached_result(
+    base: dict[str, Any],
+    hit: dict[str, Any],
+    timer: StreamTimer,
+    timings: dict[str, Any],
+) -> dict[str, Any]:
+    cached = hit["result"]
+    latency_ms = timer.summary()["latency_ms"]
+    timings["total_ms"] = latency_ms
+    payload = {
+        **base,
+        "num_ctx": cached.get("num_ctx"),
+        "latency_ms": latency_ms,
+        "timings": timings,
+        "citations": cached.get("citations", []),
+        "cache_hit": True,
+        "cache_match": hit["match"],
+        "cache_similarity": hit["similarity"],
+        "answer_preview": cached["answer_text"][:160],
+    }
+    log_event("rag", payload)
+    return {
+        **cached,
         "latency_ms": latency_ms,
+        "ttft_ms": None,
+        "inter_token_ms_avg": None,
+        "timings": timings,
+        "cache": {
+            "hit": True,
+            "match": hit["match"],
+            "similarity": hit["similarity"],
+            "cached_latency_ms": cached.get("latency_ms"),
+        },
     }
+
+
+def _base_payload(
+    question_id: str | None,
+    chat_model_name: str,
+    embed_model_name: str,
+    k: int,
+    num_ctx: NumCtx,
+) -> dict[str, Any]:
+    return {
+        "question_id": question_id,
+        "model": chat_model_name,
+        "embed_model": embed_model_name,
+        "k": k,
+        "num_ctx_mode": "auto" if is_auto(num_ctx) else "fixed",
+    }
+
+
+def stream_answer_question(
+    question: str,
+    index_dir: str,
+    chat_model_name: str,
+    embed_model_name: str,
+    k: int,
+    temperature: float,
+    num_ctx: NumCtx,
+    question_id: str | None = None,
+    refusal_score_threshold: float | None = None,
+    context_budget_fraction: float = DEFAULT_CONTEXT_BUDGET_FRACTION,
+    answer_cache: AnswerCache | None = None,
+    keep_alive: KeepAlive | None = None,
+    retrieved: list[dict[str, Any]] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield `token` events while the answer is generated, then one `result` event.
+
+    With `answer_cache`, an exact or near-duplicate question answered before
+    under the same index build, models and prompt params is served from the
+    cache without retrieval or generation. Passing `retrieved` (the top-k
+    chunks for this question and embed model) skips retrieval, so one
+    retrieval can be shared across chat models.
+    """
+    timer = StreamTimer()
+    base = _base_payload(question_id, chat_model_name, embed_model_name, k, num_ctx)
+    timings: dict[str, Any] = {}
+    query_vec: Sequence[float] | None = None
+    if answer_cache is not None:
+        scope = _cache_scope(
+            answer_cache, index_dir, chat_model_name, embed_model_name, k, temperature,
+            num_ctx, refusal_score_threshold, context_budget_fraction,
+        )
+        base["cache_hit"] = False
+        hit = answer_cache.get_exact(scope, question)
+        if hit is None:
+            # Retrieval needs the query embedding anyway, so the semantic lookup is free.
+            stage_started = time.perf_counter()
+            query_vec = embed_query(question, embed_model_name)
+            timings["embed_ms"] = _elapsed_ms(stage_started)
+            hit = answer_cache.get_similar(scope, query_vec)
+        if hit is not None:
+            yield {"type": "result", "result": _cached_result(base, hit, timer, timings)}
+            return
+
+    if retrieved is None:
+        retrieved = retrieve(
+            query=question,
+            k=k,
+            index_dir=index_dir,
+            embed_model_name=embed_model_name,
+            timings=timings,
+            query_vec=query_vec,
+        )
+    if not retrieved:
+        yield {"type": "result", "result": _no_context_result(base, num_ctx, timer, timings)}
+        return
+
+    stage_started = time.perf_counter()
+    prepared = _prepare_prompt(
+        question, retrieved, num_ctx, context_budget_fraction, refusal_score_threshold
+    )
+    timings["build_ms"] = _elapsed_ms(stage_started)
+    stage_started = time.perf_counter()
+    answer_text = ""
+    done: dict[str, Any] = {}
+    for event in get_client().chat_stream(
+        chat_model_name,
+        prepared.messages,
+        temperature=temperature,
+        num_ctx=prepared.num_ctx,
+        keep_alive=keep_alive,
+        # Timed from the question, so a cassette replays the recorded end-to-end latency and TTFT.
+        started_at=timer.start,
+    ):
+        if event["type"] == "token":
+            timer.mark_token()
+            if not prepared.below_threshold:
+                yield event
+        else:
+            done = event
+            answer_text = event["text"]
+            timings.update(event.get("ollama") or {})
+            if event.get("queue_wait_ms") is not None:
+                timings["queue_wait_ms"] = event["queue_wait_ms"]
+    timings["generate_ms"] = _elapsed_ms(stage_started)
+
+    result = _finish_answer(
+        base, prepared, answer_text, retrieved, refusal_score_threshold, timer, done, timings
+    )
+    if answer_cache is not None:
+        answer_cache.put(scope, question, result, query_vec)
+        result["cache"] = {"hit": False}
+    yield {"type": "result", "result": result}
+
+
+def answer_question(
+    question: str,
+    index_dir: str,
+    chat_model_name: str,
+    embed_model_name: str,
+    k: int,
+    temperature: float,
+    num_ctx: NumCtx,
+    question_id: str | None = None,
+    refusal_score_threshold: float | None = None,
+    context_budget_fraction: float = DEFAULT_CONTEXT_BUDGET_FRACTION,
+    on_token: Callable[[str], None] | None = None,
+    answer_cache: AnswerCache | None = None,
+    keep_alive: KeepAlive | None = None,
+    retrieved: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    for event in stream_answer_question(
+        question=question,
+        index_dir=index_dir,
+        chat_model_name=chat_model_name,
+        embed_model_name=embed_model_name,
+        k=k,
+        temperature=temperature,
+        num_ctx=num_ctx,
+        question_id=question_id,
+        refusal_score_threshold=refusal_score_threshold,
+        context_budget_fraction=context_budget_fraction,
+        answer_cache=answer_cache,
+        keep_alive=keep_alive,
+        retrieved=retrieved,
+    ):
+        if event["type"] == "token":
+            if on_token is not None:
+                on_token(event["text"])
+            continue
+        return event["result"]
+    raise RuntimeError("RAG stream ended without a result")
+
+
+async def astream_answer_question(
+    question: str,
+    index_dir: str,
+    chat_model_name: str,
+    embed_model_name: str,
+    k: int,
+    temperature: float,
+    num_ctx: NumCtx,
+    question_id: str | None = None,
+    refusal_score_threshold: float | None = None,
+    context_budget_fraction: float = DEFAULT_CONTEXT_BUDGET_FRACTION,
+    answer_cache: AnswerCache | None = None,
+    keep_alive: KeepAlive | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Async `stream_answer_question`; index scoring, cache and logging I/O leave the event loop."""
+    timer = StreamTimer()
+    base = _base_payload(question_id, chat_model_name, embed_model_name, k, num_ctx)
+    client = get_async_client()
+    timings: dict[str, Any] = {}
+    query_vec: Sequence[float] | None = None
+    if answer_cache is not None:
+        scope = await asyncio.to_thread(
+            _cache_scope, answer_cache, index_dir, chat_model_name, embed_model_name, k,
+            temperature, num_ctx, refusal_score_threshold, context_budget_fraction,
+        )
+        base["cache_hit"] = False
+        hit = await asyncio.to_thread(answer_cache.get_exact, scope, question)
+        if hit is None:
+            stage_started = time.perf_counter()
+            query_vec = response_vectors(await client.embed(embed_model_name, [question]))[0]
+            timings["embed_ms"] = _elapsed_ms(stage_started)
+            hit = await asyncio.to_thread(answer_cache.get_similar, scope, query_vec)
+        if hit is not None:
+            result = await asyncio.to_thread(_cached_result, base, hit, timer, timings)
+            yield {"type": "result", "result": result}
+            return
+
+    retrieved = await aretrieve(
+        query=question,
+        k=k,
+        index_dir=index_dir,
+        embed_model_name=embed_model_name,
+        client=client,
+        timings=timings,
+        query_vec=query_vec,
+    )
+    if not retrieved:
+        result = await asyncio.to_thread(_no_context_result, base, num_ctx, timer, timings)
+        yield {"type": "result", "result": result}
+        return
+
+    stage_started = time.perf_counter()
+    # Template reads and context packing are blocking work too.
+    prepared = await asyncio.to_thread(
+        _prepare_prompt, question, retrieved, num_ctx, context_budget_fraction, refusal_score_threshold
+    )
+    timings["build_ms"] = _elapsed_ms(stage_started)
+    stage_started = time.perf_counter()
+    answer_text = ""
+    done: dict[str, Any] = {}
+    async for event in client.chat_stream(
+        chat_model_name,
+        prepared.messages,
+        temperature=temperature,
+        num_ctx=prepared.num_ctx,
+        keep_alive=keep_alive,
+        # Timed from the question, so a cassette replays the recorded end-to-end latency and TTFT.
+        started_at=timer.start,
+    ):
+        if event["type"] == "token":
+            timer.mark_token()
+            if not prepared.below_threshold:
+                yield event
+        else:
+            done = event
+            answer_text = event["text"]
+            timings.update(event.get("ollama") or {})
+            if event.get("queue_wait_ms") is not None:
+                timings["queue_wait_ms"] = event["queue_wait_ms"]
+    timings["generate_ms"] = _elapsed_ms(stage_started)
+
+    result = await asyncio.to_thread(
+        _finish_answer, base, prepared, answer_text, retrieved, refusal_score_threshold, timer, done, timings
+    )
+    if answer_cache is not None:
+        await asyncio.to_thread(answer_cache.put, scope, question, result, query_vec)
+        result["cache"] = {"hit": False}
+    yield {"type": "result", "result": result}
+
+
+async def aanswer_question(
+    question: str,
+    index_dir: str,
+    chat_model_name: str,
+    embed_model_name: str,
+    k: int,
+    temperature: float,
+    num_ctx: NumCtx,
+    question_id: str | None = None,
+    refusal_score_threshold: float | None = None,
+    context_budget_fraction: float = DEFAULT_CONTEXT_BUDGET_FRACTION,
+    answer_cache: AnswerCache | None = None,
+    keep_alive: KeepAlive | None = None,
+) -> dict[str, Any]:
+    async for event in astream_answer_question(
+        question=question,
+        index_dir=index_dir,
+        chat_model_name=chat_model_name,
+        embed_model_name=embed_model_name,
+        k=k,
+        temperature=temperature,
+        num_ctx=num_ctx,
+        question_id=question_id,
+        refusal_score_threshold=refusal_score_threshold,
+        context_budget_fraction=context_budget_fraction,
+        answer_cache=answer_cache,
+        keep_alive=keep_alive,
+    ):
+        if event["type"] == "result":
+            return event["result"]
+    raise RuntimeError("RAG stream ended without a result")
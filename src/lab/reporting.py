@@ -7,10 +7,20 @@ import orjson
 from rich.console import Console
 from rich.table import Table
 
+from lab.latency_histogram import LatencyHistogram
+
 
 console = Console()
 
 
+_PERCENTILE_COLUMNS = (("p50 (ms)", "p50_ms"), ("p95 (ms)", "p95_ms"), ("p99 (ms)", "p99_ms"))
+
+
+def _percentiles(stats: dict[str, Any]) -> list[str]:
+    # Summaries written before latency histograms only have avg/min/max.
+    return [str(stats.get(key, "-")) for _, key in _PERCENTILE_COLUMNS]
+
+
 def _load_summary(run_dir: str | Path) -> dict[str, Any]:
     path = Path(run_dir) / "summary.json"
     return orjson.loads(path.read_bytes())
@@ -28,18 +38,90 @@ def print_run_summary(run_dir: str | Path) -> None:
     table.add_row("question_count", str(summary["question_count"]))
     table.add_row("overall_accuracy_proxy", str(summary["aggregate_scores"]["overall"]["accuracy_proxy"]))
     table.add_row("overall_avg_latency_ms", str(summary["latency_stats"]["overall"]["avg_ms"]))
+    table.add_row("overall_p50_p95_p99_ms", " / ".join(_percentiles(summary["latency_stats"]["overall"])))
     console.print(table)
 
     model_table = Table(title="Per-model Metrics")
     model_table.add_column("Model", style="bold")
     model_table.add_column("Accuracy Proxy")
     model_table.add_column("Avg Latency (ms)")
+    for label, _ in _PERCENTILE_COLUMNS:
+        model_table.add_column(label)
     for model in summary["models"]:
         score = summary["aggregate_scores"]["per_model"][model]["accuracy_proxy"]
-        avg_latency = summary["latency_stats"]["per_model"][model]["avg_ms"]
-        model_table.add_row(model, str(score), str(avg_latency))
+        latency = summary["latency_stats"]["per_model"][model]
+        model_table.add_row(model, str(score), str(latency["avg_ms"]), *_percentiles(latency))
     console.print(model_table)
 
+    stage_stats = summary.get("stage_latency_stats")
+    if stage_stats:
+        _print_stage_table(summary["models"], stage_stats)
+
+    sweep = summary.get("sweep")
+    if sweep:
+        _print_sweep_table(sweep)
+
+
+_STAGE_COLUMNS = (
+    ("Queue", "avg_queue_wait_ms"),
+    ("Embed", "avg_embed_ms"),
+    ("Retrieve", "avg_retrieve_ms"),
+    ("Build", "avg_build_ms"),
+    ("Generate", "avg_generate_ms"),
+    ("Load", "avg_load_duration_ms"),
+    ("Prompt Eval", "avg_prompt_eval_duration_ms"),
+    ("Eval", "avg_eval_duration_ms"),
+    ("Eval tok/s", "eval_tokens_per_sec"),
+)
+
+
+def _print_stage_table(models: list[str], stage_stats: dict[str, Any]) -> None:
+    table = Table(title="Per-stage Latency (avg ms)")
+    table.add_column("Model", style="bold")
+    for label, _ in _STAGE_COLUMNS:
+        table.add_column(label)
+    rows = [(model, stage_stats.get("per_model", {}).get(model, {})) for model in models]
+    rows.append(("overall", stage_stats.get("overall", {})))
+    for name, stats in rows:
+        table.add_row(name, *[str(stats.get(key, "-")) for _, key in _STAGE_COLUMNS])
+    console.print(table)
+
+
+def _print_sweep_table(sweep: dict[str, Any]) -> None:
+    params = list(sweep["params"])
+    table = Table(title=f"Sweep Variants (best: {sweep['best_variant']})")
+    table.add_column("Variant", style="bold")
+    for name in params:
+        table.add_column(name)
+    table.add_column("Accuracy Proxy")
+    table.add_column("Avg Latency (ms)")
+    table.add_column("Errors")
+    for variant in sweep["variants"]:
+        table.add_row(
+            variant["id"],
+            *[str(variant["params"][name]) for name in params],
+            str(variant["aggregate_scores"]["overall"]["accuracy_proxy"]),
+            str(variant["latency_stats"]["overall"]["avg_ms"]),
+            str(variant["error_count"]),
+        )
+    console.print(table)
+
+    shared = sweep["shared_work"]
+    console.print(
+        f"Shared work: {shared['indexes']['built']} index(es) built, {shared['indexes']['reused']} reused, "
+        f"{shared['retrieval_passes']} retrieval pass(es), {shared['generations']['executed']} generations "
+        f"run and {shared['generations']['reused']} reused"
+    )
+
+
+def merge_latency_histograms(summaries: list[dict[str, Any]]) -> LatencyHistogram | None:
+    """Combine the overall latency histograms of several runs, or None if any run lacks one."""
+    histograms = [summary["latency_stats"]["overall"].get("histogram") for summary in summaries]
+    if not histograms or any(data is None for data in histograms):
+        return None
+    loaded = [LatencyHistogram.from_dict(data) for data in histograms]
+    return LatencyHistogram.merged(loaded, precision=loaded[0].precision)
+
 
 def compare_runs(run_dirs: list[str | Path]) -> None:
     summaries = [_load_summary(run_dir) for run_dir in run_dirs]
@@ -49,13 +131,26 @@ def compare_runs(run_dirs: list[str | Path]) -> None:
     table.add_column("Models")
     table.add_column("Overall Accuracy Proxy")
     table.add_column("Overall Avg Latency (ms)")
+    for label, _ in _PERCENTILE_COLUMNS:
+        table.add_column(label)
     for summary in summaries:
+        overall = summary["latency_stats"]["overall"]
         table.add_row(
             summary["run_id"],
             str(summary["config_name"]),
             ", ".join(summary["models"]),
             str(summary["aggregate_scores"]["overall"]["accuracy_proxy"]),
-            str(summary["latency_stats"]["overall"]["avg_ms"]),
+            str(overall["avg_ms"]),
+            *_percentiles(overall),
+        )
+    merged = merge_latency_histograms(summaries) if len(summaries) > 1 else None
+    if merged is not None:
+        totals = [summary["aggregate_scores"]["overall"] for summary in summaries]
+        count = sum(int(item["count"]) for item in totals)
+        accuracy = round(sum(int(item["total"]) for item in totals) / count, 4) if count else 0.0
+        latency = merged.summary()
+        table.add_row(
+            "all runs (merged)", "-", "-", str(accuracy), str(latency["avg_ms"]), *_percentiles(latency)
         )
     console.print(table)
 
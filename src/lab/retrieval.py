@@ -1,19 +1,26 @@
 from __future__ import annotations
 
+import asyncio
 import math
 import sqlite3
+import time
+from collections.abc import Sequence
 from pathlib import Path
 from typing import Any
 
 import orjson
-from langchain_ollama import OllamaEmbeddings
 
+from lab.embeddings import EmbeddingClient, response_vectors
+from lab.ollama_client import AsyncOllamaClient, get_async_client
 
-def _index_db_path(index_dir: str | Path) -> Path:
+
+def index_db_path(index_dir: str | Path) -> Path:
+    """The sqlite file inside an index directory."""
     return Path(index_dir) / "index.sqlite"
 
 
-def _cosine_similarity(a: list[float], b: list[float]) -> float:
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity of two equal-length vectors; 0.0 if either is all zeros."""
     if len(a) != len(b):
         raise ValueError("Embedding vectors must have the same length")
     dot = sum(x * y for x, y in zip(a, b, strict=True))
@@ -24,12 +31,12 @@ def _cosine_similarity(a: list[float], b: list[float]) -> float:
     return dot / (norm_a * norm_b)
 
 
-def retrieve(
+def _validate_query(
     query: str,
-    k: int = 5,
-    index_dir: str | Path = "runs/index",
-    embed_model_name: str | None = None,
-) -> list[dict[str, Any]]:
+    k: int,
+    index_dir: str | Path,
+    embed_model_name: str | None,
+) -> Path:
     if not query.strip():
         raise ValueError("query must not be empty")
     if k <= 0:
@@ -37,21 +44,41 @@ def retrieve(
     if not embed_model_name:
         raise ValueError("embed_model_name is required for query embedding")
 
-    db_path = _index_db_path(index_dir)
+    db_path = index_db_path(index_dir)
     if not db_path.exists():
         raise FileNotFoundError(f"Index database not found: {db_path}")
+    return db_path
+
+
+def embed_query(query: str, embed_model_name: str) -> Sequence[float]:
+    return EmbeddingClient(embed_model_name).embed_query(query)
 
-    embedder = OllamaEmbeddings(model=embed_model_name)
-    query_vec = embedder.embed_query(query)
 
-    rows: list[tuple[str, int, str, str]] = []
-    with sqlite3.connect(db_path) as conn:
+def _load_index_rows(index_dir: str | Path) -> list[tuple[str, int, str, list[float]]]:
+    with sqlite3.connect(index_db_path(index_dir)) as conn:
         rows = conn.execute("SELECT path, chunk_id, text, embedding FROM chunks").fetchall()
+    return [(path, chunk_id, text, orjson.loads(embedding_json)) for path, chunk_id, text, embedding_json in rows]
 
+
+def search_index(query_vec: Sequence[float], k: int, index_dir: str | Path) -> list[dict[str, Any]]:
+    """Score every stored chunk against `query_vec` and return the top-k (CPU-bound)."""
+    return _top_k(query_vec, k, _load_index_rows(index_dir))
+
+
+def search_index_many(
+    query_vecs: Sequence[Sequence[float]], k: int, index_dir: str | Path
+) -> list[list[dict[str, Any]]]:
+    """`search_index` for several queries, reading and decoding the index once."""
+    rows = _load_index_rows(index_dir)
+    return [_top_k(query_vec, k, rows) for query_vec in query_vecs]
+
+
+def _top_k(
+    query_vec: Sequence[float], k: int, rows: list[tuple[str, int, str, list[float]]]
+) -> list[dict[str, Any]]:
     scored: list[dict[str, Any]] = []
-    for path, chunk_id, text, embedding_json in rows:
-        emb = orjson.loads(embedding_json)
-        score = _cosine_similarity(query_vec, emb)
+    for path, chunk_id, text, emb in rows:
+        score = cosine_similarity(query_vec, emb)
         snippet = " ".join(text.split())[:220]
         scored.append(
             {
@@ -65,3 +92,59 @@ def retrieve(
 
     return sorted(scored, key=lambda item: item["score"], reverse=True)[:k]
 
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def retrieve(
+    query: str,
+    k: int = 5,
+    index_dir: str | Path = "runs/index",
+    embed_model_name: str | None = None,
+    timings: dict[str, Any] | None = None,
+    query_vec: Sequence[float] | None = None,
+) -> list[dict[str, Any]]:
+    """Embed `query` and return the top-k chunks.
+
+    When `timings` is given, `embed_ms` and `retrieve_ms` (the index scan) are
+    recorded into it. A caller that already embedded the query can pass
+    `query_vec` to skip the embedding call.
+    """
+    _validate_query(query, k, index_dir, embed_model_name)
+    started = time.perf_counter()
+    embedded_here = query_vec is None
+    if query_vec is None:
+        query_vec = embed_query(query, str(embed_model_name))
+    embedded = time.perf_counter()
+    results = search_index(query_vec, k, index_dir)
+    if timings is not None:
+        if embedded_here:
+            timings["embed_ms"] = round((embedded - started) * 1000, 2)
+        timings["retrieve_ms"] = _elapsed_ms(embedded)
+    return results
+
+
+async def aretrieve(
+    query: str,
+    k: int = 5,
+    index_dir: str | Path = "runs/index",
+    embed_model_name: str | None = None,
+    client: AsyncOllamaClient | None = None,
+    timings: dict[str, Any] | None = None,
+    query_vec: Sequence[float] | None = None,
+) -> list[dict[str, Any]]:
+    """Async `retrieve`: embeds over async HTTP and scores the index in a worker thread."""
+    _validate_query(query, k, index_dir, embed_model_name)
+    client = client or get_async_client()
+    started = time.perf_counter()
+    embedded_here = query_vec is None
+    if query_vec is None:
+        query_vec = response_vectors(await client.embed(str(embed_model_name), [query]))[0]
+    embedded = time.perf_counter()
+    results = await asyncio.to_thread(search_index, query_vec, k, index_dir)
+    if timings is not None:
+        if embedded_here:
+            timings["embed_ms"] = round((embedded - started) * 1000, 2)
+        timings["retrieve_ms"] = _elapsed_ms(embedded)
+    return results
@@ -30,6 +30,7 @@ class RunResultRow(BaseModel):
     answer_text: str
     citations: list[CitationItem] = []
     retrieved: list[RetrievedItem] = []
+    timings: dict[str, Any] | None = None
 
 
 class RunSummary(BaseModel):
@@ -40,6 +41,18 @@ class RunSummary(BaseModel):
     models: list[str]
     aggregate_scores: dict[str, Any]
     latency_stats: dict[str, Any]
+    stage_latency_stats: dict[str, Any] | None = None
+    warmup: list[dict[str, Any]] | None = None
+    scheduler: dict[str, Any] | None = None
+    backends: dict[str, Any] | None = None
+    cassette: dict[str, Any] | None = None
+    admission: dict[str, Any] | None = None
+    model_loads: dict[str, Any] | None = None
+    retrieval: dict[str, Any] | None = None
+    throughput: dict[str, Any] | None = None
+    resume: dict[str, Any] | None = None
+    index: dict[str, Any] | None = None
+    sweep: dict[str, Any] | None = None
     question_count: int | None = None
 
 
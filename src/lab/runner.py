@@ -1,20 +1,63 @@
 from __future__ import annotations
 
 import concurrent.futures
+import contextvars
+import dataclasses
+import itertools
 import math
 import time
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
 from statistics import mean
 from typing import Any
 
+import httpx
 import orjson
 import yaml
 
-from lab.ingest import ingest_corpus
+from lab.admission import get_admission_controller
+from lab.backend_pool import default_backend_pool
+from lab.cassette import active_cassette
+from lab.context_packing import DEFAULT_CONTEXT_BUDGET_FRACTION
+from lab.context_window import NumCtx, parse_num_ctx
+from lab.embeddings import DEFAULT_EMBED_BATCH_SIZE, EmbeddingClient
+from lab.index_store import IndexRef, ensure_index, read_index_ref, write_index_ref
+from lab.latency_histogram import LatencyHistogram
 from lab.model_registry import installed_models, recommend
+from lab.ollama_client import (
+    DeadlineExceeded,
+    KeepAlive,
+    call_deadline,
+    get_client,
+    parse_keep_alive,
+)
 from lab.rag import RAG_REFUSAL, answer_question
+from lab.retrieval import search_index_many
+from lab.scheduler import BATCH, get_scheduler, request_priority
+
+QUESTION_MAJOR = "question_major"
+MODEL_MAJOR = "model_major"
+TASK_ORDERS = (QUESTION_MAJOR, MODEL_MAJOR)
+# Ollama reports a few milliseconds of load_duration even for a resident model; real loads take seconds.
+MODEL_LOAD_THRESHOLD_MS = 100.0
+RUN_CONFIG_COPY = "config.yaml"
+RUN_MANIFEST = "manifest.json"
+SWEEP_TASK = "rag_sweep"
+# Parameters a sweep may vary; everything else comes from the base config.
+SWEEP_PARAMS = (
+    "k",
+    "num_ctx",
+    "temperature",
+    "chunk_size_chars",
+    "overlap_chars",
+    "refusal_score_threshold",
+    "context_budget_fraction",
+)
+SCORING_HEURISTIC = (
+    "Answerable = keyword match (all if <=2 keywords else >=60%); unanswerable = exact refusal string."
+)
 
 
 @dataclass
@@ -25,7 +68,7 @@ class RagEvalConfig:
     chat_models: list[str]
     embed_model: str
     k: int
-    num_ctx: int
+    num_ctx: NumCtx
     temperature: float
     chunk_size_chars: int
     overlap_chars: int
@@ -34,11 +77,33 @@ class RagEvalConfig:
     per_call_timeout_s: float | None = None
     max_retries: int = 0
     retry_backoff_s: float = 0.0
+    context_budget_fraction: float = DEFAULT_CONTEXT_BUDGET_FRACTION
+    warm_models: bool = False
+    keep_alive: KeepAlive | None = None
+    embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE
+    task_order: str = QUESTION_MAJOR
+    concurrency: int = 1
+    per_model_concurrency: int | None = None
+    sweep: dict[str, list[Any]] | None = None
 
 
 def _load_config(path: str | Path) -> RagEvalConfig:
     data = yaml.safe_load(Path(path).read_text(encoding="utf-8"))
-    return RagEvalConfig(**data)
+    cfg = RagEvalConfig(**data)
+    cfg.num_ctx = parse_num_ctx(cfg.num_ctx)
+    if cfg.task_order not in TASK_ORDERS:
+        raise ValueError(f"task_order must be one of {TASK_ORDERS}, got {cfg.task_order!r}")
+    if cfg.concurrency <= 0 or (cfg.per_model_concurrency is not None and cfg.per_model_concurrency <= 0):
+        raise ValueError("concurrency and per_model_concurrency must be > 0")
+    if cfg.keep_alive is not None:
+        cfg.keep_alive = parse_keep_alive(cfg.keep_alive)
+    if cfg.task == SWEEP_TASK:
+        if not cfg.sweep or not all(isinstance(values, list) and values for values in cfg.sweep.values()):
+            raise ValueError("rag_sweep needs a `sweep` mapping of parameter -> non-empty list of values")
+        unknown = sorted(set(cfg.sweep) - set(SWEEP_PARAMS))
+        if unknown:
+            raise ValueError(f"sweep cannot vary {unknown}; supported: {SWEEP_PARAMS}")
+    return cfg
 
 
 def _load_dataset(path: str | Path) -> list[dict[str, Any]]:
@@ -101,23 +166,353 @@ def _keyword_score(answer_text: str, expected_keywords: list[str]) -> tuple[int,
     return matched, needed, score
 
 
-def _latency_summary(values: list[float]) -> dict[str, float]:
-    if not values:
-        return {"count": 0, "avg_ms": 0.0, "min_ms": 0.0, "max_ms": 0.0}
+def _score_answer(row: dict[str, Any], answer_text: str) -> tuple[int, int, int, str]:
+    """(matched, needed, score, score_reason) for one answer under `SCORING_HEURISTIC`."""
+    if bool(row["answerable"]):
+        matched, needed, score = _keyword_score(answer_text, row["expected_keywords"])
+        return matched, needed, score, f"matched_keywords={matched}, needed={needed}"
+    score = 1 if answer_text.strip() == RAG_REFUSAL else 0
+    return 0, 0, score, "exact_refusal" if score == 1 else "missing_exact_refusal"
+
+
+def _latency_summary(histogram: LatencyHistogram) -> dict[str, Any]:
+    """Exact count/avg/min/max, estimated percentiles, and the histogram itself so runs can be merged."""
+    return {**histogram.summary(), "histogram": histogram.as_dict()}
+
+
+STAGE_TIMING_KEYS = (
+    "queue_wait_ms",
+    "embed_ms",
+    "retrieve_ms",
+    "build_ms",
+    "generate_ms",
+    "load_duration_ms",
+    "prompt_eval_duration_ms",
+    "eval_duration_ms",
+)
+
+
+def _stage_summary(timings: list[dict[str, Any]]) -> dict[str, Any]:
+    """Average each RAG stage over tasks that reported it, plus Ollama token rates."""
+    summary: dict[str, Any] = {"count": len(timings)}
+    for key in STAGE_TIMING_KEYS:
+        values = [float(item[key]) for item in timings if item.get(key) is not None]
+        summary[f"avg_{key}"] = round(mean(values), 2) if values else None
+
+    prompt_counts = [int(item["prompt_eval_count"]) for item in timings if item.get("prompt_eval_count")]
+    summary["avg_prompt_eval_count"] = round(mean(prompt_counts), 2) if prompt_counts else None
+    eval_tokens = sum(int(item.get("eval_count") or 0) for item in timings)
+    eval_ms = sum(float(item.get("eval_duration_ms") or 0.0) for item in timings)
+    summary["eval_tokens_per_sec"] = round(eval_tokens / (eval_ms / 1000), 2) if eval_ms > 0 else None
+    return summary
+
+
+def _aggregate_stats(
+    model_scores: dict[str, list[int]], model_latencies: dict[str, LatencyHistogram]
+) -> tuple[dict[str, Any], dict[str, Any]]:
+    """`aggregate_scores` and `latency_stats`, per model and overall."""
+    aggregate_scores: dict[str, Any] = {
+        "per_model": {
+            model: {
+                "total": sum(scores),
+                "count": len(scores),
+                "accuracy_proxy": round((sum(scores) / len(scores)), 4) if scores else 0.0,
+            }
+            for model, scores in model_scores.items()
+        }
+    }
+    all_scores = [score for scores in model_scores.values() for score in scores]
+    aggregate_scores["overall"] = {
+        "total": sum(all_scores),
+        "count": len(all_scores),
+        "accuracy_proxy": round((sum(all_scores) / len(all_scores)), 4) if all_scores else 0.0,
+    }
+    latency_stats = {
+        "overall": _latency_summary(LatencyHistogram.merged(model_latencies.values())),
+        "per_model": {model: _latency_summary(histogram) for model, histogram in model_latencies.items()},
+    }
+    return aggregate_scores, latency_stats
+
+
+def _config_summary(cfg: RagEvalConfig) -> dict[str, Any]:
+    return {
+        "k": cfg.k,
+        "num_ctx": cfg.num_ctx,
+        "temperature": cfg.temperature,
+        "chunk_size_chars": cfg.chunk_size_chars,
+        "overlap_chars": cfg.overlap_chars,
+        "refusal_score_threshold": cfg.refusal_score_threshold,
+        "per_call_timeout_s": cfg.per_call_timeout_s,
+        "max_retries": cfg.max_retries,
+        "retry_backoff_s": cfg.retry_backoff_s,
+        "context_budget_fraction": cfg.context_budget_fraction,
+        "warm_models": cfg.warm_models,
+        "keep_alive": cfg.keep_alive,
+        "embed_batch_size": cfg.embed_batch_size,
+        "task_order": cfg.task_order,
+        "concurrency": cfg.concurrency,
+        "per_model_concurrency": cfg.per_model_concurrency,
+    }
+
+
+def _task_record(
+    run_id: str,
+    cfg: RagEvalConfig,
+    row: dict[str, Any],
+    model: str,
+    embed_model: str,
+    rag_result: dict[str, Any],
+    attempts_used: int,
+) -> dict[str, Any]:
+    """One results.jsonl row, scored."""
+    answer_text = rag_result["answer_text"]
+    matched, needed, score, score_reason = _score_answer(row, answer_text)
     return {
-        "count": len(values),
-        "avg_ms": round(mean(values), 2),
-        "min_ms": round(min(values), 2),
-        "max_ms": round(max(values), 2),
+        "run_id": run_id,
+        "config_name": cfg.name,
+        "question_id": row["id"],
+        "question": row["question"],
+        "answerable": row["answerable"],
+        "model": model,
+        "embed_model": embed_model,
+        "k": cfg.k,
+        "num_ctx": rag_result.get("num_ctx", cfg.num_ctx),
+        "temperature": cfg.temperature,
+        "answer_text": answer_text,
+        "citations": rag_result["citations"],
+        "retrieved": [
+            {
+                "path": item["path"],
+                "chunk_id": item["chunk_id"],
+                "score": item["score"],
+            }
+            for item in rag_result["retrieved"]
+        ],
+        "latency_ms": rag_result["latency_ms"],
+        "ttft_ms": rag_result.get("ttft_ms"),
+        "timings": rag_result.get("timings"),
+        "context_tokens": rag_result.get("context_tokens"),
+        "expected_keywords": row["expected_keywords"],
+        "matched_keywords": matched,
+        "needed_keywords": needed,
+        "score": score,
+        "score_reason": score_reason,
+        "error": rag_result.get("error"),
+        "attempts_used": attempts_used,
     }
 
 
+def _plan_tasks(
+    dataset: list[dict[str, Any]], chat_models: list[str], task_order: str
+) -> list[tuple[dict[str, Any], str]]:
+    """(row, model) pairs in execution order.
+
+    `question_major` asks every model each question in turn; `model_major`
+    runs all questions on one model before moving on, so a machine that can
+    hold only one chat model loads each model once instead of once per task.
+    """
+    if task_order == MODEL_MAJOR:
+        return [(row, model) for model in chat_models for row in dataset]
+    return [(row, model) for row in dataset for model in chat_models]
+
+
+def _execute_tasks(
+    tasks: list[tuple[dict[str, Any], str]],
+    run_task: Callable[[dict[str, Any], str], Any],
+    concurrency: int,
+    per_model_limit: Callable[[str], int],
+) -> Iterator[tuple[dict[str, Any], str, Any]]:
+    """Yield `(row, model, run_task(row, model))` as tasks finish.
+
+    With `concurrency` > 1 tasks run on a worker pool, taken in plan order but
+    skipping models already at `per_model_limit(model)` tasks in flight, so a
+    capped model never idles workers that another model could use. Results
+    arrive in completion order. Closing the generator (e.g. on Ctrl-C) drops
+    queued tasks; calls already in flight finish in the background.
+    """
+    if concurrency <= 1:
+        for row, model in tasks:
+            yield row, model, run_task(row, model)
+        return
+
+    pending = list(tasks)
+    in_flight: dict[str, int] = {}
+    running: dict[concurrent.futures.Future[Any], tuple[dict[str, Any], str]] = {}
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="lab-eval")
+    try:
+        while pending or running:
+            index = 0
+            while index < len(pending) and len(running) < concurrency:
+                row, model = pending[index]
+                if in_flight.get(model, 0) >= per_model_limit(model):
+                    index += 1
+                    continue
+                pending.pop(index)
+                in_flight[model] = in_flight.get(model, 0) + 1
+                # Copy the context so workers keep the run's scheduler priority.
+                future = pool.submit(contextvars.copy_context().run, run_task, row, model)
+                running[future] = (row, model)
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                row, model = running.pop(future)
+                in_flight[model] -= 1
+                yield row, model, future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _per_model_limiter(cfg: RagEvalConfig) -> Callable[[str], int]:
+    scheduler = get_scheduler()
+
+    def per_model_limit(model: str) -> int:
+        # By default never run more tasks per model than the scheduler lets reach Ollama at once.
+        return cfg.per_model_concurrency or scheduler.model_limits.get(model, scheduler.default_limit)
+
+    return per_model_limit
+
+
+def _keep_completed(results_path: Path, question_ids: set[str], chat_models: set[str]) -> list[dict[str, Any]]:
+    """Keep the finished tasks in results.jsonl and return them.
+
+    Errored tasks, rows for questions or models no longer in the run, and a
+    line cut short by a crash are dropped so a resumed run re-executes them.
+    """
+    if not results_path.exists():
+        return []
+    kept: list[dict[str, Any]] = []
+    seen: set[tuple[str, str]] = set()
+    for line in results_path.read_bytes().splitlines():
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            continue
+        key = (record.get("question_id"), record.get("model"))
+        if record.get("error") or key[0] not in question_ids or key[1] not in chat_models or key in seen:
+            continue
+        seen.add(key)
+        kept.append(record)
+    tmp_path = results_path.with_suffix(".jsonl.tmp")
+    tmp_path.write_bytes(b"".join(orjson.dumps(record) + b"\n" for record in kept))
+    tmp_path.replace(results_path)
+    return kept
+
+
+def _rewrite_question_major(results_path: Path, dataset: list[dict[str, Any]], chat_models: list[str]) -> None:
+    """Reorder results.jsonl to question-major so outputs compare line-by-line across task orders."""
+    question_pos = {row["id"]: index for index, row in enumerate(dataset)}
+    model_pos = {model: index for index, model in enumerate(chat_models)}
+    lines = [line for line in results_path.read_bytes().splitlines() if line.strip()]
+
+    def position(line: bytes) -> tuple[int, int]:
+        record = orjson.loads(line)
+        return question_pos.get(record["question_id"], len(question_pos)), model_pos.get(record["model"], len(model_pos))
+
+    tmp_path = results_path.with_suffix(".jsonl.tmp")
+    tmp_path.write_bytes(b"".join(line + b"\n" for line in sorted(lines, key=position)))
+    tmp_path.replace(results_path)
+
+
+def _model_load_summary(task_order: str, executed: list[tuple[str, dict[str, Any] | None]]) -> dict[str, Any]:
+    """Model switches between consecutive tasks and loads observed via Ollama's load_duration."""
+    per_model: dict[str, int] = {}
+    for model, timings in executed:
+        load_ms = (timings or {}).get("load_duration_ms")
+        loaded = load_ms is not None and float(load_ms) >= MODEL_LOAD_THRESHOLD_MS
+        per_model[model] = per_model.get(model, 0) + int(loaded)
+    switches = sum(1 for prev, cur in itertools.pairwise(executed) if prev[0] != cur[0])
+    return {
+        "task_order": task_order,
+        "model_switches": switches,
+        "observed_loads": sum(per_model.values()),
+        "per_model": per_model,
+    }
+
+
+def _runtime_summary(
+    chat_models: list[str], task_order: str, executed: list[tuple[str, dict[str, Any] | None]]
+) -> dict[str, Any]:
+    """Summary sections eval runs and sweeps share: stage timings, scheduling, backends and model loads."""
+    timings = {model: [t for name, t in executed if name == model and t] for model in chat_models}
+    return {
+        "stage_latency_stats": {
+            "overall": _stage_summary([t for values in timings.values() for t in values]),
+            "per_model": {model: _stage_summary(values) for model, values in timings.items()},
+        },
+        "scheduler": get_scheduler().metrics(),
+        "backends": backend_pool.metrics() if (backend_pool := default_backend_pool()) is not None else None,
+        "cassette": cassette.summary() if (cassette := active_cassette()) is not None else None,
+        "admission": controller.metrics() if (controller := get_admission_controller()) is not None else None,
+        "model_loads": _model_load_summary(task_order, executed),
+    }
+
+
+def _warm_models(
+    chat_models: list[str],
+    embed_model: str,
+    keep_alive: KeepAlive | None,
+) -> list[dict[str, Any]]:
+    """Preload every model so cold loads are not charged to the first timed tasks."""
+    client = get_client(timeout_s=300.0)
+    warmup: list[dict[str, Any]] = []
+    targets = [(embed_model, True)] + [(model, False) for model in chat_models]
+    for model, embedding in targets:
+        try:
+            if keep_alive is None:
+                entry = client.preload(model, embedding=embedding)
+            else:
+                entry = client.preload(model, keep_alive=keep_alive, embedding=embedding)
+            entry["error"] = None
+        except Exception as exc:
+            entry = {"model": model, "latency_ms": None, "load_duration_ms": None, "error": str(exc)}
+            print(f"[run] warning warmup model={model} error={exc}", flush=True)
+        entry["embedding"] = embedding
+        warmup.append(entry)
+    return warmup
+
+
+def _retrieve_all(
+    dataset: list[dict[str, Any]],
+    index_dir: Path,
+    embed_model: str,
+    k: int,
+    batch_size: int,
+) -> tuple[dict[str, tuple[list[dict[str, Any]], dict[str, float]]], dict[str, Any]]:
+    """Retrieve once per question, before any chat model runs.
+
+    Retrieval depends only on the question, embed model and `k`, so all
+    questions are embedded in batches and scored in one pass over the index;
+    each chat model then reuses the result. Per-question `embed_ms` is the
+    question's share of its batch.
+    """
+    questions = {row["id"]: row["question"] for row in dataset if str(row.get("question", "")).strip()}
+    if not questions or k <= 0 or not (index_dir / "index.sqlite").exists():
+        return {}, {"questions": 0, "embed_ms": 0.0, "retrieve_ms": 0.0}
+    embedded = EmbeddingClient(embed_model, batch_size=batch_size).embed(list(questions.values()))
+    started = time.perf_counter()
+    results = search_index_many(embedded.vectors, k, index_dir)
+    retrieve_ms = round((time.perf_counter() - started) * 1000, 2)
+    embed_ms = embedded.summary()["total_ms"]
+    per_question = {
+        "embed_ms": round(embed_ms / len(questions), 2),
+        "retrieve_ms": round(retrieve_ms / len(questions), 2),
+    }
+    shared = {qid: (retrieved, per_question) for qid, retrieved in zip(questions, results, strict=True)}
+    stats = {
+        "questions": len(questions),
+        "embed_batches": len(embedded.batches),
+        "embed_ms": embed_ms,
+        "retrieve_ms": retrieve_ms,
+    }
+    return shared, stats
+
+
 def _rag_error_result(message: str) -> dict[str, Any]:
     return {
         "answer_text": f"[rag_error] {message}",
         "citations": [],
         "retrieved": [],
         "latency_ms": 0.0,
+        "timings": {},
         "error": message,
     }
 
@@ -130,18 +525,24 @@ def _call_rag_with_controls(
     embed_model_name: str,
     k: int,
     temperature: float,
-    num_ctx: int,
+    num_ctx: NumCtx,
     question_id: str,
     refusal_score_threshold: float | None,
     per_call_timeout_s: float | None,
+    context_budget_fraction: float = DEFAULT_CONTEXT_BUDGET_FRACTION,
+    keep_alive: KeepAlive | None = None,
+    retrieved: list[dict[str, Any]] | None = None,
     max_retries: int,
     retry_backoff_s: float,
 ) -> tuple[dict[str, Any], int]:
     attempts = max(1, max_retries + 1)
     last_error: str | None = None
     for attempt in range(1, attempts + 1):
+        started = time.monotonic()
         try:
-            if per_call_timeout_s is None:
+            # The deadline is enforced on every Ollama request inside the call, so a timed-out
+            # generation is aborted rather than left running while the next task starts.
+            with call_deadline(per_call_timeout_s):
                 result = answer_question(
                     question=question,
                     index_dir=index_dir,
@@ -152,31 +553,21 @@ def _call_rag_with_controls(
                     num_ctx=num_ctx,
                     question_id=question_id,
                     refusal_score_threshold=refusal_score_threshold,
+                    context_budget_fraction=context_budget_fraction,
+                    keep_alive=keep_alive,
+                    retrieved=retrieved,
                 )
-            else:
-                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
-                    future = pool.submit(
-                        answer_question,
-                        question=question,
-                        index_dir=index_dir,
-                        chat_model_name=chat_model_name,
-                        embed_model_name=embed_model_name,
-                        k=k,
-                        temperature=temperature,
-                        num_ctx=num_ctx,
-                        question_id=question_id,
-                        refusal_score_threshold=refusal_score_threshold,
-                    )
-                    try:
-                        result = future.result(timeout=per_call_timeout_s)
-                    except concurrent.futures.TimeoutError:
-                        future.cancel()
-                        raise TimeoutError(f"RAG call timed out after {per_call_timeout_s}s")
+            if per_call_timeout_s is not None and time.monotonic() - started > per_call_timeout_s:
+                raise DeadlineExceeded("finished after the deadline")
             return result, attempt
         except KeyboardInterrupt:
             raise
         except Exception as exc:
-            last_error = str(exc)
+            timed_out = per_call_timeout_s is not None and (
+                isinstance(exc, DeadlineExceeded | httpx.TimeoutException)
+                and time.monotonic() - started >= per_call_timeout_s
+            )
+            last_error = f"RAG call timed out after {per_call_timeout_s}s" if timed_out else str(exc)
             if attempt < attempts:
                 if retry_backoff_s > 0:
                     time.sleep(retry_backoff_s)
@@ -185,146 +576,195 @@ def _call_rag_with_controls(
     return _rag_error_result(last_error or "unknown rag error"), attempts
 
 
-def run_config(path: str | Path) -> Path:
-    config_path = Path(path)
-    cfg = _load_config(config_path)
-    if cfg.task != "rag_eval":
-        raise ValueError(f"Unsupported task: {cfg.task}")
-
+def _new_run_dir(cfg: RagEvalConfig, config_path: Path) -> tuple[datetime, str, Path]:
     started_at = datetime.now(UTC)
     run_id = f"{started_at.strftime('%Y%m%dT%H%M%SZ')}_{cfg.name}"
     run_dir = Path("runs") / run_id
     run_dir.mkdir(parents=True, exist_ok=False)
-    run_index_dir = run_dir / "index"
+    # Keep the exact config next to the results so `lab run --resume` can reload it.
+    (run_dir / RUN_CONFIG_COPY).write_bytes(config_path.read_bytes())
+    return started_at, run_id, run_dir
 
-    embed_model = _resolve_embed_model(cfg.embed_model)
-    chat_models = _resolve_chat_models(cfg.chat_models)
 
-    ingest_corpus(
-        corpus_dir=cfg.corpus_dir,
-        index_dir=run_index_dir,
-        embed_model_name=embed_model,
-        chunk_size_chars=cfg.chunk_size_chars,
-        overlap_chars=cfg.overlap_chars,
-    )
+def _write_manifest(run_dir: Path, started_at: datetime, embed_model: str, chat_models: list[str]) -> None:
+    """Record what `--resume` must reuse before any task runs; summary.json only exists once a run ends."""
+    manifest = {"started_at": started_at.isoformat(), "embed_model": embed_model, "models": chat_models}
+    (run_dir / RUN_MANIFEST).write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+
+
+def _read_manifest(run_dir: Path) -> dict[str, Any]:
+    try:
+        return orjson.loads((run_dir / RUN_MANIFEST).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def run_config(path: str | Path | None = None, resume: str | Path | None = None) -> Path:
+    """Run an experiment config, or finish the interrupted run in `resume`.
+
+    A resumed run reuses the run directory's config copy (unless `path` is
+    given), and the start time, resolved models and index recorded before
+    its first task, so a run killed before writing summary.json resumes too. Tasks already in results.jsonl
+    without an error are kept; errored ones are dropped and re-run, and the
+    summary is recomputed over old and new results together.
+    """
+    resume_dir = Path(resume) if resume is not None else None
+    if resume_dir is not None and not resume_dir.is_dir():
+        raise FileNotFoundError(f"Run directory not found: {resume_dir}")
+    if path is None and resume_dir is None:
+        raise ValueError("a config path or a run directory to resume is required")
+    config_path = Path(path) if path is not None else resume_dir / RUN_CONFIG_COPY
+    cfg = _load_config(config_path)
+    if cfg.task == SWEEP_TASK:
+        if resume_dir is not None:
+            raise ValueError("rag_sweep runs cannot be resumed; start the sweep again")
+        return _run_sweep(cfg, config_path)
+    if cfg.task != "rag_eval":
+        raise ValueError(f"Unsupported task: {cfg.task}")
+
+    previous: dict[str, Any] = {}
+    if resume_dir is None:
+        started_at, run_id, run_dir = _new_run_dir(cfg, config_path)
+    else:
+        run_dir = resume_dir
+        run_id = run_dir.name
+        summary_path = run_dir / "summary.json"
+        if summary_path.exists():
+            previous = orjson.loads(summary_path.read_bytes())
+        previous.update(_read_manifest(run_dir))
+        started_at = (
+            datetime.fromisoformat(previous["started_at"]) if previous.get("started_at") else datetime.now(UTC)
+        )
+
+    # A resumed run keeps the models it started with, even if `auto` would now pick others.
+    embed_model = previous.get("embed_model") or _resolve_embed_model(cfg.embed_model)
+    chat_models = previous.get("models") or _resolve_chat_models(cfg.chat_models)
+    _write_manifest(run_dir, started_at, embed_model, chat_models)
+
+    index_ref = read_index_ref(run_dir) if resume_dir is not None else None
+    if (run_dir / "index" / "index.sqlite").exists():
+        # Runs from before the shared index store kept a private copy.
+        index_ref = IndexRef(key="", path=run_dir / "index", reused=True)
+    elif index_ref is None or not (index_ref.path / "index.sqlite").exists():
+        index_ref = ensure_index(
+            corpus_dir=cfg.corpus_dir,
+            embed_model_name=embed_model,
+            chunk_size_chars=cfg.chunk_size_chars,
+            overlap_chars=cfg.overlap_chars,
+            embed_batch_size=cfg.embed_batch_size,
+        )
+        write_index_ref(run_dir, index_ref)
+        print(f"[run] Index {'reused' if index_ref.reused else 'built'}: {index_ref.path}", flush=True)
+    run_index_dir = index_ref.path
     dataset = _load_dataset(cfg.dataset_path)
+    results_path = run_dir / "results.jsonl"
+    kept = _keep_completed(results_path, {row["id"] for row in dataset}, set(chat_models))
+    completed = {(record["question_id"], record["model"]) for record in kept}
+    tasks = [
+        (row, model)
+        for row, model in _plan_tasks(dataset, chat_models, cfg.task_order)
+        if (row["id"], model) not in completed
+    ]
+    if resume_dir is not None:
+        print(f"[run] Resuming run_id={run_id}: {len(kept)} tasks done, {len(tasks)} remaining", flush=True)
+    remaining_questions = {row["id"] for row, _ in tasks}
+
+    warmup: list[dict[str, Any]] | None = previous.get("warmup")
+    if cfg.warm_models and tasks:
+        print(f"[run] Warming {len(chat_models) + 1} models", flush=True)
+        warmup = _warm_models(chat_models, embed_model, cfg.keep_alive)
+    try:
+        shared_retrieval, retrieval_stats = _retrieve_all(
+            [row for row in dataset if row["id"] in remaining_questions],
+            run_index_dir,
+            embed_model,
+            cfg.k,
+            cfg.embed_batch_size,
+        )
+    except Exception as exc:
+        # Each task then retrieves for itself, so failures surface (and retry) per task as before.
+        print(f"[run] warning shared retrieval failed, retrieving per task: {exc}", flush=True)
+        shared_retrieval, retrieval_stats = {}, {"questions": 0, "error": str(exc)}
     total_tasks = len(dataset) * len(chat_models)
     print(
         f"[run] Starting run_id={run_id} questions={len(dataset)} models={len(chat_models)} "
-        f"total_tasks={total_tasks}",
+        f"total_tasks={total_tasks} task_order={cfg.task_order}",
         flush=True,
     )
 
-    results_path = run_dir / "results.jsonl"
     model_scores: dict[str, list[int]] = {model: [] for model in chat_models}
-    model_latencies: dict[str, list[float]] = {model: [] for model in chat_models}
-    task_num = 0
+    model_latencies = {model: LatencyHistogram() for model in chat_models}
+    executed: list[tuple[str, dict[str, Any] | None]] = []
+    for record in kept:
+        model_scores[record["model"]].append(record["score"])
+        model_latencies[record["model"]].record(float(record["latency_ms"]))
+        executed.append((record["model"], record.get("timings")))
+    task_num = len(kept)
     interrupted = False
     error_count = 0
     timeout_count = 0
 
-    with results_path.open("ab") as fh:
+    submitted = itertools.count(task_num + 1)
+
+    def run_task(row: dict[str, Any], model: str) -> tuple[dict[str, Any], int]:
+        print(
+            f"[run] {next(submitted)}/{total_tasks} question_id={row['id']} model={model}",
+            flush=True,
+        )
+        retrieved, retrieval_timings = shared_retrieval.get(row["id"], (None, {}))
+        rag_result, attempts_used = _call_rag_with_controls(
+            question=row["question"],
+            index_dir=str(run_index_dir),
+            chat_model_name=model,
+            embed_model_name=embed_model,
+            k=cfg.k,
+            temperature=cfg.temperature,
+            num_ctx=cfg.num_ctx,
+            question_id=row["id"],
+            refusal_score_threshold=cfg.refusal_score_threshold,
+            per_call_timeout_s=cfg.per_call_timeout_s,
+            context_budget_fraction=cfg.context_budget_fraction,
+            keep_alive=cfg.keep_alive,
+            retrieved=retrieved,
+            max_retries=cfg.max_retries,
+            retry_backoff_s=cfg.retry_backoff_s,
+        )
+        if rag_result.get("timings"):
+            rag_result["timings"] = {**retrieval_timings, **rag_result["timings"]}
+        return rag_result, attempts_used
+
+    tasks_started = time.perf_counter()
+    with results_path.open("ab") as fh, request_priority(BATCH):
         try:
-            for row in dataset:
-                for model in chat_models:
-                    task_num += 1
+            for row, model, (rag_result, attempts_used) in _execute_tasks(
+                tasks, run_task, cfg.concurrency, _per_model_limiter(cfg)
+            ):
+                task_num += 1
+                task_error = rag_result.get("error")
+                if task_error:
+                    error_count += 1
+                    if "timed out" in str(task_error).lower():
+                        timeout_count += 1
                     print(
-                        f"[run] {task_num}/{total_tasks} question_id={row['id']} model={model}",
+                        f"[run] warning question_id={row['id']} model={model} error={task_error}",
                         flush=True,
                     )
-                    rag_result, attempts_used = _call_rag_with_controls(
-                        question=row["question"],
-                        index_dir=str(run_index_dir),
-                        chat_model_name=model,
-                        embed_model_name=embed_model,
-                        k=cfg.k,
-                        temperature=cfg.temperature,
-                        num_ctx=cfg.num_ctx,
-                        question_id=row["id"],
-                        refusal_score_threshold=cfg.refusal_score_threshold,
-                        per_call_timeout_s=cfg.per_call_timeout_s,
-                        max_retries=cfg.max_retries,
-                        retry_backoff_s=cfg.retry_backoff_s,
-                    )
-                    task_error = rag_result.get("error")
-                    if task_error:
-                        error_count += 1
-                        if "timed out" in str(task_error).lower():
-                            timeout_count += 1
-                        print(
-                            f"[run] warning question_id={row['id']} model={model} error={task_error}",
-                            flush=True,
-                        )
-                    answer_text = rag_result["answer_text"]
-                    if bool(row["answerable"]):
-                        matched, needed, score = _keyword_score(answer_text, row["expected_keywords"])
-                        score_reason = f"matched_keywords={matched}, needed={needed}"
-                    else:
-                        score = 1 if answer_text.strip() == RAG_REFUSAL else 0
-                        matched, needed = 0, 0
-                        score_reason = "exact_refusal" if score == 1 else "missing_exact_refusal"
-
-                    record = {
-                        "run_id": run_id,
-                        "config_name": cfg.name,
-                        "question_id": row["id"],
-                        "question": row["question"],
-                        "answerable": row["answerable"],
-                        "model": model,
-                        "embed_model": embed_model,
-                        "k": cfg.k,
-                        "num_ctx": cfg.num_ctx,
-                        "temperature": cfg.temperature,
-                        "answer_text": answer_text,
-                        "citations": rag_result["citations"],
-                        "retrieved": [
-                            {
-                                "path": item["path"],
-                                "chunk_id": item["chunk_id"],
-                                "score": item["score"],
-                            }
-                            for item in rag_result["retrieved"]
-                        ],
-                        "latency_ms": rag_result["latency_ms"],
-                        "expected_keywords": row["expected_keywords"],
-                        "matched_keywords": matched,
-                        "needed_keywords": needed,
-                        "score": score,
-                        "score_reason": score_reason,
-                        "error": task_error,
-                        "attempts_used": attempts_used,
-                    }
-                    fh.write(orjson.dumps(record))
-                    fh.write(b"\n")
-                    fh.flush()
-                    model_scores[model].append(score)
-                    model_latencies[model].append(float(rag_result["latency_ms"]))
+                record = _task_record(run_id, cfg, row, model, embed_model, rag_result, attempts_used)
+                fh.write(orjson.dumps(record))
+                fh.write(b"\n")
+                fh.flush()
+                model_scores[model].append(record["score"])
+                model_latencies[model].record(float(rag_result["latency_ms"]))
+                executed.append((model, rag_result.get("timings")))
         except KeyboardInterrupt:
             interrupted = True
             print("[run] Interrupted by user; writing partial summary.", flush=True)
+    tasks_wall_s = time.perf_counter() - tasks_started
+    if cfg.task_order != QUESTION_MAJOR or cfg.concurrency > 1 or kept:
+        _rewrite_question_major(results_path, dataset, chat_models)
 
     finished_at = datetime.now(UTC)
-    aggregate_scores = {
-        "per_model": {
-            model: {
-                "total": sum(scores),
-                "count": len(scores),
-                "accuracy_proxy": round((sum(scores) / len(scores)), 4) if scores else 0.0,
-            }
-            for model, scores in model_scores.items()
-        }
-    }
-    all_scores = [score for scores in model_scores.values() for score in scores]
-    all_latencies = [lat for values in model_latencies.values() for lat in values]
-    aggregate_scores["overall"] = {
-        "total": sum(all_scores),
-        "count": len(all_scores),
-        "accuracy_proxy": round((sum(all_scores) / len(all_scores)), 4) if all_scores else 0.0,
-    }
-    latency_stats = {
-        "overall": _latency_summary(all_latencies),
-        "per_model": {model: _latency_summary(values) for model, values in model_latencies.items()},
-    }
+    aggregate_scores, latency_stats = _aggregate_stats(model_scores, model_latencies)
 
     summary = {
         "run_id": run_id,
@@ -338,24 +778,275 @@ def run_config(path: str | Path) -> Path:
         "question_count": len(dataset),
         "aggregate_scores": aggregate_scores,
         "latency_stats": latency_stats,
-        "config": {
-            "k": cfg.k,
-            "num_ctx": cfg.num_ctx,
-            "temperature": cfg.temperature,
-            "chunk_size_chars": cfg.chunk_size_chars,
-            "overlap_chars": cfg.overlap_chars,
-            "refusal_score_threshold": cfg.refusal_score_threshold,
-            "per_call_timeout_s": cfg.per_call_timeout_s,
-            "max_retries": cfg.max_retries,
-            "retry_backoff_s": cfg.retry_backoff_s,
+        **_runtime_summary(chat_models, cfg.task_order, executed),
+        "warmup": warmup,
+        "retrieval": retrieval_stats,
+        "index": index_ref.as_dict(),
+        "resume": {"reused_tasks": len(kept), "resumed_at": datetime.now(UTC).isoformat()} if resume_dir else None,
+        "throughput": {
+            "concurrency": cfg.concurrency,
+            "wall_s": round(tasks_wall_s, 2),
+            "tasks_per_min": round((task_num - len(kept)) / tasks_wall_s * 60, 2) if tasks_wall_s > 0 else None,
         },
+        "config": _config_summary(cfg),
         "interrupted": interrupted,
         "completed_tasks": task_num,
         "total_tasks": total_tasks,
         "error_count": error_count,
         "timeout_count": timeout_count,
-        "heuristic": "Answerable = keyword match (all if <=2 keywords else >=60%); unanswerable = exact refusal string.",
+        "heuristic": SCORING_HEURISTIC,
     }
     (run_dir / "summary.json").write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
     print(f"[run] Finished run_id={run_id}", flush=True)
     return run_dir
+
+
+def _sweep_variants(cfg: RagEvalConfig) -> list[tuple[str, dict[str, Any], RagEvalConfig]]:
+    """`(variant_id, params, config)` for every combination in `cfg.sweep`, in grid order."""
+    grid = cfg.sweep or {}
+    names = list(grid)
+    variants: list[tuple[str, dict[str, Any], RagEvalConfig]] = []
+    for num, values in enumerate(itertools.product(*(grid[name] for name in names)), start=1):
+        params = dict(zip(names, values, strict=True))
+        variant = dataclasses.replace(cfg, **params, task="rag_eval", sweep=None)
+        variant.num_ctx = parse_num_ctx(variant.num_ctx)
+        variants.append((f"v{num:02d}", params, variant))
+    return variants
+
+
+def _generation_key(
+    index_key: str,
+    row_id: str,
+    model: str,
+    retrieved: list[dict[str, Any]] | None,
+    cfg: RagEvalConfig,
+) -> tuple[Any, ...]:
+    # Everything the prompt and sampling depend on. `k` only matters through the chunks it
+    # selects, and the refusal threshold rewrites the answer afterwards, so neither is keyed.
+    chunks = tuple((item["path"], item["chunk_id"]) for item in retrieved) if retrieved is not None else cfg.k
+    return (index_key, row_id, model, chunks, str(cfg.num_ctx), cfg.temperature, cfg.context_budget_fraction)
+
+
+def _apply_refusal_threshold(rag_result: dict[str, Any], threshold: float | None) -> dict[str, Any]:
+    """The result `answer_question` would have returned with `refusal_score_threshold` set."""
+    retrieved = rag_result.get("retrieved") or []
+    if threshold is None or rag_result.get("error") or not retrieved:
+        return rag_result
+    if float(retrieved[0]["score"]) >= threshold or rag_result["answer_text"] == RAG_REFUSAL:
+        return rag_result
+    return {**rag_result, "answer_text": RAG_REFUSAL, "citations": []}
+
+
+def _run_sweep(cfg: RagEvalConfig, config_path: Path) -> Path:
+    """Run every combination of `cfg.sweep` as one run, doing shared work once.
+
+    Variants with the same chunking share one stored index. Each index is
+    searched once per question at the largest `k` its variants use, and
+    smaller `k` take a prefix of that ranking. A generation is made once per
+    distinct prompt and sampling parameters and reused by every variant that
+    matches; the refusal threshold is applied afterwards, as in
+    `answer_question`. Reused rows keep the latency of the call that produced
+    them, so variants compare on equal terms.
+    """
+    started_at, run_id, run_dir = _new_run_dir(cfg, config_path)
+    embed_model = _resolve_embed_model(cfg.embed_model)
+    chat_models = _resolve_chat_models(cfg.chat_models)
+    dataset = _load_dataset(cfg.dataset_path)
+    variants = _sweep_variants(cfg)
+
+    indexes: dict[tuple[int, int], IndexRef] = {}
+    for _, _, variant in variants:
+        chunking = (variant.chunk_size_chars, variant.overlap_chars)
+        if chunking not in indexes:
+            indexes[chunking] = ensure_index(
+                corpus_dir=cfg.corpus_dir,
+                embed_model_name=embed_model,
+                chunk_size_chars=variant.chunk_size_chars,
+                overlap_chars=variant.overlap_chars,
+                embed_batch_size=cfg.embed_batch_size,
+            )
+            ref = indexes[chunking]
+            print(f"[run] Index {'reused' if ref.reused else 'built'}: {ref.path}", flush=True)
+    write_index_ref(run_dir, list(indexes.values()))
+
+    shared_retrieval: dict[str, dict[str, tuple[list[dict[str, Any]], dict[str, float]]]] = {}
+    retrieval_passes: list[dict[str, Any]] = []
+    for chunking, ref in indexes.items():
+        max_k = max(v.k for _, _, v in variants if (v.chunk_size_chars, v.overlap_chars) == chunking)
+        try:
+            shared_retrieval[ref.key], stats = _retrieve_all(
+                dataset, ref.path, embed_model, max_k, cfg.embed_batch_size
+            )
+        except Exception as exc:
+            # As in run_config: variants on this index retrieve per task instead.
+            print(
+                f"[run] warning shared retrieval failed for index {ref.key}, retrieving per task: {exc}",
+                flush=True,
+            )
+            shared_retrieval[ref.key], stats = {}, {"questions": 0, "error": str(exc)}
+        retrieval_passes.append({"index_key": ref.key, "k": max_k, **stats})
+
+    planned: list[tuple[str, dict[str, Any], str, tuple[Any, ...]]] = []
+    jobs: dict[tuple[Any, ...], dict[str, Any]] = {}
+    for variant_id, _, variant in variants:
+        ref = indexes[(variant.chunk_size_chars, variant.overlap_chars)]
+        for row, model in _plan_tasks(dataset, chat_models, QUESTION_MAJOR):
+            hit = shared_retrieval[ref.key].get(row["id"])
+            retrieved = hit[0][: variant.k] if hit is not None else None
+            key = _generation_key(ref.key, row["id"], model, retrieved, variant)
+            jobs.setdefault(
+                key,
+                {
+                    "key": key,
+                    "row": row,
+                    "model": model,
+                    "cfg": variant,
+                    "index_dir": ref.path,
+                    "retrieved": retrieved,
+                    "timings": hit[1] if hit is not None else {},
+                },
+            )
+            planned.append((variant_id, row, model, key))
+    tasks = [(job, job["model"]) for job in jobs.values()]
+    if cfg.task_order == MODEL_MAJOR:
+        tasks.sort(key=lambda task: chat_models.index(task[1]))
+    print(
+        f"[run] Starting sweep run_id={run_id} variants={len(variants)} indexes={len(indexes)} "
+        f"scored_tasks={len(planned)} generations={len(tasks)}",
+        flush=True,
+    )
+
+    submitted = itertools.count(1)
+
+    def run_task(job: dict[str, Any], model: str) -> tuple[dict[str, Any], int]:
+        variant: RagEvalConfig = job["cfg"]
+        print(f"[run] {next(submitted)}/{len(tasks)} question_id={job['row']['id']} model={model}", flush=True)
+        rag_result, attempts_used = _call_rag_with_controls(
+            question=job["row"]["question"],
+            index_dir=str(job["index_dir"]),
+            chat_model_name=model,
+            embed_model_name=embed_model,
+            k=variant.k,
+            temperature=variant.temperature,
+            num_ctx=variant.num_ctx,
+            question_id=job["row"]["id"],
+            refusal_score_threshold=None,
+            per_call_timeout_s=cfg.per_call_timeout_s,
+            context_budget_fraction=variant.context_budget_fraction,
+            keep_alive=cfg.keep_alive,
+            retrieved=job["retrieved"],
+            max_retries=cfg.max_retries,
+            retry_backoff_s=cfg.retry_backoff_s,
+        )
+        if rag_result.get("timings"):
+            rag_result["timings"] = {**job["timings"], **rag_result["timings"]}
+        return rag_result, attempts_used
+
+    generated: dict[tuple[Any, ...], tuple[dict[str, Any], int]] = {}
+    executed: list[tuple[str, dict[str, Any] | None]] = []
+    interrupted = False
+    tasks_started = time.perf_counter()
+    with request_priority(BATCH):
+        try:
+            for job, model, outcome in _execute_tasks(tasks, run_task, cfg.concurrency, _per_model_limiter(cfg)):
+                generated[job["key"]] = outcome
+                executed.append((model, outcome[0].get("timings")))
+        except KeyboardInterrupt:
+            interrupted = True
+            print("[run] Interrupted by user; writing partial summary.", flush=True)
+    tasks_wall_s = time.perf_counter() - tasks_started
+
+    by_id = {variant_id: (params, variant) for variant_id, params, variant in variants}
+    scores: dict[str, dict[str, list[int]]] = {vid: {model: [] for model in chat_models} for vid in by_id}
+    latencies = {vid: {model: LatencyHistogram() for model in chat_models} for vid in by_id}
+    errors = dict.fromkeys(by_id, 0)
+    timeout_count = reused = written = 0
+    used: set[tuple[Any, ...]] = set()
+    with (run_dir / "results.jsonl").open("wb") as fh:
+        for variant_id, row, model, key in planned:
+            if key not in generated:
+                continue
+            params, variant = by_id[variant_id]
+            rag_result, attempts_used = generated[key]
+            rag_result = _apply_refusal_threshold(rag_result, variant.refusal_score_threshold)
+            record = _task_record(run_id, variant, row, model, embed_model, rag_result, attempts_used)
+            record["variant"] = variant_id
+            record["params"] = params
+            record["generation_reused"] = key in used
+            reused += key in used
+            used.add(key)
+            if record["error"]:
+                errors[variant_id] += 1
+                timeout_count += "timed out" in str(record["error"]).lower()
+            fh.write(orjson.dumps(record))
+            fh.write(b"\n")
+            written += 1
+            scores[variant_id][model].append(record["score"])
+            latencies[variant_id][model].record(float(rag_result["latency_ms"]))
+
+    variant_summaries: list[dict[str, Any]] = []
+    for variant_id, (params, variant) in by_id.items():
+        aggregate_scores, latency_stats = _aggregate_stats(scores[variant_id], latencies[variant_id])
+        variant_summaries.append(
+            {
+                "id": variant_id,
+                "params": params,
+                "index_key": indexes[(variant.chunk_size_chars, variant.overlap_chars)].key,
+                "aggregate_scores": aggregate_scores,
+                "latency_stats": latency_stats,
+                "error_count": errors[variant_id],
+            }
+        )
+    best = max(
+        variant_summaries,
+        key=lambda v: (v["aggregate_scores"]["overall"]["accuracy_proxy"], -v["latency_stats"]["overall"]["avg_ms"]),
+    )
+    aggregate_scores, latency_stats = _aggregate_stats(
+        {model: [s for vid in by_id for s in scores[vid][model]] for model in chat_models},
+        {model: LatencyHistogram.merged(latencies[vid][model] for vid in by_id) for model in chat_models},
+    )
+    summary = {
+        "run_id": run_id,
+        "config_name": cfg.name,
+        "task": SWEEP_TASK,
+        "started_at": started_at.isoformat(),
+        "finished_at": datetime.now(UTC).isoformat(),
+        "corpus_dir": cfg.corpus_dir,
+        "dataset_path": cfg.dataset_path,
+        "models": chat_models,
+        "embed_model": embed_model,
+        "question_count": len(dataset),
+        "aggregate_scores": aggregate_scores,
+        "latency_stats": latency_stats,
+        **_runtime_summary(chat_models, cfg.task_order, executed),
+        "retrieval": {"passes": retrieval_passes},
+        "throughput": {
+            "concurrency": cfg.concurrency,
+            "wall_s": round(tasks_wall_s, 2),
+            "tasks_per_min": round(len(generated) / tasks_wall_s * 60, 2) if tasks_wall_s > 0 else None,
+        },
+        "sweep": {
+            "params": cfg.sweep,
+            "variants": variant_summaries,
+            "best_variant": best["id"],
+            "shared_work": {
+                "variants": len(variants),
+                "indexes": {
+                    "built": sum(not ref.reused for ref in indexes.values()),
+                    "reused": sum(ref.reused for ref in indexes.values()),
+                },
+                "retrieval_passes": len(retrieval_passes),
+                "generations": {"executed": len(generated), "reused": reused},
+            },
+        },
+        "config": _config_summary(cfg),
+        "interrupted": interrupted,
+        "completed_tasks": written,
+        "total_tasks": len(planned),
+        "error_count": sum(errors.values()),
+        "timeout_count": timeout_count,
+        "heuristic": SCORING_HEURISTIC,
+    }
+    (run_dir / "summary.json").write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    print(f"[run] Finished sweep run_id={run_id} best_variant={best['id']}", flush=True)
+    return run_dir
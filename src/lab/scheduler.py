@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+# Local Ollama serves few requests in parallel; extra client concurrency only queues server-side,
+# where interactive requests can no longer jump ahead of a batch backlog.
+DEFAULT_MODEL_CONCURRENCY = 2
+# A batch request waiting this long is treated as interactive so eval runs are never starved.
+DEFAULT_STARVATION_S = 30.0
+
+_current_priority: ContextVar[str] = ContextVar("lab_request_priority", default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+@contextlib.contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """Run Ollama calls made in this context (and threads copying it) at `priority`."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {PRIORITIES}, got {priority!r}")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+@dataclass
+class _Ticket:
+    priority: str
+    seq: int
+    enqueued_at: float
+    event: threading.Event | None = None
+    loop: asyncio.AbstractEventLoop | None = None
+    future: asyncio.Future[None] | None = None
+    granted: bool = False
+
+
+@dataclass
+class _ModelQueue:
+    limit: int
+    active: int = 0
+    waiting: list[_Ticket] = field(default_factory=list)
+    granted: dict[str, int] = field(default_factory=lambda: dict.fromkeys(PRIORITIES, 0))
+    wait_ms_total: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PRIORITIES, 0.0))
+    max_queue_depth: int = 0
+
+
+class RequestScheduler:
+    """Process-wide gate in front of Ollama: per-model caps, interactive before batch.
+
+    Waiters are granted in priority order and FIFO within a priority; batch
+    requests older than `starvation_s` compete as interactive. Sync callers
+    block on an Event, async callers await a Future, so threads and event
+    loops share the same queues. A waiter given `timeout_s` leaves the queue
+    with `TimeoutError` if no slot frees up in time.
+    """
+
+    def __init__(
+        self,
+        default_limit: int = DEFAULT_MODEL_CONCURRENCY,
+        model_limits: dict[str, int] | None = None,
+        starvation_s: float = DEFAULT_STARVATION_S,
+    ) -> None:
+        if default_limit <= 0 or any(limit <= 0 for limit in (model_limits or {}).values()):
+            raise ValueError("concurrency limits must be > 0")
+        self.default_limit = default_limit
+        self.model_limits = dict(model_limits or {})
+        self.starvation_s = starvation_s
+        self._lock = threading.Lock()
+        self._queues: dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        queue = self._queues.get(model)
+        if queue is None:
+            limit = self.model_limits.get(model, self.default_limit)
+            queue = self._queues[model] = _ModelQueue(limit=limit)
+        return queue
+
+    def _rank(self, ticket: _Ticket, now: float) -> tuple[int, int]:
+        rank = PRIORITIES.index(ticket.priority)
+        if now - ticket.enqueued_at >= self.starvation_s:
+            rank = 0
+        return rank, ticket.seq
+
+    def _grant_locked(self, model: str, queue: _ModelQueue) -> None:
+        now = time.perf_counter()
+        while queue.waiting and queue.active < queue.limit:
+            ticket = min(queue.waiting, key=lambda t: self._rank(t, now))
+            queue.waiting.remove(ticket)
+            queue.active += 1
+            ticket.granted = True
+            queue.granted[ticket.priority] += 1
+            queue.wait_ms_total[ticket.priority] += (now - ticket.enqueued_at) * 1000
+            if ticket.event is not None:
+                ticket.event.set()
+            elif ticket.loop is not None and ticket.future is not None:
+                ticket.loop.call_soon_threadsafe(_resolve, ticket.future)
+
+    def _enqueue_locked(self, model: str, ticket: _Ticket) -> _ModelQueue:
+        queue = self._queue(model)
+        queue.waiting.append(ticket)
+        queue.max_queue_depth = max(queue.max_queue_depth, len(queue.waiting))
+        self._grant_locked(model, queue)
+        return queue
+
+    def _release(self, model: str) -> None:
+        with self._lock:
+            queue = self._queue(model)
+            queue.active -= 1
+            self._grant_locked(model, queue)
+
+    def _ticket(self, priority: str | None) -> _Ticket:
+        priority = priority or current_priority()
+        if priority not in PRIORITIES:
+            raise ValueError(f"priority must be one of {PRIORITIES}, got {priority!r}")
+        return _Ticket(priority=priority, seq=next(self._seq), enqueued_at=time.perf_counter())
+
+    @contextlib.contextmanager
+    def slot(self, model: str, priority: str | None = None, timeout_s: float | None = None) -> Iterator[None]:
+        ticket = self._ticket(priority)
+        ticket.event = threading.Event()
+        with self._lock:
+            self._enqueue_locked(model, ticket)
+        if not ticket.event.wait(timeout_s):
+            with self._lock:
+                # A slot granted just as the wait timed out is kept.
+                if not ticket.granted:
+                    self._queue(model).waiting.remove(ticket)
+                    raise TimeoutError(f"no {model} slot within {timeout_s:.3g}s")
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    @contextlib.asynccontextmanager
+    async def aslot(
+        self, model: str, priority: str | None = None, timeout_s: float | None = None
+    ) -> AsyncIterator[None]:
+        ticket = self._ticket(priority)
+        ticket.loop = asyncio.get_running_loop()
+        ticket.future = ticket.loop.create_future()
+        with self._lock:
+            self._enqueue_locked(model, ticket)
+        # The timeout cancels the wait below and surfaces as TimeoutError.
+        async with asyncio.timeout(timeout_s):
+            try:
+                await ticket.future
+            except asyncio.CancelledError:
+                with self._lock:
+                    if not ticket.granted:
+                        self._queue(model).waiting.remove(ticket)
+                        raise
+                # Granted just as we were cancelled: hand the slot straight back.
+                self._release(model)
+                raise
+        try:
+            yield
+        finally:
+            self._release(model)
+
+    def metrics(self) -> dict[str, Any]:
+        with self._lock:
+            per_model: dict[str, Any] = {}
+            for model, queue in sorted(self._queues.items()):
+                queued = {p: sum(1 for t in queue.waiting if t.priority == p) for p in PRIORITIES}
+                per_model[model] = {
+                    "limit": queue.limit,
+                    "active": queue.active,
+                    "queued": queued,
+                    "max_queue_depth": queue.max_queue_depth,
+                    "granted": dict(queue.granted),
+                    "avg_wait_ms": {
+                        p: round(queue.wait_ms_total[p] / queue.granted[p], 2) if queue.granted[p] else None
+                        for p in PRIORITIES
+                    },
+                }
+        return {"default_limit": self.default_limit, "models": per_model}
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler() -> RequestScheduler:
+    return _scheduler
+
+
+def configure_scheduler(
+    default_limit: int = DEFAULT_MODEL_CONCURRENCY,
+    model_limits: dict[str, int] | None = None,
+    starvation_s: float = DEFAULT_STARVATION_S,
+) -> RequestScheduler:
+    """Replace the process-wide scheduler (call before issuing requests)."""
+    global _scheduler
+    _scheduler = RequestScheduler(default_limit, model_limits, starvation_s)
+    return _scheduler
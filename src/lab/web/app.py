@@ -1,27 +1,52 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
 import logging
 import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
 import orjson
 from fastapi import FastAPI, Form, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-from lab.model_registry import recommend
-from lab.ollama_client import OllamaClient
-from lab.rag import answer_question
+from lab.answer_cache import DEFAULT_SIMILARITY_THRESHOLD, AnswerCache
+from lab.backend_pool import default_backend_pool
+from lab.context_window import parse_num_ctx
+from lab.model_registry import policy_index, recommend
+from lab.ollama_client import aclose_clients, close_clients, get_async_client
+from lab.rag import aanswer_question, astream_answer_question
+from lab.scheduler import INTERACTIVE, PRIORITIES, get_scheduler, request_priority
 
 
 APP_ROOT = Path(__file__).resolve().parent
 TEMPLATES_DIR = APP_ROOT / "templates"
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-app = FastAPI(title="Local LLM Lab")
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    yield
+    # Release pooled Ollama connections so shutdown does not leave sockets half-open.
+    await aclose_clients()
+    close_clients()
+
+
+app = FastAPI(title="Local LLM Lab", lifespan=_lifespan)
 logger = logging.getLogger(__name__)
 JOB_STORE: dict[str, dict[str, Any]] = {}
+ANSWER_CACHE = AnswerCache(similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD)
+
+
+def _answer_cache(use_cache: Any) -> AnswerCache | None:
+    """Return the shared answer cache when a form or JSON payload opts in."""
+    if use_cache in (True, "on", "true", "1", 1):
+        return ANSWER_CACHE
+    return None
 
 
 def _latest_run_summaries(limit: int = 20) -> list[dict[str, Any]]:
@@ -102,6 +127,13 @@ def _recommended_model(task: str) -> str | None:
         return None
 
 
+async def _model_or_recommended(requested: Any, task: str) -> str:
+    """The requested model, else the recommendation for `task` (which may query Ollama) off the event loop."""
+    if requested:
+        return str(requested).strip()
+    return str(await asyncio.to_thread(_recommended_model, task) or "").strip()
+
+
 def _job_public(job_id: str) -> dict[str, Any]:
     raw = JOB_STORE[job_id]
     return {
@@ -111,17 +143,30 @@ def _job_public(job_id: str) -> dict[str, Any]:
         "created_at": raw["created_at"],
         "started_at": raw.get("started_at"),
         "finished_at": raw.get("finished_at"),
+        "priority": raw["priority"],
         "error": raw.get("error"),
         "result": raw.get("result"),
     }
 
 
+def _job_priority(payload: dict[str, Any]) -> str:
+    priority = str(payload.get("priority") or INTERACTIVE)
+    if priority not in PRIORITIES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITIES)}")
+    return priority
+
+
 async def _run_job(job_id: str, kind: str, func: Any, kwargs: dict[str, Any]) -> None:
     job = JOB_STORE[job_id]
     job["status"] = "running"
     job["started_at"] = asyncio.get_running_loop().time()
     try:
-        result = await asyncio.to_thread(func, **kwargs)
+        # to_thread copies the context, so sync jobs keep the priority too.
+        with request_priority(job["priority"]):
+            if inspect.iscoroutinefunction(func):
+                result = await func(**kwargs)
+            else:
+                result = await asyncio.to_thread(func, **kwargs)
     except Exception as exc:
         logger.exception("Background job failed: kind=%s job_id=%s", kind, job_id)
         job["status"] = "failed"
@@ -133,10 +178,11 @@ async def _run_job(job_id: str, kind: str, func: Any, kwargs: dict[str, Any]) ->
         job["finished_at"] = asyncio.get_running_loop().time()
 
 
-def _start_job(kind: str, func: Any, **kwargs: Any) -> dict[str, Any]:
+def _start_job(kind: str, func: Any, *, priority: str = INTERACTIVE, **kwargs: Any) -> dict[str, Any]:
     job_id = uuid.uuid4().hex[:12]
     JOB_STORE[job_id] = {
         "kind": kind,
+        "priority": priority,
         "status": "queued",
         "created_at": asyncio.get_running_loop().time(),
         "started_at": None,
@@ -148,6 +194,15 @@ def _start_job(kind: str, func: Any, **kwargs: Any) -> dict[str, Any]:
     return _job_public(job_id)
 
 
+async def _ndjson_stream(events: AsyncIterator[dict[str, Any]]) -> AsyncIterator[bytes]:
+    try:
+        async for event in events:
+            yield orjson.dumps(event) + b"\n"
+    except Exception as exc:
+        logger.exception("Streaming request failed")
+        yield orjson.dumps({"type": "error", "error": str(exc)}) + b"\n"
+
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request) -> HTMLResponse:
     return templates.TemplateResponse(request, "index.html", {"request": request})
@@ -159,7 +214,7 @@ async def chat_page(
     prompt: str = Form(default=""),
     model: str = Form(default=""),
     temperature: float = Form(default=0.2),
-    num_ctx: int = Form(default=4096),
+    num_ctx: str = Form(default="4096"),
 ) -> HTMLResponse:
     result: dict[str, Any] | None = None
     error: str | None = None
@@ -173,12 +228,11 @@ async def chat_page(
             error = "No chat model is installed. Try `ollama pull llama3`."
         else:
             try:
-                result = await asyncio.to_thread(
-                    OllamaClient().chat_generate,
+                result = await get_async_client().chat_generate(
                     model=chosen_model,
                     prompt=prompt,
                     temperature=temperature,
-                    num_ctx=num_ctx,
+                    num_ctx=parse_num_ctx(num_ctx),
                 )
                 result["model"] = chosen_model
             except Exception as exc:
@@ -207,7 +261,8 @@ async def rag_page(
     embed_model: str = Form(default=""),
     k: int = Form(default=5),
     temperature: float = Form(default=0.2),
-    num_ctx: int = Form(default=4096),
+    num_ctx: str = Form(default="4096"),
+    use_cache: str = Form(default=""),
 ) -> HTMLResponse:
     result: dict[str, Any] | None = None
     error: str | None = None
@@ -227,15 +282,15 @@ async def rag_page(
             error = "No embeddings model installed. Try `ollama pull nomic-embed-text`."
         else:
             try:
-                result = await asyncio.to_thread(
-                    answer_question,
+                result = await aanswer_question(
                     question=question,
                     index_dir=index_dir,
                     chat_model_name=chosen_model,
                     embed_model_name=chosen_embed,
                     k=k,
                     temperature=temperature,
-                    num_ctx=num_ctx,
+                    num_ctx=parse_num_ctx(num_ctx),
+                    answer_cache=_answer_cache(use_cache),
                 )
                 result["model"] = chosen_model
                 result["embed_model"] = chosen_embed
@@ -252,6 +307,7 @@ async def rag_page(
         "k": k,
         "temperature": temperature,
         "num_ctx": num_ctx,
+        "use_cache": bool(_answer_cache(use_cache)),
         "result": result,
         "error": error,
         "warnings": warnings,
@@ -310,16 +366,22 @@ async def start_chat_job(request: Request) -> dict[str, Any]:
     prompt = str(payload.get("prompt", "")).strip()
     if not prompt:
         return {"error": "prompt is required"}
-    model = str(payload.get("model") or _recommended_model("chat") or "").strip()
+    model = await _model_or_recommended(payload.get("model"), "chat")
     if not model:
         return {"error": "No chat model is installed. Try `ollama pull llama3`."}
+    try:
+        num_ctx = parse_num_ctx(payload.get("num_ctx", 4096))
+        priority = _job_priority(payload)
+    except ValueError as exc:
+        return {"error": str(exc)}
     job = _start_job(
         "chat",
-        OllamaClient().chat_generate,
+        get_async_client().chat_generate,
         model=model,
         prompt=prompt,
         temperature=float(payload.get("temperature", 0.2)),
-        num_ctx=int(payload.get("num_ctx", 4096)),
+        num_ctx=num_ctx,
+        priority=priority,
     )
     return job
 
@@ -330,26 +392,111 @@ async def start_rag_job(request: Request) -> dict[str, Any]:
     question = str(payload.get("question", "")).strip()
     if not question:
         return {"error": "question is required"}
-    chat_model = str(payload.get("model") or _recommended_model("rag_qa") or "").strip()
-    embed_model = str(payload.get("embed_model") or _recommended_model("embeddings") or "").strip()
+    chat_model = await _model_or_recommended(payload.get("model"), "rag_qa")
+    embed_model = await _model_or_recommended(payload.get("embed_model"), "embeddings")
     if not chat_model:
         return {"error": "No RAG chat model installed. Try `ollama pull llama3`."}
     if not embed_model:
         return {"error": "No embeddings model installed. Try `ollama pull nomic-embed-text`."}
+    try:
+        num_ctx = parse_num_ctx(payload.get("num_ctx", 4096))
+        priority = _job_priority(payload)
+    except ValueError as exc:
+        return {"error": str(exc)}
     job = _start_job(
         "rag",
-        answer_question,
+        aanswer_question,
         question=question,
         index_dir=str(payload.get("index_dir", "runs/index")),
         chat_model_name=chat_model,
         embed_model_name=embed_model,
         k=int(payload.get("k", 5)),
         temperature=float(payload.get("temperature", 0.2)),
-        num_ctx=int(payload.get("num_ctx", 4096)),
+        num_ctx=num_ctx,
+        answer_cache=_answer_cache(payload.get("use_cache")),
+        priority=priority,
     )
     return job
 
 
+@app.post("/api/stream/chat")
+async def stream_chat(request: Request) -> Any:
+    payload = await request.json()
+    prompt = str(payload.get("prompt", "")).strip()
+    if not prompt:
+        return {"error": "prompt is required"}
+    model = await _model_or_recommended(payload.get("model"), "chat")
+    if not model:
+        return {"error": "No chat model is installed. Try `ollama pull llama3`."}
+    try:
+        num_ctx = parse_num_ctx(payload.get("num_ctx", 4096))
+    except ValueError as exc:
+        return {"error": str(exc)}
+    events = get_async_client().chat_stream(
+        model,
+        [{"role": "user", "content": prompt}],
+        temperature=float(payload.get("temperature", 0.2)),
+        num_ctx=num_ctx,
+    )
+    return StreamingResponse(_ndjson_stream(events), media_type="application/x-ndjson")
+
+
+@app.post("/api/stream/rag")
+async def stream_rag(request: Request) -> Any:
+    payload = await request.json()
+    question = str(payload.get("question", "")).strip()
+    if not question:
+        return {"error": "question is required"}
+    chat_model = await _model_or_recommended(payload.get("model"), "rag_qa")
+    embed_model = await _model_or_recommended(payload.get("embed_model"), "embeddings")
+    if not chat_model:
+        return {"error": "No RAG chat model installed. Try `ollama pull llama3`."}
+    if not embed_model:
+        return {"error": "No embeddings model installed. Try `ollama pull nomic-embed-text`."}
+    try:
+        num_ctx = parse_num_ctx(payload.get("num_ctx", 4096))
+    except ValueError as exc:
+        return {"error": str(exc)}
+    events = astream_answer_question(
+        question=question,
+        index_dir=str(payload.get("index_dir", "runs/index")),
+        chat_model_name=chat_model,
+        embed_model_name=embed_model,
+        k=int(payload.get("k", 5)),
+        temperature=float(payload.get("temperature", 0.2)),
+        num_ctx=num_ctx,
+        answer_cache=_answer_cache(payload.get("use_cache")),
+    )
+    return StreamingResponse(_ndjson_stream(events), media_type="application/x-ndjson")
+
+
+@app.get("/api/scheduler")
+async def scheduler_metrics() -> dict[str, Any]:
+    return get_scheduler().metrics()
+
+
+@app.get("/api/backends")
+async def backend_metrics() -> dict[str, Any]:
+    pool = default_backend_pool()
+    if pool is None:
+        return {"backends": [], "hedging": None}
+    return pool.metrics()
+
+
+@app.get("/api/models")
+async def model_policy() -> dict[str, Any]:
+    """Installed-vs-policy status and per-task picks, served from the cached policy index."""
+    try:
+        index = await asyncio.to_thread(policy_index)
+    except Exception as exc:
+        logger.exception("Failed to build model policy index")
+        return {"error": str(exc), "status": {}, "recommended": {}}
+    return {
+        "status": {key: [entry.name for entry in entries] for key, entries in index.status().items()},
+        "recommended": {task: index.recommendation(task)["chosen_model"] for task in ("chat", "rag_qa", "embeddings")},
+    }
+
+
 @app.get("/api/jobs/{job_id}")
 async def get_job(job_id: str) -> dict[str, Any]:
     if job_id not in JOB_STORE:
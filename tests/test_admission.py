@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from lab.admission import (
+    ADMIT,
+    DEFAULT_KV_BYTES_PER_TOKEN,
+    DOWNGRADE,
+    GIB,
+    AdmissionController,
+    AdmissionError,
+    is_local_backend,
+    kv_bytes_per_token,
+)
+from lab.modelspec import HardwareProfile
+from lab.ollama_client import OllamaClient
+from lab.scheduler import get_scheduler
+
+HARDWARE = HardwareProfile(
+    unified_memory_gb=16,
+    free_storage_gb=100,
+    recommended_max_class="8b",
+    safe_default_num_ctx=4096,
+    cautious_max_num_ctx=16384,
+)
+
+
+class _MetadataClient:
+    """Answers like Ollama for a 4 GiB `llama3` using the default KV estimate (0.125 MiB per token)."""
+
+    def __init__(self, running: list[dict[str, Any]] | None = None) -> None:
+        self.running = running or []
+        self.on_ps = None
+        self.routed: list[str | None] = []
+
+    def running_models(self, model: str | None = None) -> list[dict[str, Any]]:
+        self.routed.append(model)
+        if self.on_ps is not None:
+            self.on_ps()
+        return list(self.running)
+
+    def model_sizes(self, model: str | None = None) -> dict[str, int]:
+        self.routed.append(model)
+        return {"llama3:latest": 4 * GIB, "big:latest": 6 * GIB}
+
+    def show(self, model: str) -> dict[str, Any]:
+        raise RuntimeError("no metadata")
+
+
+class AdmissionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.meminfo = Path(tmpdir.name) / "meminfo"
+        self.set_available(10)
+        log_patch = patch("lab.admission.log_event")
+        self.log_event = log_patch.start()
+        self.addCleanup(log_patch.stop)
+
+    def set_available(self, gib: float) -> None:
+        kib = int(gib * GIB) // 1024
+        self.meminfo.write_text(f"MemTotal: {16 * GIB // 1024} kB\nMemAvailable: {kib} kB\n", encoding="utf-8")
+
+    def controller(self, **kwargs: Any) -> AdmissionController:
+        return AdmissionController(reserve_gb=2.0, poll_s=0.01, hardware=HARDWARE, meminfo_path=self.meminfo, **kwargs)
+
+    def test_admits_and_downgrades_num_ctx(self) -> None:
+        controller = self.controller()
+        client = _MetadataClient()
+
+        decision = controller.admit(client, "llama3", 4096)
+        self.assertEqual((decision.action, decision.num_ctx), (ADMIT, 4096))
+
+        capped = controller.admit(client, "llama3", 32768)
+        self.assertEqual((capped.action, capped.num_ctx), (DOWNGRADE, 16384))
+        self.assertIn("cautious_max_num_ctx", capped.reason)
+
+        # 7 GiB free minus the 2 GiB reserve leaves room for 4 GiB of weights plus an 8k KV cache.
+        self.set_available(7)
+        squeezed = controller.admit(client, "llama3", 16384)
+        self.assertEqual((squeezed.action, squeezed.num_ctx), (DOWNGRADE, 8192))
+        self.assertEqual(controller.metrics()["decisions"], {"admit": 1, "downgrade": 2, "queue": 0, "reject": 0})
+        self.assertEqual(self.log_event.call_args.args[0], "admission")
+
+    def test_resident_model_and_idle_models_count_toward_the_budget(self) -> None:
+        self.set_available(1)
+        resident = _MetadataClient([{"name": "llama3:latest", "size": 5 * GIB}])
+        self.assertEqual(self.controller().admit(resident, "llama3", 4096).num_ctx, 4096)
+        # Memory is read from the backend the request is routed to.
+        self.assertEqual(set(resident.routed), {"llama3"})
+
+        idle = _MetadataClient([{"name": "big:latest", "size": 6 * GIB}])
+        decision = self.controller().admit(idle, "llama3", 4096)
+        self.assertEqual(decision.action, ADMIT)
+        self.assertIn("idle", decision.reason)
+
+    def test_busy_models_queue_until_memory_frees(self) -> None:
+        self.set_available(3)
+        client = _MetadataClient([{"name": "big:latest", "size": 6 * GIB}])
+        calls = []
+
+        def release() -> None:
+            calls.append(1)
+            if len(calls) == 2:
+                client.running = []
+                self.set_available(9)
+
+        client.on_ps = release
+        controller = self.controller(queue_timeout_s=5.0)
+        with get_scheduler().slot("big"):
+            decision = controller.admit(client, "llama3", 4096)
+        self.assertEqual(decision.action, ADMIT)
+        self.assertEqual(controller.metrics()["decisions"]["queue"], 1)
+        self.assertTrue(self.log_event.call_args.args[1]["queued"])
+
+        # A caller's own time budget ends the wait before queue_timeout_s does.
+        client.running, client.on_ps = [{"name": "big:latest", "size": 6 * GIB}], None
+        self.set_available(3)
+        with get_scheduler().slot("big"), self.assertRaises(TimeoutError):
+            controller.admit(client, "llama3", 4096, timeout_s=0.05)
+
+    def test_rejects_when_nothing_can_make_room(self) -> None:
+        self.set_available(3)
+        client = _MetadataClient([{"name": "big:latest", "size": 6 * GIB}])
+        with get_scheduler().slot("big"), self.assertRaises(AdmissionError) as ctx:
+            self.controller(queue_timeout_s=0.0).admit(client, "llama3", 4096)
+        self.assertIn("still waiting", str(ctx.exception))
+
+        self.set_available(2)
+        with self.assertRaises(AdmissionError):
+            self.controller().admit(_MetadataClient(), "llama3", 4096)
+        self.assertEqual(self.log_event.call_args.args[1]["action"], "reject")
+
+    def test_only_calls_routed_to_this_machine_are_admitted(self) -> None:
+        self.assertTrue(is_local_backend("http://127.0.0.1:11434"))
+        self.assertTrue(is_local_backend("http://localhost:11434"))
+        self.assertFalse(is_local_backend("http://gpu-box.internal:11434"))
+
+        controller = MagicMock()
+        controller.admit.return_value.num_ctx = 2048
+        payload = {"model": "llama3", "options": {"num_ctx": 8192}}
+        with patch("lab.ollama_client.get_admission_controller", return_value=controller):
+            # This machine's /proc/meminfo says nothing about a remote host's memory.
+            remote = OllamaClient("http://gpu-box.internal:11434")._admit("llama3", payload, 8192)
+            controller.admit.assert_not_called()
+            local = OllamaClient("http://127.0.0.1:11434")._admit("llama3", payload, 8192)
+        self.assertEqual(remote, (payload, 8192))
+        self.assertEqual(local[1], 2048)
+        self.assertEqual(controller.admit.call_count, 1)
+
+    def test_kv_bytes_per_token_from_model_info(self) -> None:
+        info = {
+            "general.architecture": "qwen2",
+            "qwen2.block_count": 28,
+            "qwen2.attention.head_count": 28,
+            "qwen2.attention.head_count_kv": 4,
+            "qwen2.embedding_length": 3584,
+        }
+        self.assertEqual(kv_bytes_per_token({"model_info": info}), 28 * 4 * 128 * 2 * 2)
+        self.assertEqual(kv_bytes_per_token({}), DEFAULT_KV_BYTES_PER_TOKEN)
+
+
+if __name__ == "__main__":
+    unittest.main()
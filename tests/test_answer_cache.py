@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from lab.answer_cache import AnswerCache
+from lab.rag import answer_question
+
+
+def _fake_stream(text: str) -> list[dict[str, object]]:
+    return [{"type": "token", "text": text}, {"type": "done", "text": text, "num_ctx": 4096}]
+
+
+class AnswerCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.index_dir = self.root / "index"
+        self.index_dir.mkdir()
+        (self.index_dir / "index.sqlite").write_bytes(b"v1")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _cache(self, **kwargs: object) -> AnswerCache:
+        return AnswerCache(path=self.root / "answers.sqlite", **kwargs)
+
+    def test_exact_match_ignores_case_and_whitespace(self) -> None:
+        cache = self._cache()
+        scope = cache.scope(self.index_dir, "llama3", "nomic", {"k": 3})
+        cache.put(scope, "What is  RAG?", {"answer_text": "Retrieval."})
+
+        hit = cache.get_exact(scope, "what is rag?")
+
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit["match"], "exact")
+        self.assertEqual(hit["result"]["answer_text"], "Retrieval.")
+        other_scope = cache.scope(self.index_dir, "llama3", "nomic", {"k": 5})
+        self.assertIsNone(cache.get_exact(other_scope, "what is rag?"))
+
+    def test_every_operation_closes_its_connection(self) -> None:
+        opened: list[sqlite3.Connection] = []
+        real_connect = sqlite3.connect
+
+        def tracking_connect(*args: object, **kwargs: object) -> sqlite3.Connection:
+            conn = real_connect(*args, **kwargs)
+            opened.append(conn)
+            return conn
+
+        cache = self._cache(similarity_threshold=0.9)
+        scope = cache.scope(self.index_dir, "llama3", "nomic", {"k": 3})
+        with patch("lab.answer_cache.sqlite3.connect", side_effect=tracking_connect):
+            cache.put(scope, "What is RAG?", {"answer_text": "Retrieval."}, [1.0, 0.0])
+            self.assertIsNotNone(cache.get_exact(scope, "what is rag?"))
+            self.assertIsNone(cache.get_exact(scope, "unknown"))
+            self.assertIsNotNone(cache.get_similar(scope, [1.0, 0.0]))
+            cache.clear()
+
+        self.assertEqual(len(opened), 5)
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+    def test_semantic_match_requires_threshold(self) -> None:
+        cache = self._cache(similarity_threshold=0.95)
+        scope = cache.scope(self.index_dir, "llama3", "nomic", {})
+        cache.put(scope, "What is RAG?", {"answer_text": "Retrieval."}, query_vec=[1.0, 0.0])
+
+        near = cache.get_similar(scope, [0.99, 0.05])
+        far = cache.get_similar(scope, [0.5, 0.5])
+
+        self.assertEqual(near["match"], "semantic")
+        self.assertGreaterEqual(near["similarity"], 0.95)
+        self.assertIsNone(far)
+        self.assertIsNone(self._cache().get_similar(scope, [1.0, 0.0]))
+
+    def test_rebuilt_index_invalidates_entries(self) -> None:
+        cache = self._cache()
+        scope = cache.scope(self.index_dir, "llama3", "nomic", {})
+        cache.put(scope, "Q?", {"answer_text": "old"})
+
+        db_path = self.index_dir / "index.sqlite"
+        db_path.write_bytes(b"version-2")
+        stat = db_path.stat()
+        os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        new_scope = cache.scope(self.index_dir, "llama3", "nomic", {})
+
+        self.assertNotEqual(scope["generation"], new_scope["generation"])
+        self.assertIsNone(cache.get_exact(new_scope, "Q?"))
+        self.assertIsNone(cache.get_exact(scope, "Q?"))
+
+    def test_ttl_and_lru_eviction(self) -> None:
+        cache = self._cache(max_entries=2)
+        scope = cache.scope(self.index_dir, "llama3", "nomic", {})
+        cache.put(scope, "one", {"answer_text": "1"})
+        cache.put(scope, "two", {"answer_text": "2"})
+        self.assertIsNotNone(cache.get_exact(scope, "one"))
+        cache.put(scope, "three", {"answer_text": "3"})
+
+        self.assertIsNone(cache.get_exact(scope, "two"))
+        self.assertIsNotNone(cache.get_exact(scope, "one"))
+
+        expired = self._cache(ttl_s=-1)
+        self.assertIsNone(expired.get_exact(scope, "one"))
+
+    @patch("lab.rag.log_event")
+    @patch("lab.rag._load_prompt_template")
+    @patch("lab.rag.get_client")
+    @patch("lab.rag.embed_query")
+    @patch("lab.rag.retrieve")
+    def test_answer_question_serves_repeat_and_near_duplicate_from_cache(
+        self,
+        mock_retrieve,
+        mock_embed_query,
+        mock_ollama_client,
+        mock_load_prompt_template,
+        mock_log_event,
+    ) -> None:
+        mock_retrieve.return_value = [
+            {"path": "a.md", "chunk_id": 0, "score": 0.9, "full_text": "RAG text", "snippet": "RAG"}
+        ]
+        mock_embed_query.side_effect = [[1.0, 0.0], [0.99, 0.02]]
+        mock_load_prompt_template.side_effect = ["sys", "q={question}\nctx={context}"]
+        mock_ollama_client.return_value.chat_stream.return_value = _fake_stream("Retrieval.")
+        cache = self._cache(similarity_threshold=0.95)
+        kwargs = {
+            "index_dir": str(self.index_dir),
+            "chat_model_name": "llama3",
+            "embed_model_name": "nomic",
+            "k": 1,
+            "temperature": 0.2,
+            "num_ctx": 2048,
+            "answer_cache": cache,
+        }
+
+        first = answer_question(question="What is RAG?", **kwargs)
+        repeat = answer_question(question="what is rag?", **kwargs)
+        near = answer_question(question="What's RAG?", **kwargs)
+
+        self.assertEqual(first["cache"], {"hit": False})
+        self.assertEqual(mock_retrieve.call_args.kwargs["query_vec"], [1.0, 0.0])
+        self.assertEqual(repeat["cache"]["match"], "exact")
+        self.assertEqual(near["cache"]["match"], "semantic")
+        self.assertEqual(near["answer_text"], "Retrieval.")
+        self.assertEqual(near["citations"], [{"path": "a.md", "chunk_id": 0}])
+        self.assertEqual(mock_retrieve.call_count, 1)
+        self.assertEqual(mock_ollama_client.return_value.chat_stream.call_count, 1)
+        _, payload = mock_log_event.call_args.args
+        self.assertTrue(payload["cache_hit"])
+        self.assertEqual(payload["cache_match"], "semantic")
+
+
+if __name__ == "__main__":
+    unittest.main()
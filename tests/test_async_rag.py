@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import orjson
+
+from lab.ollama_client import AsyncOllamaClient, OllamaClient
+from lab.rag import aanswer_question
+from lab.retrieval import aretrieve, retrieve
+
+_RealAsyncClient = httpx.AsyncClient
+_RealClient = httpx.Client
+
+
+@contextlib.contextmanager
+def _cwd(path: Path):
+    prev = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+def _write_index(index_dir: Path) -> None:
+    index_dir.mkdir(parents=True)
+    with sqlite3.connect(index_dir / "index.sqlite") as conn:
+        conn.execute(
+            "CREATE TABLE chunks (doc_id TEXT, path TEXT, chunk_id INTEGER, text TEXT, embedding TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+            [
+                ("doc-001", "corpus/rag.md", 0, "RAG combines retrieval and generation.", "[1.0, 0.0]"),
+                ("doc-002", "corpus/ops.md", 0, "Ollama runs local models.", "[0.0, 1.0]"),
+            ],
+        )
+
+
+async def _fake_ollama(request: httpx.Request) -> httpx.Response:
+    body = orjson.loads(request.content)
+    if request.url.path == "/api/embed":
+        return httpx.Response(200, json={"embeddings": [[1.0, 0.1] for _ in body["input"]]})
+    await asyncio.sleep(0.05)
+    lines = [
+        {"message": {"content": "RAG combines retrieval "}, "done": False},
+        {"message": {"content": "and generation."}, "done": False},
+        {
+            "message": {"content": ""},
+            "done": True,
+            "load_duration": 1_500_000,
+            "prompt_eval_count": 42,
+            "prompt_eval_duration": 4_000_000,
+            "eval_count": 6,
+            "eval_duration": 12_000_000,
+        },
+    ]
+    return httpx.Response(200, content=b"\n".join(orjson.dumps(line) for line in lines))
+
+
+def _fake_template(name: str) -> str:
+    return "sys" if "system" in name else "{question}\n{context}"
+
+
+def _mock_async_client(**kwargs: object) -> httpx.AsyncClient:
+    return _RealAsyncClient(transport=httpx.MockTransport(_fake_ollama), **kwargs)
+
+
+class AsyncRagTests(unittest.TestCase):
+    @patch("lab.rag._load_prompt_template", side_effect=_fake_template)
+    @patch("lab.ollama_client.httpx.AsyncClient", side_effect=_mock_async_client)
+    def test_concurrent_aanswer_question_shares_one_event_loop(self, _mock_client, _mock_prompts) -> None:
+        async def run_many(count: int) -> list[dict[str, object]]:
+            return await asyncio.gather(
+                *[
+                    aanswer_question(
+                        question="What is RAG?",
+                        index_dir="index",
+                        chat_model_name="fake-chat",
+                        embed_model_name="fake-embed",
+                        k=1,
+                        temperature=0.2,
+                        num_ctx=2048,
+                    )
+                    for _ in range(count)
+                ]
+            )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_index(root / "index")
+            with _cwd(root):
+                started = time.perf_counter()
+                results = asyncio.run(run_many(40))
+                elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(results), 40)
+        self.assertEqual(results[0]["answer_text"], "RAG combines retrieval and generation.")
+        self.assertEqual(results[0]["citations"], [{"path": "corpus/rag.md", "chunk_id": 0}])
+        self.assertIsNotNone(results[0]["ttft_ms"])
+        timings = results[0]["timings"]
+        for stage in ("embed_ms", "retrieve_ms", "build_ms", "generate_ms", "total_ms"):
+            self.assertIn(stage, timings)
+        self.assertEqual(timings["load_duration_ms"], 1.5)
+        self.assertEqual(timings["prompt_eval_count"], 42)
+        self.assertEqual(timings["eval_duration_ms"], 12.0)
+        # 40 x 50ms generations overlap on the loop instead of running back to back.
+        self.assertLess(elapsed, 1.5)
+
+    def test_async_embed_sends_the_sync_request_and_returns_float32(self) -> None:
+        bodies: list[bytes] = []
+
+        def record(request: httpx.Request) -> httpx.Response:
+            bodies.append(request.content)
+            return httpx.Response(200, json={"embeddings": [[1.0, 0.1]]})
+
+        async def arecord(request: httpx.Request) -> httpx.Response:
+            return record(request)
+
+        async def aquery() -> object:
+            async with AsyncOllamaClient("http://fake") as client:
+                return await aretrieve("What is RAG?", 1, "index", "fake-embed", client=client, timings={})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_index(root / "index")
+            with (
+                _cwd(root),
+                patch(
+                    "lab.ollama_client.httpx.Client",
+                    side_effect=lambda **kw: _RealClient(transport=httpx.MockTransport(record), **kw),
+                ),
+                patch(
+                    "lab.ollama_client.httpx.AsyncClient",
+                    side_effect=lambda **kw: _RealAsyncClient(transport=httpx.MockTransport(arecord), **kw),
+                ),
+                patch("lab.embeddings.get_client", return_value=OllamaClient("http://fake")),
+            ):
+                sync_hits = retrieve("What is RAG?", 1, "index", "fake-embed")
+                async_hits = asyncio.run(aquery())
+
+        self.assertEqual(orjson.loads(bodies[0]), orjson.loads(bodies[1]))
+        self.assertTrue(orjson.loads(bodies[1])["truncate"])
+        self.assertEqual(sync_hits, async_hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
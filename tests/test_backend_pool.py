@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import select
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from lab.backend_pool import BackendPool, BackendSpec, HealthCheckSpec, HedgeSpec
+from lab.ollama_client import AsyncOllamaClient, OllamaClient
+
+
+class _StubOllama(ThreadingHTTPServer):
+    def __init__(
+        self, installed: list[str], loaded: list[str], chat_status: int = 200, delay_s: float = 0.0
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.installed = installed
+        self.loaded = loaded
+        self.chat_status = chat_status
+        self.delay_s = delay_s
+        self.hits: list[str] = []
+        self.hung_up = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def handle_error(self, request: object, client_address: object) -> None:
+        pass  # Hedged losers hang up before the slow stub answers.
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: _StubOllama
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._send(200, {"models": [{"name": name} for name in self.server.installed]})
+        elif self.path == "/api/ps":
+            self._send(200, {"models": [{"name": name} for name in self.server.loaded]})
+        else:
+            self._send(404, {})
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.hits.append(self.path)
+        self.server.release.wait(timeout=5)
+        # Wait out the delay like a generating model, but notice a client hanging up.
+        readable, _, _ = select.select([self.connection], [], [], self.server.delay_s)
+        if readable and not self.connection.recv(1, socket.MSG_PEEK):
+            self.server.hung_up.set()
+            return
+        if self.server.chat_status != 200:
+            self._send(self.server.chat_status, {"error": "boom"})
+            return
+        if self.path == "/api/embed":
+            self._send(200, {"embeddings": [[1.0, 0.0]]})
+            return
+        self._send(200, {"message": {"content": self.server.url}, "done": True, "eval_count": 1})
+
+
+def _unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackendPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.servers: list[_StubOllama] = []
+
+    def tearDown(self) -> None:
+        for server in self.servers:
+            server.release.set()
+            server.shutdown()
+            server.server_close()
+
+    def _server(self, **kwargs: object) -> _StubOllama:
+        server = _StubOllama(**kwargs)
+        self.servers.append(server)
+        return server
+
+    def _pool(self, *urls: str, hedge: HedgeSpec | None = None) -> BackendPool:
+        specs = [BackendSpec(name=f"b{i}", base_url=url) for i, url in enumerate(urls)]
+        return BackendPool(specs, HealthCheckSpec(interval_s=60, timeout_s=1), hedge)
+
+    def _hedging_pool(self) -> tuple[BackendPool, _StubOllama, _StubOllama]:
+        slow = self._server(installed=["llama3"], loaded=["llama3"], delay_s=1.0)
+        fast = self._server(installed=["llama3"], loaded=[])
+        hedge = HedgeSpec(enabled=True, percentile=90, min_delay_ms=10, min_samples=3)
+        pool = self._pool(slow.url, fast.url, hedge=hedge)
+        for latency_ms in (20.0, 25.0, 30.0):
+            pool.record_latency("llama3", latency_ms)
+        return pool, slow, fast
+
+    def test_routes_to_backend_with_model_loaded(self) -> None:
+        cold = self._server(installed=["llama3:latest"], loaded=[])
+        warm = self._server(installed=["llama3:latest"], loaded=["llama3:latest"])
+        pool = self._pool(cold.url, warm.url)
+
+        self.assertEqual(pool.candidates("llama3"), [warm.url, cold.url])
+        with OllamaClient(pool=pool) as client:
+            result = client.chat_generate("llama3", "hi")
+
+        self.assertEqual(result["text"], warm.url)
+        self.assertEqual(cold.hits, [])
+
+    def test_skips_backends_without_the_model(self) -> None:
+        other = self._server(installed=["mistral:latest"], loaded=["mistral:latest"])
+        has_it = self._server(installed=["llama3:latest"], loaded=[])
+        pool = self._pool(other.url, has_it.url)
+
+        self.assertEqual(pool.candidates("llama3"), [has_it.url])
+        self.assertEqual(pool.installed_models(), ["llama3:latest", "mistral:latest"])
+        # Admission metadata comes from the backend the model is routed to.
+        with OllamaClient(pool=pool) as client:
+            self.assertEqual(list(client.model_sizes("llama3")), ["llama3:latest"])
+            self.assertEqual(client.running_models("llama3"), [])
+            self.assertEqual(client.running_models("mistral"), [{"name": "mistral:latest"}])
+
+    def test_least_outstanding_balancing(self) -> None:
+        first = self._server(installed=["llama3"], loaded=[])
+        second = self._server(installed=["llama3"], loaded=[])
+        pool = self._pool(first.url, second.url)
+        first.release.clear()
+
+        with OllamaClient(pool=pool) as client:
+            busy = threading.Thread(target=client.embed, args=("llama3", ["a"]))
+            busy.start()
+            for _ in range(200):
+                if first.hits:
+                    break
+                threading.Event().wait(0.01)
+            self.assertEqual(pool.status()[0]["outstanding"], 1)
+            client.embed("llama3", ["b"])
+            first.release.set()
+            busy.join()
+
+        self.assertEqual(first.hits, ["/api/embed"])
+        self.assertEqual(second.hits, ["/api/embed"])
+
+    def test_fails_over_on_connection_error_and_5xx(self) -> None:
+        healthy = self._server(installed=["llama3"], loaded=[])
+        broken = self._server(installed=["llama3"], loaded=[], chat_status=500)
+        down_url = f"http://127.0.0.1:{_unused_port()}"
+        pool = self._pool(broken.url, down_url, healthy.url)
+        pool.probe_all()
+        # Pretend the down backend looked fine at the last probe so the request tries it.
+        pool.states[1].healthy = True
+        pool.states[1].installed = {"llama3"}
+
+        with OllamaClient(pool=pool) as client:
+            result = client.chat_generate("llama3", "hi")
+
+        self.assertEqual(result["text"], healthy.url)
+        status = {entry["name"]: entry for entry in pool.status()}
+        self.assertEqual(status["b0"]["failures"], 1)
+        self.assertTrue(status["b0"]["healthy"])
+        self.assertFalse(status["b1"]["healthy"])
+        self.assertEqual(status["b2"]["loaded"], ["llama3"])
+        self.assertEqual(pool.candidates("llama3")[-1], down_url)
+
+    def test_last_backend_error_propagates(self) -> None:
+        broken = self._server(installed=["llama3"], loaded=[], chat_status=503)
+        pool = self._pool(broken.url)
+
+        with OllamaClient(pool=pool) as client, self.assertRaises(httpx.HTTPStatusError):
+            client.embed("llama3", ["a"])
+
+    def test_hedge_delay_needs_samples_and_two_healthy_backends(self) -> None:
+        pool = self._pool("http://a", "http://b", hedge=HedgeSpec(enabled=True, min_samples=2, min_delay_ms=5))
+        pool.record_latency("m", 100.0)
+        self.assertIsNone(pool.hedge_delay_s("m"))
+        pool.record_latency("m", 300.0)
+        self.assertAlmostEqual(pool.hedge_delay_s("m"), 0.3)
+        pool.states[1].healthy = False
+        self.assertIsNone(pool.hedge_delay_s("m"))
+
+    def test_hedged_chat_takes_the_faster_backend(self) -> None:
+        pool, slow, fast = self._hedging_pool()
+
+        started = time.perf_counter()
+        with OllamaClient(pool=pool) as client:
+            result = client.chat_generate("llama3", "hi")
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result["text"], fast.url)
+        self.assertLess(elapsed, 0.9)
+        # The losing request is disconnected, so the slow backend stops generating.
+        self.assertTrue(slow.hung_up.wait(timeout=0.5))
+        self.assertEqual(slow.hits, ["/api/chat"])
+        hedging = pool.metrics()["hedging"]["models"]["llama3"]
+        self.assertEqual((hedging["sent"], hedging["won"], hedging["cancelled"]), (1, 1, 1))
+
+    def test_hedged_embed_disconnects_the_slow_request(self) -> None:
+        pool, slow, fast = self._hedging_pool()
+
+        started = time.perf_counter()
+        with OllamaClient(pool=pool) as client:
+            self.assertEqual(client.embed("llama3", ["a"])["embeddings"], [[1.0, 0.0]])
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertTrue(slow.hung_up.wait(timeout=0.5))
+        self.assertEqual(fast.hits, ["/api/embed"])
+
+    def test_async_hedge_cancels_the_slow_request(self) -> None:
+        pool, _slow, fast = self._hedging_pool()
+
+        async def scenario() -> list[list[float]]:
+            async with AsyncOllamaClient(pool=pool) as client:
+                return (await client.embed("llama3", ["a"]))["embeddings"]
+
+        started = time.perf_counter()
+        self.assertEqual(asyncio.run(scenario()), [[1.0, 0.0]])
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertEqual(fast.hits, ["/api/embed"])
+        # The cancelled duplicate is no longer counted against the slow backend.
+        self.assertEqual(pool.status()[0]["outstanding"], 0)
+        self.assertEqual(pool.metrics()["hedging"]["models"]["llama3"]["won"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
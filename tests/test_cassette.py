@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import orjson
+
+from lab.cassette import Cassette, CassetteMiss, configure_cassette, fingerprint
+from lab.fake_ollama import FakeOllamaConfig, hash_embedding, start_fake_ollama
+from lab.model_registry import DISCOVERY_CACHE_PATH, installed_models, invalidate_installed_models
+from lab.ollama_client import OllamaClient
+from lab.rag import aanswer_question, answer_question
+
+
+@contextlib.contextmanager
+def _cwd(path: Path):
+    prev = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+def _write_index(index_dir: Path, dim: int) -> None:
+    texts = ["RAG combines retrieval and generation.", "Ollama runs local models."]
+    index_dir.mkdir(parents=True)
+    with sqlite3.connect(index_dir / "index.sqlite") as conn:
+        conn.execute("CREATE TABLE chunks (doc_id TEXT, path TEXT, chunk_id INTEGER, text TEXT, embedding TEXT)")
+        conn.executemany(
+            "INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+            [
+                (f"doc-{num:03d}", f"corpus/doc{num}.md", 0, text, orjson.dumps(hash_embedding(text, dim)).decode())
+                for num, text in enumerate(texts)
+            ],
+        )
+
+
+def _fake_template(name: str) -> str:
+    return "sys" if "system" in name else "{question}\n{context}"
+
+
+class CassetteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = Path(tmpdir.name) / "cassette.sqlite"
+        self.addCleanup(configure_cassette, None)
+
+    def test_record_then_replay_without_a_server(self) -> None:
+        server = start_fake_ollama(FakeOllamaConfig(ttft_ms=30, response_tokens=6, embed_dim=8))
+        url = server.url
+        recorder = configure_cassette(self.path, "record")
+        with OllamaClient(url) as client:
+            recorded_chat = client.chat_generate("llama3", "hello cassette", keep_alive="5m")
+            recorded_embed = client.embed("nomic-embed-text", ["a", "b"])
+            recorded_models = client.list_models()
+        server.shutdown()
+        server.server_close()
+        self.assertEqual(recorder.summary()["recorded"], 3)
+
+        player = configure_cassette(self.path, "replay")
+        with OllamaClient(url) as client:
+            # keep_alive does not change the answer, so it is not part of the fingerprint.
+            replayed_chat = client.chat_generate("llama3", "hello cassette")
+            replayed_embed = client.embed("nomic-embed-text", ["a", "b"])
+            self.assertEqual(client.list_models(), recorded_models)
+            self.assertIsNone(client.preload("llama3")["load_duration_ms"])
+            with self.assertRaises(CassetteMiss):
+                client.chat_generate("llama3", "never recorded")
+
+        self.assertEqual(replayed_chat, recorded_chat)
+        self.assertGreaterEqual(replayed_chat["ttft_ms"], 30)
+        self.assertEqual(replayed_embed, recorded_embed)
+        self.assertEqual(player.summary()["hits"], 3)
+        self.assertEqual(player.summary()["misses"], 1)
+
+    @patch("lab.rag._load_prompt_template", side_effect=_fake_template)
+    def test_cli_and_web_paths_replay_each_others_recordings(self, _mock_prompts) -> None:
+        # `lab run` answers through the sync client and the web app through the
+        # async one; both must send identical requests so one cassette serves both.
+        server = start_fake_ollama(FakeOllamaConfig(ttft_ms=40, response_tokens=5, embed_dim=8))
+        options = {
+            "index_dir": "index",
+            "chat_model_name": "llama3",
+            "embed_model_name": "nomic-embed-text",
+            "k": 1,
+            "temperature": 0.0,
+            "num_ctx": 2048,
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            _write_index(root / "index", dim=8)
+            with _cwd(root), patch.dict(os.environ, {"OLLAMA_HOST": server.url}):
+                configure_cassette(self.path, "record")
+                recorded_sync = answer_question(question="What is RAG?", **options)
+                recorded_async = asyncio.run(aanswer_question(question="What runs models?", **options))
+                server.shutdown()
+                server.server_close()
+
+                player = configure_cassette(self.path, "replay")
+                replayed_async = asyncio.run(aanswer_question(question="What is RAG?", **options))
+                replayed_sync = answer_question(question="What runs models?", **options)
+
+        self.assertEqual(player.summary()["misses"], 0)
+        self.assertEqual(player.summary()["hits"], 4)
+        for recorded, replayed in ((recorded_sync, replayed_async), (recorded_async, replayed_sync)):
+            self.assertEqual(replayed["answer_text"], recorded["answer_text"])
+            self.assertEqual(replayed["citations"], recorded["citations"])
+            # Replay reports the recorded call's timings, not how fast the cassette was read.
+            for key in ("latency_ms", "ttft_ms", "inter_token_ms_avg"):
+                self.assertEqual(replayed[key], recorded[key], msg=key)
+            self.assertEqual(replayed["timings"]["total_ms"], recorded["latency_ms"])
+            self.assertGreaterEqual(replayed["ttft_ms"], 40)
+
+    def test_model_discovery_goes_through_the_cassette(self) -> None:
+        server = start_fake_ollama(FakeOllamaConfig(models=["llama3:latest"]))
+        with tempfile.TemporaryDirectory() as tmpdir, _cwd(Path(tmpdir)):
+            self.addCleanup(invalidate_installed_models)
+            with patch.dict(os.environ, {"OLLAMA_HOST": server.url}):
+                # A fresh disk cache from an earlier command would otherwise skip /api/tags.
+                self.assertEqual(installed_models(), {"llama3:latest"})
+                self.assertTrue(DISCOVERY_CACHE_PATH.exists())
+                recorder = configure_cassette(self.path, "record")
+                self.assertEqual(installed_models(), {"llama3:latest"})
+                self.assertEqual(recorder.summary()["recorded"], 1)
+                server.shutdown()
+                server.server_close()
+
+                # Replay elsewhere: the recorded list wins over this machine's cache.
+                DISCOVERY_CACHE_PATH.write_bytes(
+                    orjson.dumps({"source": server.url, "fetched_at": 1e12, "models": ["mistral:latest"]})
+                )
+                player = configure_cassette(self.path, "replay")
+                self.assertEqual(installed_models(), {"llama3:latest"})
+                self.assertEqual(player.summary()["hits"], 1)
+
+    def test_auto_mode_records_misses_and_fingerprints_are_stable(self) -> None:
+        cassette = Cassette(self.path, "auto")
+        request = {"model": "m", "input": ["x"], "keep_alive": "1m"}
+        self.assertIsNone(cassette.lookup("embed", request))
+        cassette.store("embed", request, {"embeddings": [[0.5]]})
+        self.assertEqual(cassette.lookup("embed", {"input": ["x"], "model": "m"}), {"embeddings": [[0.5]]})
+        self.assertNotEqual(fingerprint("embed", request), fingerprint("chat", request))
+        with self.assertRaises(ValueError):
+            Cassette(self.path, "rewind")
+        with self.assertRaises(FileNotFoundError):
+            Cassette(self.path.with_name("missing.sqlite"), "replay")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import contextlib
+import io
 import unittest
 
 from lab.cli import build_parser
@@ -21,11 +23,38 @@ class CliParserTests(unittest.TestCase):
         self.assertEqual(args.question, "What is RAG?")
         self.assertAlmostEqual(args.refusal_score_threshold, 0.4)
 
+    def test_num_ctx_accepts_auto(self) -> None:
+        parser = build_parser()
+        args = parser.parse_args(["chat", "--prompt", "hi", "--num-ctx", "auto"])
+        self.assertEqual(args.num_ctx, "auto")
+        args = parser.parse_args(["rag", "--question", "q", "--num-ctx", "2048"])
+        self.assertEqual(args.num_ctx, 2048)
+
+    def test_pool_and_concurrency_flags_reject_non_positive_values(self) -> None:
+        parser = build_parser()
+        args = parser.parse_args(["--http-max-keepalive", "0", "--model-concurrency", "3", "doctor"])
+        self.assertEqual((args.http_max_keepalive, args.model_concurrency), (0, 3))
+        for flags in (["--http-max-connections", "0"], ["--http-max-keepalive", "-1"], ["--model-concurrency", "0"]):
+            with (
+                self.subTest(flags=flags),
+                contextlib.redirect_stderr(io.StringIO()) as stderr,
+                self.assertRaises(SystemExit) as ctx,
+            ):
+                parser.parse_args([*flags, "doctor"])
+            self.assertEqual(ctx.exception.code, 2)
+            self.assertIn("must be", stderr.getvalue())
+
     def test_doctor_parser_keeps_base_url_default(self) -> None:
         parser = build_parser()
         args = parser.parse_args(["doctor"])
         self.assertEqual(args.base_url, "http://127.0.0.1:11434")
 
 
+    def test_run_parser_accepts_resume_without_config(self) -> None:
+        args = build_parser().parse_args(["run", "--resume", "runs/20260101T000000Z_x"])
+        self.assertIsNone(args.config)
+        self.assertEqual(args.resume, "runs/20260101T000000Z_x")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+import orjson
+
+from lab.ollama_client import (
+    DEFAULT_POOL_LIMITS,
+    aclose_clients,
+    close_clients,
+    configure_pool_limits,
+    get_async_client,
+    get_client,
+)
+
+_RealClient = httpx.Client
+_RealAsyncClient = httpx.AsyncClient
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/api/tags":
+        return httpx.Response(200, json={"models": [{"name": "llama3"}]})
+    line = {"message": {"role": "assistant", "content": "ok"}, "done": True}
+    return httpx.Response(200, content=orjson.dumps(line) + b"\n")
+
+
+def _mock_client(**kwargs: object) -> httpx.Client:
+    return _RealClient(transport=httpx.MockTransport(_handler), **kwargs)
+
+
+def _mock_async_client(**kwargs: object) -> httpx.AsyncClient:
+    return _RealAsyncClient(transport=httpx.MockTransport(_handler), **kwargs)
+
+
+class ClientPoolTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        close_clients()
+        configure_pool_limits(
+            DEFAULT_POOL_LIMITS.max_connections, DEFAULT_POOL_LIMITS.max_keepalive_connections
+        )
+
+    @patch("lab.ollama_client.httpx.Client", side_effect=_mock_client)
+    def test_shared_client_opens_one_pool_for_many_calls(self, mock_httpx_client) -> None:
+        configure_pool_limits(4, 2)
+        client = get_client()
+
+        self.assertIs(get_client(), client)
+        self.assertIsNot(get_client(timeout_s=300.0), client)
+        for _ in range(3):
+            self.assertEqual(client.chat_generate("llama3", "hi")["text"], "ok")
+        self.assertEqual(client.list_models(), ["llama3"])
+
+        self.assertEqual(mock_httpx_client.call_count, 1)
+        self.assertEqual(mock_httpx_client.call_args.kwargs["limits"].max_connections, 4)
+        pooled = client._client
+        close_clients()
+        self.assertTrue(pooled.is_closed)
+        self.assertIsNot(get_client(), client)
+
+    @patch("lab.ollama_client.httpx.AsyncClient", side_effect=_mock_async_client)
+    def test_async_clients_are_pooled_per_event_loop(self, mock_async_client) -> None:
+        async def _use_twice() -> tuple[object, object]:
+            first = get_async_client()
+            await first.chat_generate("llama3", "hi")
+            await get_async_client().chat_generate("llama3", "hi")
+            pooled = first._client
+            await aclose_clients()
+            return first, pooled
+
+        first, pooled = asyncio.run(_use_twice())
+        second, _ = asyncio.run(_use_twice())
+
+        self.assertIsNot(first, second)
+        self.assertTrue(pooled.is_closed)
+        self.assertEqual(mock_async_client.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
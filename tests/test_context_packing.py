@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from lab.context_packing import estimate_tokens, pack_context
+from lab.rag import answer_question
+from lab.text_chunking import chunk_text
+
+
+def _fake_stream(text: str) -> list[dict[str, object]]:
+    return [{"type": "token", "text": text}, {"type": "done", "text": text, "num_ctx": 4096}]
+
+
+def _item(path: str, chunk_id: int, score: float, text: str) -> dict[str, object]:
+    return {"path": path, "chunk_id": chunk_id, "score": score, "full_text": text, "snippet": text[:20]}
+
+
+class ContextPackingTests(unittest.TestCase):
+    def test_adjacent_chunks_are_merged_without_duplicated_overlap(self) -> None:
+        source = " ".join(f"sentence number {i} about retrieval." for i in range(40))
+        chunks = chunk_text(source, chunk_size_chars=200, overlap_chars=50)
+        retrieved = [
+            _item("doc.md", 1, 0.9, chunks[1]),
+            _item("doc.md", 0, 0.8, chunks[0]),
+        ]
+
+        packed = pack_context(retrieved, token_budget=10_000)
+
+        self.assertEqual(len(packed.packed), 2)
+        self.assertEqual(packed.segment_count, 1)
+        self.assertIn("chunk_id: 0, 1", packed.text)
+        merged = packed.text.split("text:\n", 1)[1]
+        self.assertEqual(merged, source[: len(merged)])
+        self.assertLess(packed.tokens, estimate_tokens(chunks[0] + chunks[1]))
+
+    def test_budget_is_filled_greedily_by_score(self) -> None:
+        retrieved = [
+            _item("a.md", 0, 0.3, "a" * 400),
+            _item("b.md", 0, 0.9, "b" * 400),
+            _item("c.md", 0, 0.6, "c" * 400),
+        ]
+
+        packed = pack_context(retrieved, token_budget=250)
+
+        self.assertEqual([item["path"] for item in packed.packed], ["b.md", "c.md"])
+        self.assertEqual([item["path"] for item in packed.dropped], ["a.md"])
+        self.assertLessEqual(packed.tokens, 250)
+        self.assertLess(packed.text.index("b.md"), packed.text.index("c.md"))
+
+    def test_oversized_top_chunk_is_truncated_instead_of_dropped(self) -> None:
+        packed = pack_context([_item("big.md", 0, 0.9, "x" * 4000)], token_budget=100)
+
+        self.assertTrue(packed.truncated)
+        self.assertEqual(len(packed.packed), 1)
+        self.assertLessEqual(packed.tokens, 101)
+
+    @patch("lab.rag.log_event")
+    @patch("lab.rag._load_prompt_template")
+    @patch("lab.rag.get_client")
+    @patch("lab.rag.retrieve")
+    def test_answer_question_reports_packed_tokens_and_cites_packed_chunks(
+        self,
+        mock_retrieve,
+        mock_ollama_client,
+        mock_load_prompt_template,
+        mock_log_event,
+    ) -> None:
+        mock_retrieve.return_value = [
+            _item("a.md", 0, 0.9, "a" * 400),
+            _item("b.md", 0, 0.8, "b" * 4000),
+        ]
+        mock_load_prompt_template.side_effect = ["sys", "q={question}\nctx={context}"]
+        mock_ollama_client.return_value.chat_stream.return_value = _fake_stream("Answer.")
+
+        result = answer_question(
+            question="Q?",
+            index_dir="runs/index",
+            chat_model_name="llama3",
+            embed_model_name="nomic-embed-text",
+            k=2,
+            temperature=0.2,
+            num_ctx=1024,
+            context_budget_fraction=0.5,
+        )
+
+        self.assertEqual(result["citations"], [{"path": "a.md", "chunk_id": 0}])
+        self.assertGreater(result["context_tokens"], 0)
+        self.assertLessEqual(result["prompt_tokens_estimate"], 512)
+        _, payload = mock_log_event.call_args.args
+        self.assertEqual(payload["packed_chunks"], 1)
+        self.assertEqual(payload["dropped_chunks"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+from lab.context_window import AUTO_NUM_CTX, parse_num_ctx, select_num_ctx
+from lab.rag import answer_question
+
+
+def _fake_stream(text: str) -> list[dict[str, object]]:
+    return [{"type": "token", "text": text}, {"type": "done", "text": text, "num_ctx": 4096}]
+
+
+class ContextWindowTests(unittest.TestCase):
+    def test_parse_num_ctx_accepts_ints_and_auto(self) -> None:
+        self.assertEqual(parse_num_ctx("2048"), 2048)
+        self.assertEqual(parse_num_ctx(4096), 4096)
+        self.assertEqual(parse_num_ctx("AUTO"), AUTO_NUM_CTX)
+        with self.assertRaises(ValueError):
+            parse_num_ctx("big")
+        with self.assertRaises(ValueError):
+            parse_num_ctx(0)
+
+    def test_select_num_ctx_picks_smallest_bucket_within_cap(self) -> None:
+        self.assertEqual(select_num_ctx(300, expected_output_tokens=512, max_num_ctx=8192), 2048)
+        self.assertEqual(select_num_ctx(1700, expected_output_tokens=512, max_num_ctx=8192), 4096)
+        self.assertEqual(select_num_ctx(9000, expected_output_tokens=512, max_num_ctx=8192), 8192)
+        self.assertEqual(select_num_ctx(5000, expected_output_tokens=512, max_num_ctx=6000), 6000)
+
+    @patch("lab.rag.max_auto_num_ctx", return_value=8192)
+    @patch("lab.rag.log_event")
+    @patch("lab.rag._load_prompt_template")
+    @patch("lab.rag.get_client")
+    @patch("lab.rag.retrieve")
+    def test_answer_question_auto_mode_sends_selected_bucket(
+        self,
+        mock_retrieve,
+        mock_ollama_client,
+        mock_load_prompt_template,
+        mock_log_event,
+        _mock_max,
+    ) -> None:
+        mock_retrieve.return_value = [
+            {"path": "a.md", "chunk_id": 0, "score": 0.9, "full_text": "short chunk", "snippet": "short"}
+        ]
+        mock_load_prompt_template.side_effect = ["sys", "q={question}\nctx={context}"]
+        mock_ollama_client.return_value.chat_stream.return_value = _fake_stream("Answer.")
+
+        result = answer_question(
+            question="Q?",
+            index_dir="runs/index",
+            chat_model_name="llama3",
+            embed_model_name="nomic-embed-text",
+            k=1,
+            temperature=0.2,
+            num_ctx=AUTO_NUM_CTX,
+        )
+
+        self.assertEqual(result["num_ctx"], 2048)
+        self.assertEqual(mock_ollama_client.return_value.chat_stream.call_args.kwargs["num_ctx"], 2048)
+        _, payload = mock_log_event.call_args.args
+        self.assertEqual(payload["num_ctx_mode"], "auto")
+
+
+if __name__ == "__main__":
+    unittest.main()
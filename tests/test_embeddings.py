@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import unittest
+from array import array
+from unittest.mock import patch
+
+import httpx
+import orjson
+
+from lab.embeddings import EmbeddingClient
+from lab.ollama_client import OllamaClient
+
+_RealClient = httpx.Client
+
+
+def _embed_handler(request: httpx.Request) -> httpx.Response:
+    body = orjson.loads(request.content)
+    assert request.url.path == "/api/embed"
+    assert body["truncate"] is True
+    vectors = [[float(len(text)), 0.5] for text in body["input"]]
+    return httpx.Response(
+        200,
+        json={"embeddings": vectors, "prompt_eval_count": len(body["input"]), "total_duration": 3_000_000},
+    )
+
+
+def _mock_client(**kwargs: object) -> httpx.Client:
+    return _RealClient(transport=httpx.MockTransport(_embed_handler), **kwargs)
+
+
+class EmbeddingClientTests(unittest.TestCase):
+    @patch("lab.ollama_client.httpx.Client", side_effect=_mock_client)
+    def test_batches_inputs_and_returns_float32_vectors(self, _mock_httpx_client) -> None:
+        with OllamaClient() as ollama:
+            embedder = EmbeddingClient("nomic-embed-text", batch_size=2, client=ollama)
+            result = embedder.embed(["a", "bb", "ccc", "dddd", "eeeee"])
+            query_vec = embedder.embed_query("xyz")
+
+        self.assertEqual(len(result.vectors), 5)
+        self.assertIsInstance(result.vectors[0], array)
+        self.assertEqual(result.vectors[0].typecode, "f")
+        self.assertEqual(list(result.vectors[4]), [5.0, 0.5])
+        self.assertEqual([batch["size"] for batch in result.batches], [2, 2, 1])
+        self.assertEqual(result.batches[0]["total_duration_ms"], 3.0)
+        summary = result.summary()
+        self.assertEqual(summary["batch_count"], 3)
+        self.assertEqual(list(query_vec), [3.0, 0.5])
+
+    def test_rejects_non_positive_batch_size(self) -> None:
+        with self.assertRaises(ValueError):
+            EmbeddingClient("nomic-embed-text", batch_size=0, client=OllamaClient())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import orjson
+import yaml
+
+from lab.fake_ollama import FakeOllamaConfig, hash_embedding, start_fake_ollama
+from lab.ingest import ingest_corpus
+from lab.ollama_client import (
+    DeadlineExceeded,
+    OllamaClient,
+    call_deadline,
+    close_clients,
+    default_base_url,
+)
+from lab.rag import answer_question
+from lab.runner import run_config
+from lab.scheduler import RequestScheduler
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "src" / "lab" / "prompts"
+
+
+@contextlib.contextmanager
+def _cwd(path: Path):
+    prev = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    return sum(x * y for x, y in zip(a, b, strict=True))
+
+
+class FakeOllamaTests(unittest.TestCase):
+    def _start(self, **kwargs: object):
+        server = start_fake_ollama(FakeOllamaConfig(**kwargs))
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_streamed_chat_is_deterministic_and_reports_timings(self) -> None:
+        server = self._start(response_tokens=5, ttft_ms=20, tokens_per_s=500, load_ms=30)
+
+        with OllamaClient(server.url) as client:
+            first = client.chat_generate("llama3", "local models answer questions")
+            second = client.chat_generate("llama3", "local models answer questions")
+
+        self.assertEqual(first["text"], second["text"])
+        self.assertEqual(len(first["text"].split()), 5)
+        self.assertGreaterEqual(first["ttft_ms"], 20)
+        self.assertEqual(first["ollama"]["eval_count"], 5)
+        self.assertGreaterEqual(first["ollama"]["load_duration_ms"], 30)
+        self.assertEqual(second["ollama"]["load_duration_ms"], 0.0)
+
+    def test_non_streaming_chat_tags_and_preload_cycle(self) -> None:
+        server = self._start(models=["tiny:latest"], response_tokens=3)
+
+        with OllamaClient(server.url) as client:
+            self.assertEqual(client.list_models(), ["tiny:latest"])
+            client.preload("tiny")
+            self.assertEqual(httpx.get(f"{server.url}/api/ps").json()["models"][0]["name"], "tiny:latest")
+            client.unload("tiny")
+            self.assertEqual(httpx.get(f"{server.url}/api/ps").json()["models"], [])
+
+        resp = httpx.post(
+            f"{server.url}/api/chat",
+            json={"model": "tiny", "messages": [{"role": "user", "content": "a b c"}], "stream": False},
+        )
+        self.assertTrue(resp.json()["done"])
+        self.assertEqual(len(resp.json()["message"]["content"].split()), 3)
+        missing = httpx.post(f"{server.url}/api/embed", json={"model": "absent", "input": ["x"]})
+        self.assertEqual(missing.status_code, 404)
+
+    def test_hash_embeddings_share_words_and_errors_are_injected(self) -> None:
+        base = hash_embedding("ollama serves local models", 64)
+        self.assertAlmostEqual(_cosine(base, base), 1.0, places=5)
+        self.assertGreater(
+            _cosine(base, hash_embedding("local models", 64)),
+            _cosine(base, hash_embedding("tax forms due", 64)),
+        )
+
+        server = self._start(error_rate=1.0, error_status=503)
+        with OllamaClient(server.url) as client, self.assertRaises(httpx.HTTPStatusError) as ctx:
+            client.embed("nomic-embed-text", ["x"])
+        self.assertEqual(ctx.exception.response.status_code, 503)
+
+    def test_call_deadline_aborts_a_streaming_chat(self) -> None:
+        server = self._start(ttft_ms=10, tokens_per_s=20, response_tokens=200)
+        with OllamaClient(server.url) as client:
+            started = time.monotonic()
+            with call_deadline(0.3), self.assertRaises(DeadlineExceeded):
+                client.chat_generate("llama3", "a slow answer")
+            self.assertLess(time.monotonic() - started, 2.0)
+            with call_deadline(0.0), self.assertRaises(DeadlineExceeded):
+                client.embed("nomic-embed-text", ["x"])
+            # Outside a deadline the same client still works.
+            self.assertEqual(len(client.embed("nomic-embed-text", ["x"])["embeddings"]), 1)
+
+    def test_call_deadline_bounds_waiting_for_a_scheduler_slot(self) -> None:
+        server = self._start()
+        scheduler = RequestScheduler(default_limit=1)
+        with (
+            patch("lab.ollama_client.get_scheduler", return_value=scheduler),
+            OllamaClient(server.url) as client,
+            scheduler.slot("llama3"),
+        ):
+            started = time.monotonic()
+            with call_deadline(0.2), self.assertRaises(DeadlineExceeded):
+                client.chat_generate("llama3", "queued behind a held slot")
+            self.assertLess(time.monotonic() - started, 1.0)
+            # The timed-out waiter left the queue and never reached the server.
+            self.assertEqual(scheduler.metrics()["models"]["llama3"]["queued"], {"interactive": 0, "batch": 0})
+            self.assertEqual(server.request_counts.get("/api/chat", 0), 0)
+
+    def test_rag_end_to_end_via_ollama_host(self) -> None:
+        server = self._start(embed_dim=32, response_tokens=8)
+        with tempfile.TemporaryDirectory() as tmpdir, patch.dict(os.environ, {"OLLAMA_HOST": server.url}):
+            self.addCleanup(close_clients)
+            self.assertEqual(default_base_url(), server.url)
+            root = Path(tmpdir)
+            corpus_dir = root / "corpus"
+            corpus_dir.mkdir()
+            (corpus_dir / "rag.md").write_text("RAG combines retrieval with generation.", encoding="utf-8")
+            (corpus_dir / "tax.md").write_text("Tax forms are due in April.", encoding="utf-8")
+            index_dir = root / "index"
+            with _cwd(root):
+                ingest_corpus(corpus_dir, index_dir, "nomic-embed-text", 500, 10)
+            with patch("lab.rag.log_event"):
+                result = answer_question(
+                    question="What does RAG combine?",
+                    index_dir=str(index_dir),
+                    chat_model_name="llama3",
+                    embed_model_name="nomic-embed-text",
+                    k=1,
+                    temperature=0.0,
+                    num_ctx=2048,
+                )
+
+        self.assertTrue(result["retrieved"][0]["path"].endswith("rag.md"))
+        self.assertEqual(len(result["answer_text"].split()), 8)
+        self.assertGreaterEqual(server.request_counts["/api/chat"], 1)
+
+    def test_eval_run_retrieves_once_per_question_across_models(self) -> None:
+        server = self._start(models=["chat-a:latest", "chat-b:latest", "nomic-embed-text:latest"], embed_dim=32)
+        with tempfile.TemporaryDirectory() as tmpdir, patch.dict(os.environ, {"OLLAMA_HOST": server.url}):
+            self.addCleanup(close_clients)
+            root = Path(tmpdir)
+            # Prompt templates are read relative to the working directory.
+            shutil.copytree(PROMPTS_DIR, root / "src" / "lab" / "prompts")
+            (root / "corpus").mkdir()
+            (root / "corpus" / "rag.md").write_text("RAG combines retrieval with generation.", encoding="utf-8")
+            (root / "corpus" / "tax.md").write_text("Tax forms are due in April.", encoding="utf-8")
+            questions = ["What does RAG combine?", "When are tax forms due?", "What is retrieval?"]
+            (root / "eval.jsonl").write_bytes(
+                b"\n".join(
+                    orjson.dumps({"id": f"q{i}", "question": q, "answerable": True, "expected_keywords": ["rag"]})
+                    for i, q in enumerate(questions)
+                )
+            )
+            config = {
+                "name": "shared_retrieval",
+                "task": "rag_eval",
+                "corpus_dir": "corpus",
+                "chat_models": ["chat-a", "chat-b"],
+                "embed_model": "nomic-embed-text",
+                "k": 1,
+                "num_ctx": 2048,
+                "temperature": 0.0,
+                "chunk_size_chars": 500,
+                "overlap_chars": 10,
+                "dataset_path": "eval.jsonl",
+            }
+            (root / "eval.yaml").write_text(yaml.safe_dump(config), encoding="utf-8")
+            with (
+                _cwd(root),
+                patch("lab.runner._resolve_chat_models", return_value=["chat-a", "chat-b"]),
+                patch("lab.runner._resolve_embed_model", return_value="nomic-embed-text"),
+            ):
+                run_dir = run_config("eval.yaml")
+                summary = orjson.loads((run_dir / "summary.json").read_bytes())
+                rows = [orjson.loads(line) for line in (run_dir / "results.jsonl").read_bytes().splitlines()]
+
+        # One batch for ingest and one for all questions, instead of one per (question, model).
+        self.assertEqual(server.request_counts["/api/embed"], 2)
+        self.assertEqual(server.request_counts["/api/chat"], 6)
+        self.assertEqual(summary["retrieval"]["questions"], 3)
+        self.assertEqual(rows[0]["retrieved"], rows[1]["retrieved"])
+        self.assertTrue(rows[0]["retrieved"][0]["path"].endswith("rag.md"))
+        self.assertIn("embed_ms", rows[0]["timings"])
+
+
+    def test_sweep_shares_indexes_retrieval_and_generations(self) -> None:
+        server = self._start(models=["chat-a:latest", "nomic-embed-text:latest"], embed_dim=32)
+        with tempfile.TemporaryDirectory() as tmpdir, patch.dict(os.environ, {"OLLAMA_HOST": server.url}):
+            self.addCleanup(close_clients)
+            root = Path(tmpdir)
+            shutil.copytree(PROMPTS_DIR, root / "src" / "lab" / "prompts")
+            (root / "corpus").mkdir()
+            (root / "corpus" / "rag.md").write_text("RAG combines retrieval with generation.", encoding="utf-8")
+            (root / "corpus" / "tax.md").write_text("Tax forms are due in April.", encoding="utf-8")
+            questions = ["What does RAG combine?", "When are tax forms due?"]
+            (root / "eval.jsonl").write_bytes(
+                b"\n".join(
+                    orjson.dumps({"id": f"q{i}", "question": q, "answerable": True, "expected_keywords": ["rag"]})
+                    for i, q in enumerate(questions)
+                )
+            )
+            config = {
+                "name": "sweep",
+                "task": "rag_sweep",
+                "corpus_dir": "corpus",
+                "chat_models": ["chat-a"],
+                "embed_model": "nomic-embed-text",
+                "k": 1,
+                "num_ctx": 2048,
+                "temperature": 0.0,
+                "chunk_size_chars": 500,
+                "overlap_chars": 10,
+                "dataset_path": "eval.jsonl",
+                "sweep": {"chunk_size_chars": [500, 400], "k": [1, 2], "refusal_score_threshold": [None, 1.5]},
+            }
+            (root / "sweep.yaml").write_text(yaml.safe_dump(config), encoding="utf-8")
+            with (
+                _cwd(root),
+                patch("lab.runner._resolve_chat_models", return_value=["chat-a"]),
+                patch("lab.runner._resolve_embed_model", return_value="nomic-embed-text"),
+            ):
+                run_dir = run_config("sweep.yaml")
+                summary = orjson.loads((run_dir / "summary.json").read_bytes())
+                rows = [orjson.loads(line) for line in (run_dir / "results.jsonl").read_bytes().splitlines()]
+                request_counts = dict(server.request_counts)
+
+                # A failed shared retrieval falls back to per-task retrieval, as in eval runs.
+                (root / "fallback.yaml").write_text(yaml.safe_dump({**config, "name": "fallback"}), encoding="utf-8")
+                with patch("lab.runner._retrieve_all", side_effect=RuntimeError("embed batch failed")):
+                    fallback_dir = run_config("fallback.yaml")
+                fallback = orjson.loads((fallback_dir / "summary.json").read_bytes())
+
+        sweep = summary["sweep"]
+        self.assertEqual(len(sweep["variants"]), 8)
+        self.assertEqual(len(rows), 16)
+        # Two indexes, each built and searched once; one generation per (chunking, k, question).
+        self.assertEqual(request_counts["/api/embed"], 4)
+        self.assertEqual(request_counts["/api/chat"], 8)
+        self.assertEqual(sweep["shared_work"]["generations"], {"executed": 8, "reused": 8})
+        self.assertEqual([p["k"] for p in summary["retrieval"]["passes"]], [2, 2])
+
+        by_variant = {(row["variant"], row["question_id"]): row for row in rows}
+        narrow, wide = by_variant[("v01", "q0")], by_variant[("v03", "q0")]
+        self.assertEqual(wide["retrieved"][:1], narrow["retrieved"])
+        self.assertEqual(len(wide["retrieved"]), 2)
+        # The threshold variant reuses the same generation and only rewrites the answer.
+        refused = by_variant[("v02", "q0")]
+        self.assertTrue(refused["generation_reused"])
+        self.assertEqual(refused["answer_text"], "I don't know from the provided documents.")
+        self.assertEqual(refused["latency_ms"], narrow["latency_ms"])
+        self.assertIn(sweep["best_variant"], {variant["id"] for variant in sweep["variants"]})
+        self.assertEqual(summary["stage_latency_stats"]["overall"]["count"], 8)
+        self.assertEqual(summary["model_loads"]["per_model"].keys(), {"chat-a"})
+        for key in ("backends", "admission", "cassette"):
+            self.assertIn(key, summary)
+
+        self.assertEqual(fallback["completed_tasks"], 16)
+        self.assertEqual(fallback["error_count"], 0)
+        self.assertEqual([p["error"] for p in fallback["retrieval"]["passes"]], ["embed batch failed"] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
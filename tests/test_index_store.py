@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from lab.index_store import (
+    ensure_index,
+    gc_indexes,
+    index_key,
+    read_index_ref,
+    referenced_keys,
+    write_index_ref,
+)
+
+
+def _fake_ingest(**kwargs: Any) -> dict[str, Any]:
+    index_dir = Path(kwargs["index_dir"])
+    index_dir.mkdir(parents=True)
+    (index_dir / "index.sqlite").write_bytes(b"sqlite")
+    return {"chunks_indexed": 1}
+
+
+class IndexStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        self.corpus = self.root / "corpus"
+        self.corpus.mkdir()
+        (self.corpus / "a.md").write_text("alpha", encoding="utf-8")
+        self.runs = self.root / "runs"
+        self.store = self.runs / "indexes"
+
+    def test_key_tracks_content_model_and_chunking(self) -> None:
+        key = index_key(self.corpus, "nomic-embed-text", 900, 120)
+        self.assertEqual(key, index_key(self.corpus, "nomic-embed-text", 900, 120))
+        self.assertNotEqual(key, index_key(self.corpus, "mxbai-embed-large", 900, 120))
+        self.assertNotEqual(key, index_key(self.corpus, "nomic-embed-text", 600, 120))
+
+        (self.corpus / "a.md").write_text("alpha, edited", encoding="utf-8")
+        self.assertNotEqual(key, index_key(self.corpus, "nomic-embed-text", 900, 120))
+
+    @patch("lab.index_store.ingest_corpus", side_effect=_fake_ingest)
+    def test_ensure_index_builds_once_then_reuses(self, ingest_mock) -> None:
+        first = ensure_index(self.corpus, "nomic-embed-text", 900, 120, store_dir=self.store)
+        second = ensure_index(self.corpus, "nomic-embed-text", 900, 120, store_dir=self.store)
+
+        self.assertEqual(ingest_mock.call_count, 1)
+        self.assertFalse(first.reused)
+        self.assertTrue(second.reused)
+        self.assertEqual(first.path, second.path)
+        self.assertTrue((second.path / "index.sqlite").exists())
+        self.assertEqual([p.name for p in self.store.iterdir()], [first.key])
+
+    @patch("lab.index_store.ingest_corpus", side_effect=_fake_ingest)
+    def test_gc_keeps_referenced_and_removes_the_rest(self, _ingest_mock) -> None:
+        kept = ensure_index(self.corpus, "nomic-embed-text", 900, 120, store_dir=self.store)
+        dropped = ensure_index(self.corpus, "nomic-embed-text", 600, 120, store_dir=self.store)
+        run_dir = self.runs / "20260101-000000"
+        run_dir.mkdir()
+        write_index_ref(run_dir, kept)
+        self.assertEqual(read_index_ref(run_dir).key, kept.key)
+        self.assertEqual(referenced_keys(self.runs), {kept.key})
+
+        fresh_build = self.store / f"{kept.key}.tmp-1-1"
+        stale_build = self.store / f"{kept.key}.tmp-2-2"
+        for build in (fresh_build, stale_build):
+            build.mkdir()
+        os.utime(stale_build, (0, 0))
+        # Just returned by ensure_index for a run that has not written its ref yet.
+        starting = ensure_index(self.corpus, "nomic-embed-text", 300, 60, store_dir=self.store)
+        for ref in (kept, dropped):
+            os.utime(ref.path, (0, 0))
+
+        preview = gc_indexes(self.runs, self.store, dry_run=True)
+        self.assertTrue(dropped.path.exists())
+        removed = gc_indexes(self.runs, self.store)
+        self.assertEqual(preview, removed)
+        self.assertEqual(
+            {(entry["key"], entry["reason"]) for entry in removed},
+            {(dropped.key, "unreferenced"), (stale_build.name, "abandoned build")},
+        )
+        self.assertTrue(kept.path.exists())
+        self.assertTrue(starting.path.exists())
+        self.assertTrue(fresh_build.exists())
+        self.assertFalse(dropped.path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
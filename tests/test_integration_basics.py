@@ -24,20 +24,13 @@ def _cwd(path: Path):
         os.chdir(prev)
 
 
-class _FakeIngestEmbeddings:
-    def __init__(self, model: str) -> None:
-        self.model = model
+class _FakeEmbedClient:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        return [_vector_for_text(text) for text in texts]
-
-
-class _FakeRetrieveEmbeddings:
-    def __init__(self, model: str) -> None:
-        self.model = model
-
-    def embed_query(self, query: str) -> list[float]:
-        return _vector_for_text(query)
+    def embed(self, model: str, inputs: list[str], **_: object) -> dict[str, object]:
+        self.batches.append(inputs)
+        return {"embeddings": [_vector_for_text(text) for text in inputs], "prompt_eval_count": len(inputs)}
 
 
 def _vector_for_text(text: str) -> list[float]:
@@ -49,9 +42,10 @@ def _vector_for_text(text: str) -> list[float]:
 
 
 class IntegrationBasicsTests(unittest.TestCase):
-    @patch("lab.retrieval.OllamaEmbeddings", _FakeRetrieveEmbeddings)
-    @patch("lab.ingest.OllamaEmbeddings", _FakeIngestEmbeddings)
-    def test_ingest_and_retrieve_fixture_flow(self) -> None:
+    @patch("lab.embeddings.get_client")
+    def test_ingest_and_retrieve_fixture_flow(self, mock_get_client) -> None:
+        fake_client = _FakeEmbedClient()
+        mock_get_client.return_value = fake_client
         with tempfile.TemporaryDirectory() as tmpdir:
             root = Path(tmpdir)
             corpus_dir = root / "corpus"
@@ -67,9 +61,12 @@ class IntegrationBasicsTests(unittest.TestCase):
                     embed_model_name="fake-embed",
                     chunk_size_chars=500,
                     overlap_chars=10,
+                    embed_batch_size=1,
                 )
                 self.assertEqual(metadata["embedding_model"], "fake-embed")
                 self.assertEqual(metadata["file_count"], 2)
+                self.assertEqual(metadata["embedding"]["batch_count"], 2)
+                self.assertEqual(len(metadata["embedding"]["batches"]), 2)
                 self.assertTrue((index_dir / "index.sqlite").exists())
 
                 results = retrieve(
@@ -80,12 +77,13 @@ class IntegrationBasicsTests(unittest.TestCase):
                 )
 
             self.assertEqual(len(results), 2)
+            self.assertEqual(fake_client.batches[-1], ["What is RAG?"])
             self.assertIn("rag", results[0]["path"].lower())
             self.assertGreaterEqual(results[0]["score"], results[1]["score"])
 
     @patch("lab.runner._resolve_chat_models", return_value=["fake-chat"])
     @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
-    @patch("lab.runner.ingest_corpus")
+    @patch("lab.index_store.ingest_corpus")
     @patch("lab.runner.answer_question")
     def test_runner_writes_summary_and_results_schema(
         self,
@@ -108,6 +106,7 @@ class IntegrationBasicsTests(unittest.TestCase):
                 "citations": [{"path": "corpus/rag.md", "chunk_id": 0}],
                 "retrieved": [{"path": "corpus/rag.md", "chunk_id": 0, "score": 0.9}],
                 "latency_ms": 23.4,
+                "timings": {"embed_ms": 2.0, "generate_ms": 20.0, "eval_count": 10, "eval_duration_ms": 500.0},
             }
 
         mock_answer_question.side_effect = fake_answer_question
@@ -167,12 +166,20 @@ class IntegrationBasicsTests(unittest.TestCase):
                 self.assertEqual(summary["config_name"], "test_eval")
                 self.assertEqual(summary["question_count"], 2)
                 self.assertIn("overall", summary["aggregate_scores"])
+                stage_stats = summary["stage_latency_stats"]["per_model"]["fake-chat"]
+                self.assertEqual(stage_stats["avg_embed_ms"], 2.0)
+                self.assertEqual(stage_stats["eval_tokens_per_sec"], 20.0)
+                overall_latency = summary["latency_stats"]["overall"]
+                self.assertEqual(overall_latency["count"], 2)
+                self.assertLessEqual(overall_latency["p50_ms"], overall_latency["p99_ms"])
+                self.assertEqual(overall_latency["histogram"]["count"], 2)
                 lines = (run_dir / "results.jsonl").read_text(encoding="utf-8").splitlines()
                 self.assertEqual(len(lines), 2)
                 first = orjson.loads(lines[0])
                 self.assertIn("question_id", first)
                 self.assertIn("citations", first)
                 self.assertIn("retrieved", first)
+                self.assertIn("timings", first)
 
             self.assertEqual(mock_answer_question.call_count, 2)
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import contextlib
 import os
 import tempfile
+import threading
 import time
 import unittest
 from pathlib import Path
@@ -105,7 +106,7 @@ class IntegrationEdgeCaseTests(unittest.TestCase):
 
     @patch("lab.runner._resolve_chat_models", return_value=["fake-chat"])
     @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
-    @patch("lab.runner.ingest_corpus")
+    @patch("lab.index_store.ingest_corpus")
     @patch("lab.runner.answer_question")
     def test_runner_writes_error_records_and_summary_counts(
         self,
@@ -170,9 +171,310 @@ class IntegrationEdgeCaseTests(unittest.TestCase):
                 self.assertEqual(rows[1]["error"], "synthetic failure")
                 self.assertIn("[rag_error]", rows[1]["answer_text"])
 
+    @patch("lab.runner._resolve_chat_models", return_value=["chat-a", "chat-b"])
+    @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
+    @patch("lab.index_store.ingest_corpus")
+    @patch("lab.runner.answer_question")
+    def test_model_major_order_groups_models_and_keeps_result_order(
+        self,
+        mock_answer_question,
+        mock_ingest_corpus,
+        _mock_embed,
+        _mock_chat,
+    ) -> None:
+        mock_ingest_corpus.side_effect = lambda **kwargs: Path(kwargs["index_dir"]).mkdir(parents=True, exist_ok=True)
+        calls: list[tuple[str, str]] = []
+
+        def fake_answer(**kwargs):
+            # Simulate a machine that holds one chat model: switching models costs a load.
+            model = kwargs["chat_model_name"]
+            loaded = not calls or calls[-1][1] != model
+            calls.append((kwargs["question_id"], model))
+            return {
+                "answer_text": "RAG",
+                "citations": [],
+                "retrieved": [],
+                "latency_ms": 5.0,
+                "timings": {"load_duration_ms": 2500.0 if loaded else 3.0},
+            }
+
+        mock_answer_question.side_effect = fake_answer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "data" / "corpus").mkdir(parents=True)
+            dataset_path = root / "data" / "eval.jsonl"
+            dataset_rows = [
+                {"id": f"q{i}", "question": f"Question {i}?", "answerable": True, "expected_keywords": ["rag"]}
+                for i in range(3)
+            ]
+            dataset_path.write_bytes(b"\n".join(orjson.dumps(r) for r in dataset_rows) + b"\n")
+            config_path = root / "experiments" / "order_eval.yaml"
+            config_path.parent.mkdir(parents=True)
+            config_path.write_text(
+                "\n".join(
+                    [
+                        "name: order_eval",
+                        "task: rag_eval",
+                        "corpus_dir: data/corpus",
+                        "chat_models: [chat-a, chat-b]",
+                        "embed_model: fake-embed",
+                        "k: 2",
+                        "num_ctx: 1024",
+                        "temperature: 0.2",
+                        "chunk_size_chars: 500",
+                        "overlap_chars: 10",
+                        "dataset_path: data/eval.jsonl",
+                        "task_order: model_major",
+                    ]
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+
+            with _cwd(root):
+                run_dir = run_config(config_path)
+                summary = orjson.loads((run_dir / "summary.json").read_bytes())
+                rows = [orjson.loads(line) for line in (run_dir / "results.jsonl").read_bytes().splitlines()]
+
+            self.assertEqual([model for _, model in calls], ["chat-a"] * 3 + ["chat-b"] * 3)
+            self.assertEqual(
+                [(row["question_id"], row["model"]) for row in rows],
+                [(f"q{i}", model) for i in range(3) for model in ("chat-a", "chat-b")],
+            )
+            loads = summary["model_loads"]
+            self.assertEqual(loads["task_order"], "model_major")
+            self.assertEqual((loads["model_switches"], loads["observed_loads"]), (1, 2))
+            self.assertEqual(loads["per_model"], {"chat-a": 1, "chat-b": 1})
+
+            config_path.write_text(config_path.read_text(encoding="utf-8").replace("model_major", "diagonal"))
+            with _cwd(root), self.assertRaises(ValueError):
+                run_config(config_path)
+
+    @patch("lab.runner._resolve_chat_models", return_value=["chat-a", "chat-b"])
+    @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
+    @patch("lab.index_store.ingest_corpus")
+    @patch("lab.runner.answer_question")
+    def test_parallel_run_caps_per_model_concurrency_and_reports_throughput(
+        self,
+        mock_answer_question,
+        mock_ingest_corpus,
+        _mock_embed,
+        _mock_chat,
+    ) -> None:
+        mock_ingest_corpus.side_effect = lambda **kwargs: Path(kwargs["index_dir"]).mkdir(parents=True, exist_ok=True)
+        lock = threading.Lock()
+        active: dict[str, int] = {"chat-a": 0, "chat-b": 0, "total": 0}
+        peak: dict[str, int] = dict.fromkeys(active, 0)
+
+        def fake_answer(**kwargs):
+            model = kwargs["chat_model_name"]
+            with lock:
+                for key in (model, "total"):
+                    active[key] += 1
+                    peak[key] = max(peak[key], active[key])
+            time.sleep(0.05)
+            with lock:
+                active[model] -= 1
+                active["total"] -= 1
+            return {"answer_text": "RAG", "citations": [], "retrieved": [], "latency_ms": 50.0}
+
+        mock_answer_question.side_effect = fake_answer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "data" / "corpus").mkdir(parents=True)
+            dataset_rows = [
+                {"id": f"q{i}", "question": f"Question {i}?", "answerable": True, "expected_keywords": ["rag"]}
+                for i in range(4)
+            ]
+            (root / "data" / "eval.jsonl").write_bytes(b"\n".join(orjson.dumps(r) for r in dataset_rows) + b"\n")
+            config_path = root / "experiments" / "parallel_eval.yaml"
+            config_path.parent.mkdir(parents=True)
+            config_path.write_text(
+                "\n".join(
+                    [
+                        "name: parallel_eval",
+                        "task: rag_eval",
+                        "corpus_dir: data/corpus",
+                        "chat_models: [chat-a, chat-b]",
+                        "embed_model: fake-embed",
+                        "k: 2",
+                        "num_ctx: 1024",
+                        "temperature: 0.2",
+                        "chunk_size_chars: 500",
+                        "overlap_chars: 10",
+                        "dataset_path: data/eval.jsonl",
+                        "concurrency: 4",
+                        "per_model_concurrency: 1",
+                    ]
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+
+            with _cwd(root):
+                run_dir = run_config(config_path)
+                summary = orjson.loads((run_dir / "summary.json").read_bytes())
+                rows = [orjson.loads(line) for line in (run_dir / "results.jsonl").read_bytes().splitlines()]
+
+        self.assertEqual(peak, {"chat-a": 1, "chat-b": 1, "total": 2})
+        self.assertEqual(
+            [(row["question_id"], row["model"]) for row in rows],
+            [(f"q{i}", model) for i in range(4) for model in ("chat-a", "chat-b")],
+        )
+        self.assertEqual(summary["completed_tasks"], 8)
+        self.assertEqual(summary["throughput"]["concurrency"], 4)
+        self.assertGreater(summary["throughput"]["tasks_per_min"], 0)
+
+    @patch("lab.runner._retrieve_all", return_value=({}, {"questions": 0}))
+    @patch("lab.runner._resolve_chat_models", return_value=["fake-chat"])
+    @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
+    @patch("lab.index_store.ingest_corpus")
+    @patch("lab.runner.answer_question")
+    def test_resume_reruns_only_unfinished_and_errored_tasks(
+        self,
+        mock_answer_question,
+        mock_ingest_corpus,
+        _mock_embed,
+        _mock_chat,
+        _mock_retrieve_all,
+    ) -> None:
+        def fake_ingest(**kwargs):
+            index_dir = Path(kwargs["index_dir"])
+            index_dir.mkdir(parents=True, exist_ok=True)
+            (index_dir / "index.sqlite").touch()
+
+        mock_ingest_corpus.side_effect = fake_ingest
+        ok = {"answer_text": "RAG", "citations": [], "retrieved": [], "latency_ms": 10.0}
+        mock_answer_question.side_effect = [ok, RuntimeError("ollama went away"), KeyboardInterrupt()]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "data" / "corpus").mkdir(parents=True)
+            dataset_rows = [
+                {"id": f"q{i}", "question": f"Question {i}?", "answerable": True, "expected_keywords": ["rag"]}
+                for i in range(3)
+            ]
+            (root / "data" / "eval.jsonl").write_bytes(b"\n".join(orjson.dumps(r) for r in dataset_rows) + b"\n")
+            config_path = root / "experiments" / "resume_eval.yaml"
+            config_path.parent.mkdir(parents=True)
+            config_path.write_text(
+                "\n".join(
+                    [
+                        "name: resume_eval",
+                        "task: rag_eval",
+                        "corpus_dir: data/corpus",
+                        "chat_models: [fake-chat]",
+                        "embed_model: fake-embed",
+                        "k: 2",
+                        "num_ctx: 1024",
+                        "temperature: 0.2",
+                        "chunk_size_chars: 500",
+                        "overlap_chars: 10",
+                        "dataset_path: data/eval.jsonl",
+                    ]
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+
+            with _cwd(root):
+                run_dir = run_config(config_path)
+                partial = orjson.loads((run_dir / "summary.json").read_bytes())
+                self.assertTrue(partial["interrupted"])
+                self.assertEqual(partial["error_count"], 1)
+
+                mock_answer_question.side_effect = None
+                mock_answer_question.return_value = ok
+                mock_answer_question.reset_mock()
+                self.assertEqual(run_config(resume=run_dir), run_dir)
+                summary = orjson.loads((run_dir / "summary.json").read_bytes())
+                rows = [orjson.loads(line) for line in (run_dir / "results.jsonl").read_bytes().splitlines()]
+
+        self.assertEqual([call.kwargs["question_id"] for call in mock_answer_question.call_args_list], ["q1", "q2"])
+        self.assertEqual(mock_ingest_corpus.call_count, 1)
+        self.assertEqual([row["question_id"] for row in rows], ["q0", "q1", "q2"])
+        self.assertFalse(summary["interrupted"])
+        self.assertEqual((summary["completed_tasks"], summary["error_count"]), (3, 0))
+        self.assertEqual(summary["aggregate_scores"]["overall"]["total"], 3)
+        self.assertEqual(summary["resume"]["reused_tasks"], 1)
+        self.assertEqual(summary["started_at"], partial["started_at"])
+
+    @patch("lab.runner._retrieve_all", return_value=({}, {"questions": 0}))
+    @patch("lab.runner._resolve_chat_models", return_value=["fake-chat"])
+    @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
+    @patch("lab.index_store.ingest_corpus")
+    @patch("lab.runner.answer_question")
+    def test_resume_without_summary_uses_the_run_manifest(
+        self,
+        mock_answer_question,
+        mock_ingest_corpus,
+        mock_embed,
+        mock_chat,
+        _mock_retrieve_all,
+    ) -> None:
+        mock_ingest_corpus.side_effect = lambda **kwargs: Path(kwargs["index_dir"]).mkdir(parents=True, exist_ok=True)
+        ok = {"answer_text": "RAG", "citations": [], "retrieved": [], "latency_ms": 10.0}
+        mock_answer_question.side_effect = [ok, KeyboardInterrupt()]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "data" / "corpus").mkdir(parents=True)
+            dataset_rows = [
+                {"id": f"q{i}", "question": f"Question {i}?", "answerable": True, "expected_keywords": ["rag"]}
+                for i in range(2)
+            ]
+            (root / "data" / "eval.jsonl").write_bytes(b"\n".join(orjson.dumps(r) for r in dataset_rows) + b"\n")
+            config_path = root / "experiments" / "manifest_eval.yaml"
+            config_path.parent.mkdir(parents=True)
+            config_path.write_text(
+                "\n".join(
+                    [
+                        "name: manifest_eval",
+                        "task: rag_eval",
+                        "corpus_dir: data/corpus",
+                        "chat_models: auto",
+                        "embed_model: auto",
+                        "k: 2",
+                        "num_ctx: 1024",
+                        "temperature: 0.2",
+                        "chunk_size_chars: 500",
+                        "overlap_chars: 10",
+                        "dataset_path: data/eval.jsonl",
+                    ]
+                )
+                + "\n",
+                encoding="utf-8",
+            )
+
+            with _cwd(root):
+                run_dir = run_config(config_path)
+                started_at = orjson.loads((run_dir / "manifest.json").read_bytes())["started_at"]
+                # A hard kill leaves results.jsonl but no summary.json.
+                (run_dir / "summary.json").unlink()
+
+                # `auto` would now resolve to different models; the resumed run must not switch.
+                mock_chat.return_value = ["newer-chat"]
+                mock_embed.return_value = "newer-embed"
+                mock_answer_question.side_effect = None
+                mock_answer_question.return_value = ok
+                mock_answer_question.reset_mock()
+                run_config(resume=run_dir)
+                summary = orjson.loads((run_dir / "summary.json").read_bytes())
+
+        self.assertEqual(
+            [(call.kwargs["question_id"], call.kwargs["chat_model_name"]) for call in mock_answer_question.call_args_list],
+            [("q1", "fake-chat")],
+        )
+        self.assertEqual(mock_answer_question.call_args.kwargs["embed_model_name"], "fake-embed")
+        self.assertEqual((summary["models"], summary["embed_model"]), (["fake-chat"], "fake-embed"))
+        self.assertEqual(summary["started_at"], started_at)
+        self.assertEqual(summary["resume"]["reused_tasks"], 1)
+
     @patch("lab.runner._resolve_chat_models", return_value=["fake-chat"])
     @patch("lab.runner._resolve_embed_model", return_value="fake-embed")
-    @patch("lab.runner.ingest_corpus")
+    @patch("lab.index_store.ingest_corpus")
     @patch("lab.runner.answer_question")
     def test_runner_raises_on_malformed_dataset_row_missing_keys(
         self,
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import patch
+
+import httpx
+import orjson
+
+from lab.ollama_client import OllamaClient, parse_keep_alive
+from lab.runner import _warm_models
+
+_RealClient = httpx.Client
+
+
+class _Recorder:
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, dict[str, object]]] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = orjson.loads(request.content)
+        self.requests.append((request.url.path, body))
+        if request.url.path == "/api/chat":
+            line = {"message": {"role": "assistant", "content": "ok"}, "done": True}
+            return httpx.Response(200, content=orjson.dumps(line) + b"\n")
+        if body.get("model") == "missing":
+            return httpx.Response(404, json={"error": "model not found"})
+        return httpx.Response(200, json={"model": body["model"], "load_duration": 2_500_000})
+
+    def client(self, **kwargs: object) -> httpx.Client:
+        return _RealClient(transport=httpx.MockTransport(self.handler), **kwargs)
+
+
+class KeepAliveTests(unittest.TestCase):
+    def test_parse_keep_alive(self) -> None:
+        self.assertEqual(parse_keep_alive("30m"), "30m")
+        self.assertEqual(parse_keep_alive("-1"), -1)
+        self.assertEqual(parse_keep_alive(300), 300)
+        with self.assertRaises(ValueError):
+            parse_keep_alive(" ")
+
+    def test_preload_unload_and_per_call_keep_alive(self) -> None:
+        recorder = _Recorder()
+        with patch("lab.ollama_client.httpx.Client", side_effect=recorder.client):
+            client = OllamaClient()
+            warmed = client.preload("llama3", keep_alive="10m")
+            client.preload("nomic-embed-text", keep_alive=-1, embedding=True)
+            client.chat_generate("llama3", "hi", keep_alive="5m")
+            client.chat_generate("llama3", "hi")
+            client.unload("llama3")
+
+        self.assertEqual(warmed["load_duration_ms"], 2.5)
+        paths = [path for path, _ in recorder.requests]
+        self.assertEqual(paths, ["/api/generate", "/api/embed", "/api/chat", "/api/chat", "/api/generate"])
+        bodies = [body for _, body in recorder.requests]
+        self.assertEqual(bodies[0]["prompt"], "")
+        self.assertEqual(bodies[0]["keep_alive"], "10m")
+        self.assertEqual(bodies[1]["keep_alive"], -1)
+        self.assertEqual(bodies[2]["keep_alive"], "5m")
+        self.assertNotIn("keep_alive", bodies[3])
+        self.assertEqual(bodies[4]["keep_alive"], 0)
+
+    def test_run_warmup_records_failures_without_aborting(self) -> None:
+        recorder = _Recorder()
+        with patch("lab.runner.get_client", return_value=OllamaClient()), patch(
+            "lab.ollama_client.httpx.Client", side_effect=recorder.client
+        ):
+            warmup = _warm_models(["llama3", "missing"], "nomic-embed-text", "15m")
+
+        self.assertEqual([entry["model"] for entry in warmup], ["nomic-embed-text", "llama3", "missing"])
+        self.assertTrue(warmup[0]["embedding"])
+        self.assertIsNone(warmup[1]["error"])
+        self.assertIn("404", warmup[2]["error"])
+        self.assertTrue(all(body["keep_alive"] == "15m" for _, body in recorder.requests))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import math
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import orjson
+
+from lab.latency_histogram import LatencyHistogram
+from lab.reporting import compare_runs, merge_latency_histograms
+
+FIXTURE_RUN = Path(__file__).resolve().parent / "fixtures" / "run_artifacts" / "sample_run"
+
+
+def _exact_quantile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)), 1) - 1]
+
+
+class LatencyHistogramTests(unittest.TestCase):
+    def test_quantiles_stay_within_relative_precision(self) -> None:
+        rng = random.Random(7)
+        # Long-tailed, like generation latency: most calls fast, a few very slow.
+        values = [rng.lognormvariate(6, 1.2) for _ in range(5000)]
+        histogram = LatencyHistogram(precision=0.01)
+        for value in values:
+            histogram.record(value)
+
+        for q in (0.5, 0.9, 0.95, 0.99):
+            exact = _exact_quantile(values, q)
+            self.assertLessEqual(abs(histogram.quantile(q) - exact) / exact, 0.01, msg=f"q={q}")
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 5000)
+        self.assertEqual(summary["max_ms"], round(max(values), 2))
+        self.assertAlmostEqual(summary["avg_ms"], sum(values) / len(values), places=1)
+        self.assertLess(len(histogram.buckets), 1000)
+
+    def test_merge_matches_recording_everything_and_survives_serialization(self) -> None:
+        first, second, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for value in (0.0, 12.5, 40.0, 41.0):
+            first.record(value)
+            combined.record(value)
+        for value in (900.0, 15.0):
+            second.record(value)
+            combined.record(value)
+
+        restored = LatencyHistogram.from_dict(orjson.loads(orjson.dumps(first.as_dict())))
+        merged = LatencyHistogram.merged([restored, second])
+        self.assertEqual(merged.as_dict(), combined.as_dict())
+        self.assertEqual(merged.quantile(0.1), 0.0)
+        self.assertEqual(merged.quantile(1.0), 900.0)
+        self.assertEqual(LatencyHistogram().summary()["p99_ms"], 0.0)
+        with self.assertRaises(ValueError):
+            LatencyHistogram(0.01).merge(LatencyHistogram(0.05))
+
+    def test_report_and_compare_show_percentiles_and_merge_runs(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_dirs = []
+            for num, latencies in enumerate(([10.0, 20.0], [30.0, 400.0])):
+                histogram = LatencyHistogram()
+                for value in latencies:
+                    histogram.record(value)
+                summary = orjson.loads((FIXTURE_RUN / "summary.json").read_bytes())
+                summary["run_id"] = f"run{num}"
+                summary["latency_stats"]["overall"] = {**histogram.summary(), "histogram": histogram.as_dict()}
+                run_dir = Path(tmpdir) / f"run{num}"
+                run_dir.mkdir()
+                (run_dir / "summary.json").write_bytes(orjson.dumps(summary))
+                run_dirs.append(run_dir)
+
+            summaries = [orjson.loads((run_dir / "summary.json").read_bytes()) for run_dir in run_dirs]
+            merged = merge_latency_histograms(summaries)
+            self.assertEqual((merged.count, merged.max_ms), (4, 400.0))
+            legacy = orjson.loads((FIXTURE_RUN / "summary.json").read_bytes())
+            self.assertIsNone(merge_latency_histograms([*summaries, legacy]))
+
+            # Summaries with and without histograms both render.
+            compare_runs(run_dirs)
+            compare_runs([*run_dirs, FIXTURE_RUN])
+
+
+if __name__ == "__main__":
+    unittest.main()
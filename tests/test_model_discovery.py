@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from lab import model_registry
+from lab.web.app import app
+
+
+class _CountingClient:
+    pool = None
+    base_url = "http://fake:11434"
+
+    def __init__(self, models: list[str]) -> None:
+        self.models = models
+        self.calls = 0
+
+    def list_models(self) -> list[str]:
+        self.calls += 1
+        return list(self.models)
+
+
+class ModelDiscoveryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        cache_path = Path(tmpdir.name) / "installed_models.json"
+        for patcher in (
+            patch.object(model_registry, "DISCOVERY_CACHE_PATH", cache_path),
+            patch.object(model_registry, "_installed_cache", None),
+            patch.object(model_registry, "_policy_index", None),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.cache_path = cache_path
+        self.client = _CountingClient(["llama3:latest", "nomic-embed-text:latest"])
+        client_patch = patch("lab.model_registry.get_client", return_value=self.client)
+        client_patch.start()
+        self.addCleanup(client_patch.stop)
+
+    def test_ttl_cache_and_disk_cache_avoid_repeat_discovery(self) -> None:
+        self.assertEqual(model_registry.installed_models(), {"llama3:latest", "nomic-embed-text:latest"})
+        model_registry.installed_models()
+        self.assertEqual(self.client.calls, 1)
+        self.assertTrue(self.cache_path.exists())
+
+        # A fresh process has no in-memory cache but reuses the on-disk copy.
+        model_registry._installed_cache = None
+        model_registry.installed_models()
+        self.assertEqual(self.client.calls, 1)
+
+        with patch.object(model_registry, "DISCOVERY_TTL_S", 0.0):
+            model_registry.installed_models()
+        self.assertEqual(self.client.calls, 2)
+
+    def test_invalidation_and_memoized_recommend(self) -> None:
+        first = model_registry.recommend("embeddings")
+        first["chosen_model"] = "mutated by caller"
+        second = model_registry.recommend("embeddings")
+        self.assertEqual(second["chosen_model"], "nomic-embed-text:latest")
+        self.assertIs(model_registry.policy_index(), model_registry.policy_index())
+
+        self.client.models = ["llama3:latest", "mxbai-embed-large:latest"]
+        self.assertEqual(model_registry.recommend("embeddings")["chosen_model"], "nomic-embed-text:latest")
+        model_registry.invalidate_installed_models()
+        self.assertFalse(self.cache_path.exists())
+        self.assertEqual(model_registry.recommend("embeddings")["chosen_model"], "mxbai-embed-large:latest")
+        self.assertEqual(self.client.calls, 2)
+
+    def test_policy_index_matches_by_base_name_and_orders_task_entries(self) -> None:
+        self.client.models = ["Mistral:7b-instruct", "llama3:8b", "llama3:latest", "nomic-embed-text:latest"]
+        index = model_registry.policy_index()
+        self.assertEqual(index.match("llama3"), "llama3:8b")
+        self.assertEqual(index.match(" MISTRAL "), "Mistral:7b-instruct")
+        self.assertIsNone(index.match("qwen2.5"))
+
+        priorities = [entry.priority for entry in index.task_entries("rag_qa")]
+        self.assertEqual(priorities, sorted(priorities, reverse=True))
+        self.assertTrue(all("embeddings" in entry.roles for entry in index.task_entries("embeddings")))
+
+        status = model_registry.match_installed_to_policy()
+        self.assertIn("llama3", [entry.name for entry in status["available_known_good"]])
+        self.assertNotIn("llama3", [entry.name for entry in status["missing_recommended"]])
+        self.assertEqual(model_registry.recommend("chat")["chosen_model"], "llama3:8b")
+
+        payload = TestClient(app).get("/api/models").json()
+        self.assertEqual(payload["recommended"]["embeddings"], "nomic-embed-text:latest")
+        self.assertIn("llama3", payload["status"]["available_known_good"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,15 +6,19 @@ from unittest.mock import patch
 from lab.rag import RAG_REFUSAL, answer_question
 
 
+def _fake_stream(text: str) -> list[dict[str, object]]:
+    return [{"type": "token", "text": text}, {"type": "done", "text": text, "num_ctx": 4096}]
+
+
 class RagThresholdTests(unittest.TestCase):
     @patch("lab.rag.log_event")
     @patch("lab.rag._load_prompt_template")
-    @patch("lab.rag.ChatOllama")
+    @patch("lab.rag.get_client")
     @patch("lab.rag.retrieve")
     def test_threshold_is_opt_in_and_logs_telemetry(
         self,
         mock_retrieve,
-        mock_chat_ollama,
+        mock_ollama_client,
         mock_load_prompt_template,
         mock_log_event,
     ) -> None:
@@ -28,7 +32,7 @@ class RagThresholdTests(unittest.TestCase):
             }
         ]
         mock_load_prompt_template.side_effect = ["sys", "q={question}\nctx={context}"]
-        mock_chat_ollama.return_value.invoke.return_value = "A guessed answer"
+        mock_ollama_client.return_value.chat_stream.return_value = _fake_stream("A guessed answer")
 
         result = answer_question(
             question="Unanswerable?",
@@ -50,12 +54,12 @@ class RagThresholdTests(unittest.TestCase):
 
     @patch("lab.rag.log_event")
     @patch("lab.rag._load_prompt_template")
-    @patch("lab.rag.ChatOllama")
+    @patch("lab.rag.get_client")
     @patch("lab.rag.retrieve")
     def test_answer_text_is_not_mutated_to_append_citations(
         self,
         mock_retrieve,
-        mock_chat_ollama,
+        mock_ollama_client,
         mock_load_prompt_template,
         _mock_log_event,
     ) -> None:
@@ -69,7 +73,7 @@ class RagThresholdTests(unittest.TestCase):
             }
         ]
         mock_load_prompt_template.side_effect = ["sys", "q={question}\nctx={context}"]
-        mock_chat_ollama.return_value.invoke.return_value = "Grounded answer without citations in body."
+        mock_ollama_client.return_value.chat_stream.return_value = _fake_stream("Grounded answer without citations in body.")
 
         result = answer_question(
             question="Answerable?",
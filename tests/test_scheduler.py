@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import unittest
+
+from lab.scheduler import BATCH, INTERACTIVE, RequestScheduler, current_priority, request_priority
+
+
+def _wait_until(predicate, timeout_s: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.001)
+
+
+class RequestSchedulerTests(unittest.TestCase):
+    def test_per_model_cap_limits_in_flight_requests(self) -> None:
+        scheduler = RequestScheduler(default_limit=2, model_limits={"big": 1})
+        lock = threading.Lock()
+        in_flight: dict[str, int] = {"big": 0, "small": 0}
+        peak: dict[str, int] = {"big": 0, "small": 0}
+
+        def worker(model: str) -> None:
+            with scheduler.slot(model):
+                with lock:
+                    in_flight[model] += 1
+                    peak[model] = max(peak[model], in_flight[model])
+                time.sleep(0.01)
+                with lock:
+                    in_flight[model] -= 1
+
+        threads = [threading.Thread(target=worker, args=(m,)) for m in ["big", "small"] * 4]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(peak["big"], 1)
+        self.assertEqual(peak["small"], 2)
+        metrics = scheduler.metrics()["models"]
+        self.assertEqual(metrics["big"]["granted"][INTERACTIVE], 4)
+        self.assertGreaterEqual(metrics["big"]["max_queue_depth"], 1)
+
+    def test_interactive_waiters_jump_ahead_of_batch(self) -> None:
+        scheduler = RequestScheduler(default_limit=1)
+        order: list[str] = []
+        release = threading.Event()
+
+        def holder() -> None:
+            with scheduler.slot("m"):
+                release.wait()
+
+        def waiter(name: str, priority: str) -> None:
+            with scheduler.slot("m", priority=priority):
+                order.append(name)
+
+        threading.Thread(target=holder).start()
+        _wait_until(lambda: scheduler.metrics()["models"]["m"]["active"] == 1)
+        threads = []
+        for name, priority in [("batch-1", BATCH), ("batch-2", BATCH), ("ui", INTERACTIVE)]:
+            thread = threading.Thread(target=waiter, args=(name, priority))
+            thread.start()
+            threads.append(thread)
+            expected = len(threads)
+            _wait_until(
+                lambda n=expected: sum(scheduler.metrics()["models"]["m"]["queued"].values()) == n
+            )
+        self.assertEqual(scheduler.metrics()["models"]["m"]["queued"], {INTERACTIVE: 1, BATCH: 2})
+
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, ["ui", "batch-1", "batch-2"])
+
+    def test_starved_batch_requests_are_promoted(self) -> None:
+        scheduler = RequestScheduler(default_limit=1, starvation_s=0.0)
+        order: list[str] = []
+        release = threading.Event()
+
+        def holder() -> None:
+            with scheduler.slot("m"):
+                release.wait()
+
+        def waiter(name: str, priority: str) -> None:
+            with scheduler.slot("m", priority=priority):
+                order.append(name)
+
+        threading.Thread(target=holder).start()
+        _wait_until(lambda: scheduler.metrics()["models"]["m"]["active"] == 1)
+        first = threading.Thread(target=waiter, args=("batch", BATCH))
+        first.start()
+        _wait_until(lambda: scheduler.metrics()["models"]["m"]["queued"][BATCH] == 1)
+        second = threading.Thread(target=waiter, args=("ui", INTERACTIVE))
+        second.start()
+        _wait_until(lambda: scheduler.metrics()["models"]["m"]["queued"][INTERACTIVE] == 1)
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(order, ["batch", "ui"])
+
+    def test_context_priority_and_async_cancellation(self) -> None:
+        scheduler = RequestScheduler(default_limit=1)
+
+        async def scenario() -> dict[str, object]:
+            async with scheduler.aslot("m"):
+                with request_priority(BATCH):
+                    self.assertEqual(current_priority(), BATCH)
+                    waiter = asyncio.create_task(scheduler.aslot("m").__aenter__())
+                    await asyncio.sleep(0.01)
+                queued = scheduler.metrics()["models"]["m"]["queued"][BATCH]
+                waiter.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await waiter
+            return {"queued": queued, "after": scheduler.metrics()["models"]["m"]}
+
+        outcome = asyncio.run(scenario())
+
+        self.assertEqual(outcome["queued"], 1)
+        self.assertEqual(outcome["after"]["active"], 0)
+        self.assertEqual(outcome["after"]["queued"], {INTERACTIVE: 0, BATCH: 0})
+        self.assertEqual(current_priority(), INTERACTIVE)
+        with self.assertRaises(ValueError), request_priority("urgent"):
+            pass
+
+    def test_slot_timeouts_leave_the_queue(self) -> None:
+        scheduler = RequestScheduler(default_limit=1)
+
+        async def timed_out_async_waiter() -> None:
+            async with scheduler.aslot("m", timeout_s=0.02):
+                pass
+
+        with scheduler.slot("m"):
+            with self.assertRaises(TimeoutError), scheduler.slot("m", timeout_s=0.02):
+                pass
+            with self.assertRaises(TimeoutError):
+                asyncio.run(timed_out_async_waiter())
+            self.assertEqual(scheduler.metrics()["models"]["m"]["queued"], {INTERACTIVE: 0, BATCH: 0})
+        with scheduler.slot("m", timeout_s=0.02):
+            self.assertEqual(scheduler.metrics()["models"]["m"]["active"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import orjson
+from fastapi.testclient import TestClient
+
+from lab.ollama_client import OllamaClient
+from lab.web.app import app
+
+_RealClient = httpx.Client
+
+
+@contextlib.contextmanager
+def _cwd(path: Path):
+    prev = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(prev)
+
+
+def _chat_handler(request: httpx.Request) -> httpx.Response:
+    body = orjson.loads(request.content)
+    assert body["stream"] is True
+    lines = [
+        {"message": {"role": "assistant", "content": "Hel"}, "done": False},
+        {"message": {"role": "assistant", "content": "lo"}, "done": False},
+        {"message": {"role": "assistant", "content": ""}, "done": True, "eval_count": 2},
+    ]
+    return httpx.Response(200, content=b"\n".join(orjson.dumps(line) for line in lines) + b"\n")
+
+
+def _mock_client(**kwargs: object) -> httpx.Client:
+    return _RealClient(transport=httpx.MockTransport(_chat_handler), **kwargs)
+
+
+class StreamingTests(unittest.TestCase):
+    @patch("lab.ollama_client.httpx.Client", side_effect=_mock_client)
+    def test_chat_stream_yields_tokens_then_timing_summary(self, _mock_httpx_client) -> None:
+        events = list(
+            OllamaClient().chat_stream("fake-chat", [{"role": "user", "content": "hi"}], num_ctx=1024)
+        )
+
+        self.assertEqual([e["text"] for e in events if e["type"] == "token"], ["Hel", "lo"])
+        done = events[-1]
+        self.assertEqual(done["type"], "done")
+        self.assertEqual(done["text"], "Hello")
+        self.assertEqual(done["token_chunks"], 2)
+        self.assertIsNotNone(done["ttft_ms"])
+        self.assertIsNotNone(done["inter_token_ms_avg"])
+        self.assertGreaterEqual(done["latency_ms"], done["ttft_ms"])
+
+    @patch("lab.ollama_client.httpx.Client", side_effect=_mock_client)
+    def test_chat_generate_forwards_tokens_to_callback(self, _mock_httpx_client) -> None:
+        seen: list[str] = []
+        result = OllamaClient().chat_generate("fake-chat", "hi", on_token=seen.append)
+
+        self.assertEqual(seen, ["Hel", "lo"])
+        self.assertEqual(result["text"], "Hello")
+        self.assertIn("ttft_ms", result)
+
+    @patch("lab.web.app.astream_answer_question")
+    @patch("lab.web.app._recommended_model", return_value="fake-model")
+    def test_web_rag_stream_endpoint_emits_ndjson(self, _mock_recommend, mock_stream) -> None:
+        async def fake_events(**_: object):
+            yield {"type": "token", "text": "RAG "}
+            yield {"type": "token", "text": "answer"}
+            yield {"type": "result", "result": {"answer_text": "RAG answer", "ttft_ms": 5.0}}
+
+        mock_stream.side_effect = fake_events
+        with tempfile.TemporaryDirectory() as tmpdir, _cwd(Path(tmpdir)):
+            client = TestClient(app)
+            resp = client.post("/api/stream/rag", json={"question": "What is RAG?", "num_ctx": "auto"})
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["content-type"], "application/x-ndjson")
+        events = [orjson.loads(line) for line in resp.content.splitlines() if line.strip()]
+        self.assertEqual([e["type"] for e in events], ["token", "token", "result"])
+        self.assertEqual(mock_stream.call_args.kwargs["num_ctx"], "auto")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import os
 import tempfile
 import time
 import unittest
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import orjson
 from fastapi.testclient import TestClient
@@ -72,8 +73,8 @@ class WebSmokeTests(unittest.TestCase):
                 self.assertIn("Previous page", resp_detail_page2.text)
                 self.assertIn("Offset: 100 | Limit: 50", resp_detail_page2.text)
 
-    @patch("lab.web.app.answer_question")
-    @patch("lab.web.app.OllamaClient")
+    @patch("lab.web.app.aanswer_question", new_callable=AsyncMock)
+    @patch("lab.web.app.get_async_client")
     @patch("lab.web.app._recommended_model")
     def test_chat_and_rag_post_smoke(
         self,
@@ -87,11 +88,13 @@ class WebSmokeTests(unittest.TestCase):
             return "fake-chat"
 
         mock_recommended_model.side_effect = fake_recommend
-        mock_ollama_client.return_value.chat_generate.return_value = {
-            "text": "hello",
-            "latency_ms": 12.3,
-            "raw_response_snippet": "{}",
-        }
+        mock_ollama_client.return_value.chat_generate = AsyncMock(
+            return_value={
+                "text": "hello",
+                "latency_ms": 12.3,
+                "raw_response_snippet": "{}",
+            }
+        )
         mock_answer_question.return_value = {
             "answer_text": "RAG answer",
             "citations": [{"path": "data/corpus/rag.md", "chunk_id": 0}],
@@ -154,6 +157,38 @@ class WebSmokeTests(unittest.TestCase):
                 self.assertEqual(final_payload["kind"], "rag")
                 self.assertEqual(final_payload["result"]["answer_text"], "RAG answer")
 
+    @patch("lab.web.app.astream_answer_question")
+    @patch("lab.web.app.get_async_client")
+    @patch("lab.web.app._recommended_model")
+    def test_stream_endpoints_recommend_models_off_the_event_loop(
+        self,
+        mock_recommended_model,
+        mock_ollama_client,
+        mock_stream_answer,
+    ) -> None:
+        on_loop: list[bool] = []
+
+        def fake_recommend(task: str) -> str:
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return "fake-embed" if task == "embeddings" else "fake-chat"
+
+        async def events(*_args: object, **_kwargs: object):
+            yield {"type": "done", "text": "ok"}
+
+        mock_recommended_model.side_effect = fake_recommend
+        mock_ollama_client.return_value.chat_stream.side_effect = events
+        mock_stream_answer.side_effect = events
+
+        client = TestClient(app)
+        self.assertEqual(client.post("/api/stream/chat", json={"prompt": "hi"}).status_code, 200)
+        self.assertEqual(client.post("/api/stream/rag", json={"question": "What is RAG?"}).status_code, 200)
+        self.assertEqual(on_loop, [False, False, False])
+        self.assertEqual(mock_stream_answer.call_args.kwargs["embed_model_name"], "fake-embed")
+
 
 if __name__ == "__main__":
     unittest.main()